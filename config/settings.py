@@ -23,11 +23,15 @@ THEME = "dark-blue"  # For customtkinter
 FONT_FAMILY = "Segoe UI"
 
 # Database settings
+DATABASE_PROFILE = "balanced"  # Perfil de conexión: safe, balanced o bulk-load (WAL en todos)
+DATABASE_PRAGMAS = {}          # Ajustes sobre el perfil, p. ej. {"cache_size": -65536}
+WRITE_BATCH_DELAY_MS = 10      # Espera máxima para agrupar altas en un mismo commit (ms)
+WRITE_BATCH_SIZE = 200         # Máximo de operaciones por commit de la cola de escritura
 BACKUP_ENABLED = True  # <-- SOLO UNA VEZ
 BACKUP_INTERVAL_DAYS = 7
 
 # Export settings
-EXPORT_FORMAT = "xlsx"  # xlsx, csv
+EXPORT_FORMAT = "xlsx"  # xlsx, csv, ndjson
 DATE_FORMAT = "%d/%m/%Y %H:%M:%S"
 
 # Logging
@@ -40,6 +44,14 @@ AUTO_BACKUP_ON_START = True  # Verificar backup al iniciar
 AUTO_BACKUP_ON_EXIT = True   # Crear backup al cerrar si es necesario
 MAX_BACKUP_FILES = 10        # Máximo número de backups a mantener
 BACKUP_MIN_DB_SIZE = 1024    # Tamaño mínimo de BD para hacer backup (bytes)
+BACKUP_PAGES_PER_STEP = 256  # Páginas copiadas por paso del backup online (-1 = todo de una vez)
+BACKUP_STEP_SLEEP = 0.005    # Pausa entre pasos (segundos) para no bloquear a quien escribe
+BACKUP_EXIT_TIMEOUT = 30     # Espera máxima por el backup al cerrar (segundos)
+BACKUP_FORMAT = "chunked"    # chunked (bloques comprimidos y deduplicados) o db (copia completa)
+BACKUP_CHUNK_SIZE = 65536    # Tamaño de bloque del formato chunked (múltiplo de la página de SQLite)
+BACKUP_INCREMENTAL = True    # Backups incrementales (deltas de ChangeLogs) entre backups completos
+BACKUP_FULL_EVERY = 9        # Deltas antes de forzar un nuevo backup completo base (como máximo
+                             # MAX_BACKUP_FILES - 1: la limpieza no corta una cadena a medias)
 
 # Ensure directories exist
 for directory in [DATA_DIR, EXPORTS_DIR, BACKUP_DIR, LOG_DIR]:
@@ -0,0 +1,285 @@
+"""
+Catálogo de backups
+
+Un manifiesto JSON dentro del directorio de backups registra cada copia
+(archivo, tamaño, fecha, checksum y huella de cambios). Buscar el último
+backup, aplicar la retención y listar leen solo ese archivo en lugar de
+recorrer el directorio y consultar la fecha de cada copia, lo que en una
+carpeta de red con años de backups es lento.
+"""
+import hashlib
+import json
+import os
+import sys
+import zlib
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+# Añadir el directorio raíz al path para importaciones
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.backup_delta import DELTA_SUFFIX, load_delta
+from scripts.backup_store import SNAPSHOT_SUFFIX, is_snapshot, referenced_chunks, store_for
+
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Patrón de nombre de los backups que administra el catálogo
+BACKUP_PREFIX = "bodega_backup_"
+BACKUP_SUFFIXES = (".db", SNAPSHOT_SUFFIX, DELTA_SUFFIX)
+
+# Bloque de lectura para calcular checksums (bytes)
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+
+@dataclass
+class BackupEntry:
+    """Un backup registrado en el catálogo"""
+    file: str
+    size: int                          # Tamaño de la base de datos respaldada
+    created: str                       # ISO 8601, hora local
+    checksum: Optional[str] = None     # sha256 del archivo
+    fingerprint: Optional[list] = None  # Huella de cambios de la base de datos
+    kind: str = "full"                 # "full" o "delta" (incremental)
+    base: Optional[str] = None         # Backup completo sobre el que se aplica un delta
+
+    @property
+    def created_at(self):
+        return datetime.fromisoformat(self.created)
+
+
+def file_checksum(filepath):
+    """sha256 de un archivo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BackupCatalog:
+    """Manifiesto de los backups de un directorio"""
+
+    def __init__(self, backup_dir):
+        self.backup_dir = str(backup_dir)
+        self.manifest_path = os.path.join(self.backup_dir, MANIFEST_FILE)
+
+    def path_for(self, entry):
+        """Ruta completa del archivo de un backup"""
+        return os.path.join(self.backup_dir, entry.file)
+
+    def entries(self) -> List[BackupEntry]:
+        """Backups registrados, del más antiguo al más reciente"""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                data = json.load(f)
+            entries = [BackupEntry(**item) for item in data.get("backups", [])]
+        except FileNotFoundError:
+            # Primera vez: se importan los backups que ya existían en el directorio
+            return self.rebuild()
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️  Catálogo de backups ilegible ({e}), reconstruyendo...")
+            return self.rebuild()
+
+        entries.sort(key=lambda entry: entry.created)
+        return entries
+
+    def latest(self) -> Optional[BackupEntry]:
+        """Backup más reciente o None"""
+        entries = self.entries()
+        return entries[-1] if entries else None
+
+    def add(self, backup_file, fingerprint=None, checksum=None, size=None,
+            kind="full", base=None) -> BackupEntry:
+        """Registra un backup recién creado (size: tamaño original si está comprimido)"""
+        entry = BackupEntry(
+            file=os.path.basename(backup_file),
+            size=size if size is not None else os.path.getsize(backup_file),
+            created=datetime.now().isoformat(timespec='seconds'),
+            checksum=checksum,
+            fingerprint=fingerprint,
+            kind=kind,
+            base=base,
+        )
+        entries = [e for e in self.entries() if e.file != entry.file]
+        entries.append(entry)
+        self._save(entries)
+        return entry
+
+    def chain_for(self, backup_file) -> List[str]:
+        """
+        Backups necesarios para restaurar backup_file: [completo, delta, ..., backup_file]
+
+        Raises:
+            ValueError: si el backup no está en el catálogo
+        """
+        name = os.path.basename(backup_file)
+        entries = self.entries()
+        index = next((i for i, entry in enumerate(entries) if entry.file == name), None)
+        if index is None:
+            raise ValueError(f"Backup no registrado en el catálogo: {name}")
+
+        entry = entries[index]
+        if entry.kind != "delta":
+            return [entry.file]
+        # Los deltas de una misma base forman una cadena en orden de creación
+        deltas = [e.file for e in entries[:index + 1] if e.kind == "delta" and e.base == entry.base]
+        return [entry.base] + deltas
+
+    def prune(self, max_backups, verbose=True):
+        """
+        Elimina los backups más antiguos, manteniendo solo los max_backups más recientes
+
+        Un delta necesita su base y los deltas anteriores de la cadena, así que
+        el corte nunca deja una cadena a medias: se conserva desde su base. Por
+        eso una cadena no puede tener más de max_backups archivos (ver
+        create_incremental_backup); si no, nunca se eliminaría nada.
+
+        Returns:
+            (cantidad eliminada, bytes liberados)
+        """
+        entries = self.entries()
+        if len(entries) <= max_backups:
+            return 0, 0
+
+        cut = len(entries) - max_backups
+        while cut > 0 and entries[cut].kind == "delta":
+            cut -= 1
+        if cut == 0:
+            return 0, 0
+
+        to_delete = entries[:cut]
+        kept = entries[cut:]
+        deleted_count = 0
+        freed_space = 0
+
+        for entry in to_delete:
+            path = self.path_for(entry)
+            try:
+                # Un .snap es solo el manifiesto; sus bloques se liberan más abajo
+                size = os.path.getsize(path) if is_snapshot(entry.file) else entry.size
+                os.remove(path)
+                deleted_count += 1
+                freed_space += size
+                if verbose:
+                    print(f"🗑️  Eliminado backup antiguo: {entry.file}")
+            except FileNotFoundError:
+                # Ya no estaba: basta con quitarlo del catálogo
+                pass
+            except OSError as e:
+                # Se conserva en el catálogo para reintentar la próxima vez
+                kept.append(entry)
+                if verbose:
+                    print(f"⚠️  No se pudo eliminar {entry.file}: {str(e)}")
+
+        self._save(kept)
+        
+        # Bloques del almacén deduplicado que ya no usa ningún backup
+        if any(is_snapshot(entry.file) for entry in to_delete):
+            snapshots = [self.path_for(entry) for entry in kept if is_snapshot(entry.file)]
+            removed, freed = store_for(self.manifest_path).collect_garbage(referenced_chunks(snapshots))
+            freed_space += freed
+            if verbose and removed:
+                print(f"🧹 Bloques sin uso eliminados: {removed}")
+
+        return deleted_count, freed_space
+
+    def rebuild(self) -> List[BackupEntry]:
+        """
+        Reconstruye el catálogo recorriendo el directorio (una sola vez)
+
+        Conserva checksum y huella de los backups que ya estaban registrados.
+        """
+        known = {}
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                known = {item["file"]: item for item in json.load(f).get("backups", [])}
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+
+        entries = []
+        if os.path.isdir(self.backup_dir):
+            for item in os.scandir(self.backup_dir):
+                if not (item.name.startswith(BACKUP_PREFIX) and item.name.endswith(BACKUP_SUFFIXES)):
+                    continue
+                if not item.is_file():
+                    continue
+                stat = item.stat()
+                previous = known.get(item.name, {})
+                kind = "delta" if item.name.endswith(DELTA_SUFFIX) else "full"
+                if kind == "delta" and not previous.get("base"):
+                    # Sin manifiesto previo la base y la huella se leen del propio delta
+                    previous = dict(previous, **self._delta_header(item.path))
+                entries.append(BackupEntry(
+                    file=item.name,
+                    size=previous.get("size") or stat.st_size,
+                    created=previous.get("created") or
+                    datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds'),
+                    checksum=previous.get("checksum"),
+                    fingerprint=previous.get("fingerprint"),
+                    kind=kind,
+                    base=previous.get("base"),
+                ))
+
+        entries.sort(key=lambda entry: entry.created)
+        if os.path.isdir(self.backup_dir):
+            self._save(entries)
+        return entries
+
+    @staticmethod
+    def _delta_header(path):
+        """Base y huella registradas dentro de un delta ({} si no se puede leer)"""
+        try:
+            delta = load_delta(path)
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"⚠️  No se pudo leer el delta {os.path.basename(path)}: {e}")
+            return {}
+        return {"base": delta.get("base"), "fingerprint": delta.get("fingerprint")}
+
+    def _save(self, entries):
+        """Escribe el manifiesto de forma atómica"""
+        data = {
+            "version": MANIFEST_VERSION,
+            "backups": [asdict(entry) for entry in entries],
+        }
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+
+if __name__ == "__main__":
+    import argparse
+    from config.settings import BACKUP_DIR
+
+    parser = argparse.ArgumentParser(description="Catálogo de backups")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Reconstruir el manifiesto recorriendo el directorio")
+    parser.add_argument("--verify", action="store_true",
+                        help="Comprobar el checksum de cada backup registrado")
+
+    args = parser.parse_args()
+    catalog = BackupCatalog(BACKUP_DIR)
+
+    if args.rebuild:
+        entries = catalog.rebuild()
+        print(f"✅ Catálogo reconstruido: {len(entries)} backups")
+    elif args.verify:
+        failures = 0
+        for entry in catalog.entries():
+            if not entry.checksum:
+                print(f"ℹ️  {entry.file}: sin checksum registrado")
+            elif not os.path.exists(catalog.path_for(entry)):
+                failures += 1
+                print(f"❌ {entry.file}: archivo no encontrado")
+            elif file_checksum(catalog.path_for(entry)) != entry.checksum:
+                failures += 1
+                print(f"❌ {entry.file}: checksum distinto")
+            else:
+                print(f"✅ {entry.file}")
+        sys.exit(1 if failures else 0)
+    else:
+        parser.print_help()
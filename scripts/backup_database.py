@@ -2,8 +2,7 @@
 Script para realizar backup de la base de datos
 """
 import sqlite3
-import shutil
-from datetime import datetime
+from datetime import datetime, timezone
 import os
 import sys
 from pathlib import Path
@@ -11,11 +10,166 @@ from pathlib import Path
 # Añadir el directorio raíz al path para importaciones
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config.settings import DATABASE_PATH, DATA_DIR, BACKUP_DIR
+from config.settings import (DATABASE_PATH, DATA_DIR, BACKUP_DIR,
+                             BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP,
+                             BACKUP_FORMAT, BACKUP_CHUNK_SIZE,
+                             BACKUP_INCREMENTAL, BACKUP_FULL_EVERY, MAX_BACKUP_FILES)
+from scripts.backup_catalog import BackupCatalog, file_checksum
+from scripts.backup_delta import (DELTA_SUFFIX, apply_delta, create_delta, is_delta, journal_delta,
+                                  materialize_chain, read_fingerprint)
+from scripts.backup_store import SNAPSHOT_SUFFIX, create_snapshot, is_snapshot
 
 
-def backup_database(verbose=True):
-    """Crea una copia de seguridad de la base de datos"""
+def _connect_readonly(db_path):
+    """Conexión de solo lectura (no crea el archivo si no existe)"""
+    return sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+
+
+def _unique_path(path):
+    """Evita pisar un backup creado en el mismo segundo (agrega _2, _3...)"""
+    stem, extension = os.path.splitext(path)
+    counter = 1
+    while os.path.exists(path):
+        counter += 1
+        path = f"{stem}_{counter}{extension}"
+    return path
+
+
+def online_backup(source_path, dest_path, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP,
+                  progress=None):
+    """
+    Copia una base de datos en uso con la API de backup online de SQLite
+
+    La copia avanza de a `pages` páginas y entre paso y paso libera el bloqueo
+    durante `sleep` segundos, así la aplicación puede seguir escribiendo. Si
+    alguien escribe durante la copia, SQLite la reinicia: el resultado es
+    siempre una foto consistente, nunca un archivo a medias.
+
+    Args:
+        progress: Callback opcional (status, remaining, total) de sqlite3
+    """
+    # Solo lectura: el backup nunca modifica la base de datos de origen
+    source = _connect_readonly(source_path)
+    try:
+        dest = sqlite3.connect(str(dest_path))
+        try:
+            source.backup(dest, pages=pages, progress=progress, sleep=sleep)
+        finally:
+            dest.close()
+    finally:
+        source.close()
+
+
+def verify_backup(backup_file):
+    """Ejecuta PRAGMA quick_check sobre una copia y devuelve (ok, mensaje)"""
+    try:
+        conn = sqlite3.connect(str(backup_file))
+        try:
+            results = [row[0] for row in conn.execute('PRAGMA quick_check')]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return False, str(e)
+
+    if results == ['ok']:
+        return True, 'ok'
+    return False, "; ".join(results[:5])
+
+
+def database_fingerprint(db_path):
+    """
+    Huella de cambios de una base de datos
+
+    Combina la versión de esquema, el último log de ChangeLogs, el último id
+    asignado en DeviceReg (sqlite_sequence) y la cantidad de filas, de modo que
+    cualquier alta, cambio registrado o baja la modifica. Devuelve None si no
+    se puede calcular (en ese caso hay que hacer el backup).
+    """
+    try:
+        conn = _connect_readonly(db_path)
+        try:
+            return read_fingerprint(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+
+def backup_is_current(db_path=None, backup_dir=None):
+    """
+    Indica si el último backup ya contiene el estado actual de la base de datos
+
+    Requiere que el archivo del último backup del catálogo siga existiendo y
+    que su huella coincida con la de la base de datos en uso.
+    """
+    catalog = BackupCatalog(backup_dir or BACKUP_DIR)
+    latest = catalog.latest()
+    if latest is None or not latest.fingerprint:
+        return False
+    if not os.path.isfile(catalog.path_for(latest)):
+        return False
+
+    current = database_fingerprint(db_path or DATABASE_PATH)
+    return current is not None and current == latest.fingerprint
+
+
+def create_incremental_backup(backup_dir, timestamp, full_every=BACKUP_FULL_EVERY,
+                              max_backups=MAX_BACKUP_FILES, verbose=True):
+    """
+    Crea un delta con los cambios de ChangeLogs desde el último backup
+    
+    Args:
+        max_backups: Retención del directorio; la cadena (base y deltas) nunca
+                     la supera, porque la limpieza no puede cortar una cadena
+    
+    Returns:
+        Ruta del .delta, o None si corresponde un backup completo (no hay base,
+        la cadena llegó a full_every deltas o hubo cambios que los logs no explican)
+    """
+    full_every = max(0, min(full_every, max_backups - 1))
+    catalog = BackupCatalog(backup_dir)
+    entries = catalog.entries()
+    if not entries or not entries[-1].fingerprint:
+        return None
+    
+    latest = entries[-1]
+    base = latest.file if latest.kind == "full" else latest.base
+    if not base or not os.path.isfile(os.path.join(backup_dir, base)):
+        return None
+    if sum(1 for entry in entries if entry.kind == "delta" and entry.base == base) >= full_every:
+        return None
+    
+    backup_file = _unique_path(os.path.join(backup_dir, f"bodega_backup_{timestamp}{DELTA_SUFFIX}"))
+    conn = _connect_readonly(DATABASE_PATH)
+    try:
+        info = create_delta(conn, backup_file, base, latest.fingerprint)
+    finally:
+        conn.close()
+    
+    if info is None:
+        if verbose:
+            print("⚠️  Hay cambios sin registrar en ChangeLogs, se hace un backup completo")
+        return None
+    
+    catalog.add(backup_file, fingerprint=info["fingerprint"], checksum=file_checksum(backup_file),
+                kind="delta", base=base)
+    if verbose:
+        print(f"✅ Backup incremental creado: {os.path.basename(backup_file)}")
+        print(f"   📝 Cambios: {info['logs']:,} logs, {info['devices']:,} dispositivos")
+        print(f"   🔗 Base: {base}")
+    return backup_file
+
+
+def backup_database(verbose=True, pages_per_step=BACKUP_PAGES_PER_STEP, step_sleep=BACKUP_STEP_SLEEP,
+                    backup_format=BACKUP_FORMAT, incremental=BACKUP_INCREMENTAL):
+    """
+    Crea una copia de seguridad de la base de datos con la API de backup online
+    
+    backup_format "chunked" guarda la copia en el almacén de bloques
+    deduplicados (.snap); "db" deja una copia completa (.db). Con incremental
+    se guarda solo un delta de ChangeLogs mientras haya un backup completo base
+    reciente (ver create_incremental_backup).
+    """
     try:
         if verbose:
             print("=" * 50)
@@ -62,38 +216,70 @@ def backup_database(verbose=True):
         
         # Nombre del backup con fecha y hora
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"bodega_backup_{timestamp}.db"
-        backup_file = os.path.join(backup_dir, backup_filename)
+        backup_file = _unique_path(os.path.join(backup_dir, f"bodega_backup_{timestamp}.db"))
+        backup_filename = os.path.basename(backup_file)
+        
+        if incremental:
+            delta_file = create_incremental_backup(backup_dir, timestamp, max_backups=MAX_BACKUP_FILES,
+                                                   verbose=verbose)
+            if delta_file:
+                cleanup_old_backups(backup_dir, max_backups=MAX_BACKUP_FILES, verbose=verbose)
+                return True, delta_file
         
         if verbose:
             print("🔄 Creando backup...")
         
-        # Método 1: Usar shutil.copy2 (más simple y rápido)
-        shutil.copy2(DATABASE_PATH, backup_file)
+        # Se copia a un temporal y solo se renombra si pasa la verificación
+        temp_file = backup_file + ".tmp"
+        try:
+            online_backup(DATABASE_PATH, temp_file, pages=pages_per_step, sleep=step_sleep)
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
         
         # Verificar que el backup se creó correctamente
-        if not os.path.exists(backup_file):
+        if not os.path.exists(temp_file):
             error_msg = f"❌ Error: No se pudo crear el archivo de backup"
             if verbose:
                 print(error_msg)
             return False, error_msg
         
         # Verificar integridad del backup
-        backup_size = os.path.getsize(backup_file)
-        original_size = os.path.getsize(DATABASE_PATH)
-        
-        if backup_size == 0:
-            error_msg = f"❌ Error: Backup creado pero está vacío"
+        valid, check_msg = verify_backup(temp_file)
+        if not valid:
+            error_msg = f"❌ Error: El backup no pasó quick_check: {check_msg}"
             if verbose:
                 print(error_msg)
-            os.remove(backup_file)  # Eliminar backup corrupto
+            os.remove(temp_file)  # Eliminar backup corrupto
             return False, error_msg
         
-        # Verificar que el tamaño sea similar (puede variar un poco por overhead de SQLite)
-        size_diff = abs(backup_size - original_size)
-        if size_diff > 1024:  # Más de 1KB de diferencia
+        # La huella se toma de la copia: corresponde exactamente a lo respaldado
+        fingerprint = database_fingerprint(temp_file)
+        
+        if verbose:
+            print(f"✅ Integridad verificada (quick_check)")
+        
+        if backup_format == "chunked":
+            # Solo se escriben los bloques que no estaban en el almacén
+            backup_file = _unique_path(os.path.join(backup_dir, f"bodega_backup_{timestamp}{SNAPSHOT_SUFFIX}"))
+            backup_filename = os.path.basename(backup_file)
+            try:
+                stats = create_snapshot(temp_file, backup_file, chunk_size=BACKUP_CHUNK_SIZE)
+            finally:
+                os.remove(temp_file)
+            backup_size = stats["size"]
+            checksum = file_checksum(backup_file)
             if verbose:
-                print(f"⚠️  Advertencia: Diferencia de tamaño: {size_diff:,} bytes")
+                print(f"   🧩 Bloques: {stats['chunks']:,} ({stats['new_chunks']:,} nuevos, "
+                      f"{stats['stored_bytes']:,} bytes escritos)")
+        else:
+            os.replace(temp_file, backup_file)
+            backup_size = os.path.getsize(backup_file)
+            checksum = file_checksum(backup_file)
+        
+        BackupCatalog(backup_dir).add(backup_file, fingerprint=fingerprint,
+                                      checksum=checksum, size=backup_size)
         
         if verbose:
             print(f"✅ Backup creado exitosamente!")
@@ -101,8 +287,8 @@ def backup_database(verbose=True):
             print(f"   📊 Tamaño: {backup_size:,} bytes")
             print(f"   📍 Ubicación: {backup_dir}")
         
-        # Limpiar backups antiguos (mantener solo los últimos 10)
-        cleanup_old_backups(backup_dir, max_backups=10, verbose=verbose)
+        # Limpiar backups antiguos (mantener solo los últimos MAX_BACKUP_FILES)
+        cleanup_old_backups(backup_dir, max_backups=MAX_BACKUP_FILES, verbose=verbose)
         
         return True, backup_file
         
@@ -121,41 +307,14 @@ def backup_database(verbose=True):
         return False, error_msg
 
 
-def cleanup_old_backups(backup_dir, max_backups=10, verbose=True):
+def cleanup_old_backups(backup_dir, max_backups=MAX_BACKUP_FILES, verbose=True):
     """Elimina backups antiguos, manteniendo solo los más recientes"""
     try:
-        # Obtener todos los archivos de backup
-        backup_files = []
-        for filename in os.listdir(backup_dir):
-            if filename.startswith("bodega_backup_") and filename.endswith(".db"):
-                filepath = os.path.join(backup_dir, filename)
-                if os.path.isfile(filepath):
-                    backup_files.append((filepath, os.path.getmtime(filepath)))
-        
-        # Ordenar por fecha de modificación (más antiguos primero)
-        backup_files.sort(key=lambda x: x[1])
-        
-        # Eliminar los más antiguos si hay más de max_backups
-        if len(backup_files) > max_backups:
-            files_to_delete = backup_files[:len(backup_files) - max_backups]
-            deleted_count = 0
-            freed_space = 0
-            
-            for filepath, _ in files_to_delete:
-                try:
-                    file_size = os.path.getsize(filepath)
-                    os.remove(filepath)
-                    deleted_count += 1
-                    freed_space += file_size
-                    if verbose:
-                        print(f"🗑️  Eliminado backup antiguo: {os.path.basename(filepath)}")
-                except Exception as e:
-                    if verbose:
-                        print(f"⚠️  No se pudo eliminar {filepath}: {str(e)}")
-            
-            if verbose and deleted_count > 0:
-                print(f"🧹 Limpieza completada: {deleted_count} backups antiguos eliminados")
-                print(f"💾 Espacio liberado: {freed_space:,} bytes")
+        deleted_count, freed_space = BackupCatalog(backup_dir).prune(max_backups, verbose=verbose)
+        
+        if verbose and deleted_count > 0:
+            print(f"🧹 Limpieza completada: {deleted_count} backups antiguos eliminados")
+            print(f"💾 Espacio liberado: {freed_space:,} bytes")
                 
     except Exception as e:
         if verbose:
@@ -174,14 +333,8 @@ def list_backups(backup_dir=None):
     print(f"\n📋 BACKUPS DISPONIBLES en {backup_dir}:")
     print("=" * 60)
     
-    backups = []
-    for filename in sorted(os.listdir(backup_dir)):
-        if filename.startswith("bodega_backup_") and filename.endswith(".db"):
-            filepath = os.path.join(backup_dir, filename)
-            if os.path.isfile(filepath):
-                size = os.path.getsize(filepath)
-                mod_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-                backups.append((filename, size, mod_time))
+    backups = [(entry.file, entry.size, entry.created_at)
+               for entry in BackupCatalog(backup_dir).entries()]
     
     if not backups:
         print("No se encontraron backups")
@@ -196,8 +349,113 @@ def list_backups(backup_dir=None):
     return backups
 
 
-def restore_backup(backup_file, verbose=True):
-    """Restaura la base de datos desde un backup"""
+def _restore_temp_path():
+    """Temporal de restauración junto a la base de datos (mismo disco: os.replace es atómico)"""
+    return str(DATABASE_PATH) + ".restore.tmp"
+
+
+def _pre_restore_backup(verbose=True):
+    """
+    Respalda la base de datos en uso antes de reemplazarla
+    
+    Usa el mismo camino que los backups normales (API online, catálogo, bloques
+    deduplicados o delta), así que si el último backup ya está al día no se
+    escribe nada y si no, en general solo se escriben los cambios.
+    
+    Returns:
+        Mensaje de error, o None si la base quedó respaldada
+    """
+    if not os.path.exists(DATABASE_PATH):
+        return None
+    if backup_is_current():
+        if verbose:
+            print("ℹ️  El último backup ya contiene la base de datos actual")
+        return None
+    
+    success, result = backup_database(verbose=False, step_sleep=0)
+    if not success:
+        return f"❌ Error: No se pudo respaldar la base de datos actual: {result}"
+    if verbose:
+        print(f"✅ Backup pre-restauración creado: {os.path.basename(result)}")
+    return None
+
+
+def _database_in_use():
+    """
+    Indica si alguna conexión tiene abierta la base de datos
+    
+    Con WAL cada conexión abierta mantiene un bloqueo compartido del archivo:
+    si no se puede tomar el bloqueo exclusivo, la aplicación (u otro script)
+    la está usando y reemplazar el archivo haría que siga escribiendo en la
+    base vieja.
+    """
+    if not os.path.exists(DATABASE_PATH):
+        return False
+    conn = sqlite3.connect(str(DATABASE_PATH), timeout=0, isolation_level=None)
+    try:
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        conn.execute("BEGIN EXCLUSIVE")
+        conn.execute("ROLLBACK")
+        return False
+    except sqlite3.OperationalError:
+        return True
+    finally:
+        conn.close()
+
+
+def _install_database(temp_file, verbose=True, db=None):
+    """
+    Reemplaza la base de datos en uso por temp_file (junto a ella)
+    
+    La copia se verifica con quick_check antes de tocar nada y entra en su
+    lugar con os.replace: nunca queda una base de datos a medio copiar.
+    
+    Si otra conexión (otro proceso, o la aplicación cuando se restaura desde
+    la línea de comandos) tiene abierta la base, no se reemplaza nada.
+    
+    Args:
+        db: Database abierta sobre DATABASE_PATH; se cierra antes del reemplazo
+            y se vuelve a abrir sobre la base restaurada. Quien la pasa debe
+            haber vaciado antes su cola de escritura
+    
+    Returns:
+        Mensaje de error, o None si la restauración fue exitosa
+    """
+    valid, check_msg = verify_backup(temp_file)
+    if not valid:
+        return f"❌ Error: La base de datos restaurada no pasó quick_check: {check_msg}"
+    
+    error_msg = _pre_restore_backup(verbose)
+    if error_msg:
+        return error_msg
+    
+    if db is not None:
+        db.close()
+    try:
+        if _database_in_use():
+            return ("❌ Error: La base de datos está abierta en otro proceso "
+                    "(cierre la aplicación antes de restaurar)")
+        # El diario o WAL que quede es de la base reemplazada: se borra antes del
+        # reemplazo para que nunca se aplique sobre la nueva
+        for suffix in ("-journal", "-wal", "-shm"):
+            if os.path.exists(str(DATABASE_PATH) + suffix):
+                os.remove(str(DATABASE_PATH) + suffix)
+        os.replace(temp_file, DATABASE_PATH)
+    finally:
+        if db is not None:
+            db.reopen()
+    return None
+
+
+def restore_backup(backup_file, verbose=True, db=None):
+    """
+    Restaura la base de datos desde un backup (.db, .snap o .delta)
+    
+    Args:
+        db: Database de la aplicación abierta sobre DATABASE_PATH (se reabre
+            sobre la base restaurada sin reiniciar)
+    """
+    temp_restore = _restore_temp_path()
     try:
         if verbose:
             print("=" * 50)
@@ -219,35 +477,30 @@ def restore_backup(backup_file, verbose=True):
                 print(error_msg)
             return False, error_msg
         
-        # Crear backup de la base de datos actual antes de restaurar
-        if os.path.exists(DATABASE_PATH):
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            pre_restore_backup = os.path.join(BACKUP_DIR, f"pre_restore_{timestamp}.db")
-            shutil.copy2(DATABASE_PATH, pre_restore_backup)
-            if verbose:
-                print(f"✅ Backup pre-restauración creado: {pre_restore_backup}")
-        
-        # Restaurar el backup
         if verbose:
             print(f"🔄 Restaurando desde: {backup_file}")
             print(f"📊 Tamaño del backup: {backup_size:,} bytes")
         
-        shutil.copy2(backup_file, DATABASE_PATH)
-        
-        # Verificar que la restauración fue exitosa
-        if not os.path.exists(DATABASE_PATH):
-            error_msg = "❌ Error: No se pudo restaurar la base de datos"
+        # La copia se arma en un temporal junto a la base de datos
+        if is_snapshot(backup_file) or is_delta(backup_file):
+            backup_dir = os.path.dirname(os.path.abspath(backup_file))
+            if is_delta(backup_file):
+                chain = BackupCatalog(backup_dir).chain_for(backup_file)
+            else:
+                chain = [os.path.basename(backup_file)]
             if verbose:
-                print(error_msg)
-            return False, error_msg
+                print(f"🧩 Reconstruyendo base de datos: {' + '.join(chain)}")
+            materialize_chain(chain, temp_restore, backup_dir)
+        else:
+            online_backup(backup_file, temp_restore, pages=-1, sleep=0)
         
-        restored_size = os.path.getsize(DATABASE_PATH)
-        if restored_size == 0:
-            error_msg = "❌ Error: Base de datos restaurada pero está vacía"
+        error_msg = _install_database(temp_restore, verbose, db)
+        if error_msg:
             if verbose:
                 print(error_msg)
             return False, error_msg
         
+        restored_size = os.path.getsize(DATABASE_PATH)
         if verbose:
             print(f"✅ Restauración completada exitosamente!")
             print(f"📊 Base de datos restaurada: {DATABASE_PATH}")
@@ -260,6 +513,121 @@ def restore_backup(backup_file, verbose=True):
         if verbose:
             print(error_msg)
         return False, error_msg
+    finally:
+        if os.path.exists(temp_restore):
+            os.remove(temp_restore)
+
+
+def resolve_log_id(conn, until):
+    """
+    log_id del último cambio registrado hasta until
+    
+    Args:
+        until: log_id (int), o fecha y hora local (datetime o texto ISO 8601)
+    """
+    if isinstance(until, int):
+        return until
+    if isinstance(until, str):
+        until = datetime.fromisoformat(until)
+    # change_date se guarda con CURRENT_TIMESTAMP de SQLite, que está en UTC
+    utc = until.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    row = conn.execute('SELECT MAX(log_id) FROM ChangeLogs WHERE change_date <= ?', (utc,)).fetchone()
+    return row[0] or 0
+
+
+def base_for_point(catalog, log_id):
+    """Backup más reciente del catálogo que no incluye cambios posteriores a log_id"""
+    for entry in reversed(catalog.entries()):
+        if not entry.fingerprint or (entry.fingerprint[1] or 0) > log_id:
+            continue
+        if os.path.isfile(catalog.path_for(entry)):
+            return entry
+    return None
+
+
+def restore_point_in_time(until, verbose=True, db=None):
+    """
+    Restaura la base de datos al estado que tenía en un punto del historial
+    
+    Parte del backup más reciente anterior a ese punto y reproduce encima los
+    cambios de ChangeLogs de la base en uso (change_data guarda cada fila),
+    todos en una sola transacción. Sirve para deshacer, por ejemplo, una baja
+    masiva accidental sin perder lo registrado desde el último backup.
+    
+    Args:
+        until: log_id del último cambio a conservar, o fecha y hora local
+        db: Database de la aplicación (ver restore_backup)
+    
+    Returns:
+        (éxito, ruta de la base de datos o mensaje de error)
+    """
+    temp_restore = _restore_temp_path()
+    try:
+        if verbose:
+            print("=" * 50)
+            print("🔄 RESTAURACIÓN A UN PUNTO EN EL TIEMPO")
+            print("=" * 50)
+        
+        conn = _connect_readonly(DATABASE_PATH)
+        try:
+            last_log_id = conn.execute('SELECT MAX(log_id) FROM ChangeLogs').fetchone()[0] or 0
+            target = min(resolve_log_id(conn, until), last_log_id)
+            
+            catalog = BackupCatalog(BACKUP_DIR)
+            entry = base_for_point(catalog, target)
+            if entry is None:
+                error_msg = f"❌ Error: No hay un backup anterior al cambio {target}"
+                if verbose:
+                    print(error_msg)
+                return False, error_msg
+            
+            chain = catalog.chain_for(entry.file)
+            if verbose:
+                print(f"🧩 Reconstruyendo base de datos: {' + '.join(chain)}")
+            materialize_chain(chain, temp_restore, BACKUP_DIR)
+            
+            restored = sqlite3.connect(temp_restore, isolation_level=None)
+            try:
+                base_log_id = read_fingerprint(restored)[1] or 0
+                # El último log del backup debe ser el mismo en la base en uso
+                check = 'SELECT device_id, action, change_date FROM ChangeLogs WHERE log_id = ?'
+                if base_log_id and (restored.execute(check, (base_log_id,)).fetchone() !=
+                                    conn.execute(check, (base_log_id,)).fetchone()):
+                    raise ValueError("El historial de cambios no continúa el del backup base")
+                
+                log_columns = [column[1] for column in restored.execute('PRAGMA table_info(ChangeLogs)')]
+                delta = journal_delta(conn, base_log_id, target, log_columns)
+                if verbose:
+                    print(f"📝 Reproduciendo {len(delta['logs']):,} cambios "
+                          f"(logs {base_log_id + 1} a {target})")
+                apply_delta(restored, delta)
+                
+                reached = read_fingerprint(restored)[1] or 0
+                if reached != target:
+                    raise ValueError(f"El historial termina en el cambio {reached}, no en {target}")
+            finally:
+                restored.close()
+        finally:
+            conn.close()
+        
+        error_msg = _install_database(temp_restore, verbose, db)
+        if error_msg:
+            if verbose:
+                print(error_msg)
+            return False, error_msg
+        
+        if verbose:
+            print(f"✅ Base de datos restaurada hasta el cambio {target}")
+        return True, DATABASE_PATH
+    
+    except Exception as e:
+        error_msg = f"❌ Error al restaurar a un punto en el tiempo: {str(e)}"
+        if verbose:
+            print(error_msg)
+        return False, error_msg
+    finally:
+        if os.path.exists(temp_restore):
+            os.remove(temp_restore)
 
 
 if __name__ == "__main__":
@@ -267,7 +635,13 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description="Herramienta de backup/restauración de base de datos")
     parser.add_argument("--backup", action="store_true", help="Crear backup")
+    parser.add_argument("--if-changed", action="store_true",
+                        help="Con --backup: omitir si la base de datos no cambió desde el último backup")
     parser.add_argument("--restore", type=str, help="Restaurar desde archivo específico")
+    parser.add_argument("--restore-to", type=str, metavar="FECHA",
+                        help="Restaurar al estado de una fecha y hora local (ej. '2024-01-15 10:30')")
+    parser.add_argument("--restore-to-log", type=int, metavar="LOG_ID",
+                        help="Restaurar hasta un log de ChangeLogs (inclusive)")
     parser.add_argument("--list", action="store_true", help="Listar backups disponibles")
     parser.add_argument("--cleanup", action="store_true", help="Limpiar backups antiguos")
     parser.add_argument("--quiet", action="store_true", help="Modo silencioso")
@@ -277,6 +651,11 @@ if __name__ == "__main__":
     verbose = not args.quiet
     
     if args.backup:
+        if args.if_changed and backup_is_current():
+            if verbose:
+                print("ℹ️  Sin cambios desde el último backup, no se crea uno nuevo")
+            sys.exit(0)
+        
         success, result = backup_database(verbose=verbose)
         if success:
             if verbose:
@@ -291,8 +670,12 @@ if __name__ == "__main__":
                 print("=" * 50)
             sys.exit(1)
     
-    elif args.restore:
-        success, result = restore_backup(args.restore, verbose=verbose)
+    elif args.restore or args.restore_to or args.restore_to_log is not None:
+        if args.restore:
+            success, result = restore_backup(args.restore, verbose=verbose)
+        else:
+            until = args.restore_to_log if args.restore_to_log is not None else args.restore_to
+            success, result = restore_point_in_time(until, verbose=verbose)
         if success:
             if verbose:
                 print("\n" + "=" * 50)
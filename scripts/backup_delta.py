@@ -0,0 +1,256 @@
+"""
+Backups incrementales a partir de ChangeLogs
+
+Un delta guarda solo lo que cambió desde el backup anterior: las filas de
+ChangeLogs nuevas (log_id mayor que el último respaldado) y el estado final
+de cada dispositivo que aparece en ellas (la fila actual, o su baja si ya no
+existe). Para restaurar se parte del backup completo base y se aplican los
+deltas de la cadena en orden.
+
+El archivo .delta es JSON comprimido con zlib. journal_delta arma el mismo
+delta a partir de ChangeLogs.change_data de la base en uso, para restaurar a
+un punto en el tiempo.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import zlib
+
+from scripts.backup_store import is_snapshot, restore_snapshot
+from src.migrations import create_fulltext_triggers
+
+
+DELTA_SUFFIX = ".delta"
+DELTA_VERSION = 1
+
+# A partir de cuántos dispositivos tocados conviene reconstruir el índice FTS
+# una vez al final en lugar de actualizarlo fila a fila con los triggers
+FTS_REBUILD_THRESHOLD = 2000
+
+
+def is_delta(backup_file):
+    return str(backup_file).endswith(DELTA_SUFFIX)
+
+
+def read_fingerprint(conn):
+    """Huella de cambios leída dentro de la transacción actual (ver database_fingerprint)"""
+    user_version = conn.execute('PRAGMA user_version').fetchone()[0]
+    row = conn.execute("""SELECT (SELECT MAX(log_id) FROM ChangeLogs),
+                                 (SELECT seq FROM sqlite_sequence WHERE name = 'DeviceReg'),
+                                 (SELECT COUNT(*) FROM DeviceReg)""").fetchone()
+    return [user_version] + list(row)
+
+
+def create_delta(conn, delta_file, base_file, previous_fingerprint):
+    """
+    Escribe un delta con los cambios posteriores a previous_fingerprint
+
+    Args:
+        conn: Conexión (de solo lectura) a la base de datos en uso
+        base_file: Nombre del backup completo sobre el que se aplica la cadena
+        previous_fingerprint: Huella del último backup de la cadena
+
+    Returns:
+        dict con la huella nueva y la cantidad de logs y dispositivos, o None si
+        los logs no explican todos los cambios (hace falta un backup completo)
+    """
+    since_log_id = previous_fingerprint[1] or 0
+    conn.execute('BEGIN')
+    try:
+        # Una sola transacción de lectura: logs, filas y huella son del mismo instante
+        fingerprint = read_fingerprint(conn)
+        if fingerprint[0] != previous_fingerprint[0] or (fingerprint[1] or 0) < since_log_id:
+            # Cambió el esquema o la base de datos fue reemplazada
+            return None
+
+        cur = conn.execute('SELECT * FROM ChangeLogs WHERE log_id > ? ORDER BY log_id', (since_log_id,))
+        log_columns = [column[0] for column in cur.description]
+        logs = cur.fetchall()
+
+        # Cada alta suma una fila y cada baja la resta; si no cuadra hubo cambios sin log
+        inserts = sum(1 for log in logs if log[2] == 'INSERT')
+        deletes = sum(1 for log in logs if log[2] == 'DELETE')
+        if previous_fingerprint[3] + inserts - deletes != fingerprint[3]:
+            return None
+
+        touched = sorted({log[1] for log in logs if log[1] is not None})
+        rows = []
+        device_columns = None
+        for start in range(0, len(touched), 500):
+            chunk = touched[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cur = conn.execute(f'SELECT * FROM DeviceReg WHERE id IN ({placeholders})', chunk)
+            device_columns = [column[0] for column in cur.description]
+            rows.extend(cur.fetchall())
+    finally:
+        conn.rollback()
+
+    existing = {row[0] for row in rows}
+    delta = {
+        "version": DELTA_VERSION,
+        "base": os.path.basename(base_file),
+        "from_log_id": since_log_id,
+        "fingerprint": fingerprint,
+        "log_columns": log_columns,
+        "logs": [list(log) for log in logs],
+        "device_columns": device_columns,
+        "rows": [list(row) for row in rows],
+        "deleted": [device_id for device_id in touched if device_id not in existing],
+    }
+
+    temp_file = delta_file + ".tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(zlib.compress(json.dumps(delta, ensure_ascii=False).encode('utf-8')))
+    os.replace(temp_file, delta_file)
+
+    return {
+        "fingerprint": fingerprint,
+        "logs": len(logs),
+        "devices": len(touched),
+    }
+
+
+def load_delta(delta_file):
+    with open(delta_file, 'rb') as f:
+        return json.loads(zlib.decompress(f.read()).decode('utf-8'))
+
+
+def journal_delta(conn, after_log_id, until_log_id, log_columns=None):
+    """
+    Delta con los cambios de ChangeLogs en (after_log_id, until_log_id]
+
+    A diferencia de create_delta no lee DeviceReg: el estado de cada
+    dispositivo sale de change_data de su último log en el rango, así que
+    sirve para reproducir la historia hasta un punto anterior al actual.
+
+    Args:
+        conn: Conexión a la base de datos que tiene el historial
+        log_columns: Columnas de ChangeLogs a copiar (las que tenga la base restaurada)
+
+    Raises:
+        ValueError: si algún log del rango no tiene change_data
+    """
+    cur = conn.execute('SELECT * FROM ChangeLogs WHERE log_id > ? AND log_id <= ? ORDER BY log_id',
+                       (after_log_id, until_log_id))
+    columns = [column[0] for column in cur.description]
+    if 'change_data' not in columns:
+        raise ValueError("ChangeLogs no guarda los datos de cada cambio (falta la migración 4)")
+    data_index = columns.index('change_data')
+    logs = cur.fetchall()
+
+    # Solo importa el último log de cada dispositivo
+    last = {}
+    for log in logs:
+        if log[data_index] is None:
+            raise ValueError(f"El log {log[0]} no tiene datos del cambio, no se puede reproducir")
+        last[log[1]] = log
+
+    rows = []
+    deleted = []
+    device_columns = None
+    for device_id, log in last.items():
+        if log[2] == 'DELETE':
+            deleted.append(device_id)
+            continue
+        data = json.loads(log[data_index])
+        device_columns = device_columns or list(data)
+        rows.append([data[column] for column in device_columns])
+
+    keep = [i for i, column in enumerate(columns) if log_columns is None or column in log_columns]
+    return {
+        "version": DELTA_VERSION,
+        "from_log_id": after_log_id,
+        "fingerprint": None,
+        "sequence": max(last, default=None),
+        "log_columns": [columns[i] for i in keep],
+        "logs": [[log[i] for i in keep] for log in logs],
+        "device_columns": device_columns,
+        "rows": rows,
+        "deleted": deleted,
+    }
+
+
+def apply_delta(conn, delta):
+    """
+    Aplica un delta sobre una copia restaurada, en una transacción
+
+    Los dispositivos tocados se eliminan y se vuelven a insertar con su estado
+    final, así los triggers del índice FTS se mantienen y no hay choques de
+    serial intermedios. Con muchos dispositivos (ver FTS_REBUILD_THRESHOLD) el
+    índice se reconstruye una sola vez al final.
+    """
+    touched = [row[0] for row in delta["rows"]] + delta["deleted"]
+    rebuild_fulltext = len(touched) >= FTS_REBUILD_THRESHOLD and conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'DeviceReg_fts_insert'").fetchone()
+    try:
+        conn.execute('BEGIN')
+        if rebuild_fulltext:
+            # Los DROP son parte de la transacción: si algo falla, el rollback los deshace
+            for trigger in ('DeviceReg_fts_insert', 'DeviceReg_fts_delete', 'DeviceReg_fts_update'):
+                conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        for start in range(0, len(touched), 500):
+            chunk = touched[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            conn.execute(f'DELETE FROM DeviceReg WHERE id IN ({placeholders})', chunk)
+
+        if delta["rows"]:
+            columns = delta["device_columns"]
+            conn.executemany(
+                f'INSERT INTO DeviceReg ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                delta["rows"])
+
+        if delta["logs"]:
+            columns = delta["log_columns"]
+            conn.executemany(
+                f'INSERT OR IGNORE INTO ChangeLogs ({", ".join(columns)}) '
+                f'VALUES ({", ".join("?" * len(columns))})',
+                delta["logs"])
+
+        # Los ids de altas que luego se dieron de baja no deben reutilizarse
+        seq = delta["fingerprint"][2] if delta.get("fingerprint") else delta.get("sequence")
+        if seq is not None:
+            cur = conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'DeviceReg'", (seq,))
+            if cur.rowcount == 0:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('DeviceReg', ?)", (seq,))
+
+        if rebuild_fulltext:
+            create_fulltext_triggers(conn)
+            conn.execute("INSERT INTO DeviceFTS (DeviceFTS) VALUES ('rebuild')")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def materialize_chain(chain, dest_file, backup_dir):
+    """
+    Reconstruye en dest_file la base de datos de una cadena [base, delta, delta, ...]
+
+    Raises:
+        ValueError: si la cadena no empieza con un backup completo o el
+                    resultado no coincide con la huella del último delta
+    """
+    base, deltas = chain[0], chain[1:]
+    if is_delta(base):
+        raise ValueError("La cadena de backups no tiene backup completo base")
+
+    base_path = os.path.join(backup_dir, base)
+    if is_snapshot(base_path):
+        restore_snapshot(base_path, dest_file)
+    else:
+        shutil.copyfile(base_path, dest_file)
+
+    if not deltas:
+        return
+
+    conn = sqlite3.connect(dest_file, isolation_level=None)
+    try:
+        delta = None
+        for name in deltas:
+            delta = load_delta(os.path.join(backup_dir, name))
+            apply_delta(conn, delta)
+        if read_fingerprint(conn) != delta["fingerprint"]:
+            raise ValueError("La base reconstruida no coincide con el último backup incremental")
+    finally:
+        conn.close()
@@ -0,0 +1,211 @@
+"""
+Almacén de backups comprimido y deduplicado
+
+Cada backup se parte en bloques de tamaño fijo (múltiplo del tamaño de página
+de SQLite). Cada bloque distinto se guarda una sola vez, comprimido con zlib,
+con su sha256 como nombre; el backup en sí es un manifiesto pequeño (.snap)
+con la lista de bloques. En una base de datos que cambia poco, diez backups
+ocupan apenas más que uno: solo se escriben los bloques con páginas nuevas.
+
+    backups/
+        bodega_backup_20240115_103000.snap   (manifiesto JSON)
+        chunks/ab/ab12...ef.z                (bloques comprimidos)
+"""
+import hashlib
+import json
+import os
+import zlib
+
+
+SNAPSHOT_SUFFIX = ".snap"
+SNAPSHOT_VERSION = 1
+
+# Subdirectorio de BACKUP_DIR con los bloques comprimidos
+CHUNKS_DIR = "chunks"
+
+# 64 KiB = 16 páginas de 4 KiB: un cambio en una página reescribe un solo bloque
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+
+# Bloque de lectura al descomprimir (bytes)
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class ChunkStore:
+    """Bloques comprimidos direccionados por su sha256"""
+
+    def __init__(self, root, compression_level=DEFAULT_COMPRESSION_LEVEL):
+        self.root = str(root)
+        self.compression_level = compression_level
+
+    def chunk_path(self, digest):
+        # Dos niveles para no tener decenas de miles de archivos en un directorio
+        return os.path.join(self.root, digest[:2], digest + ".z")
+
+    def put(self, data):
+        """
+        Guarda un bloque si todavía no existe
+
+        Returns:
+            (digest, bytes escritos en disco; 0 si el bloque ya estaba)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zlib.compress(data, self.compression_level)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(temp_path, path)
+        return digest, len(compressed)
+
+    def iter_chunk(self, digest):
+        """Devuelve el contenido de un bloque descomprimiéndolo por partes"""
+        decompressor = zlib.decompressobj()
+        with open(self.chunk_path(digest), 'rb') as f:
+            for block in iter(lambda: f.read(READ_BLOCK_SIZE), b''):
+                data = decompressor.decompress(block)
+                if data:
+                    yield data
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+        if not decompressor.eof:
+            raise ValueError(f"Bloque incompleto: {digest}")
+
+    def digests(self):
+        """Todos los bloques guardados"""
+        if not os.path.isdir(self.root):
+            return
+        for prefix in os.scandir(self.root):
+            if not prefix.is_dir():
+                continue
+            for item in os.scandir(prefix.path):
+                if item.name.endswith(".z"):
+                    yield item.name[:-2]
+
+    def collect_garbage(self, referenced):
+        """
+        Elimina los bloques que ya no usa ningún backup
+
+        Returns:
+            (cantidad eliminada, bytes liberados)
+        """
+        removed = 0
+        freed = 0
+        for digest in list(self.digests()):
+            if digest in referenced:
+                continue
+            path = self.chunk_path(digest)
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+            freed += size
+        return removed, freed
+
+
+def is_snapshot(backup_file):
+    return str(backup_file).endswith(SNAPSHOT_SUFFIX)
+
+
+def store_for(snapshot_file):
+    """Almacén de bloques que corresponde a un manifiesto (mismo directorio)"""
+    return ChunkStore(os.path.join(os.path.dirname(os.path.abspath(snapshot_file)), CHUNKS_DIR))
+
+
+def load_snapshot(snapshot_file):
+    """Lee el manifiesto de un backup"""
+    with open(snapshot_file, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def create_snapshot(db_file, snapshot_file, store=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Guarda un archivo de base de datos como manifiesto + bloques deduplicados
+
+    Returns:
+        dict con size (bytes del original), chunks, new_chunks y stored_bytes
+        (bytes nuevos escritos en el almacén)
+    """
+    store = store or store_for(snapshot_file)
+    digest = hashlib.sha256()
+    chunks = []
+    new_chunks = 0
+    stored_bytes = 0
+    size = 0
+
+    with open(db_file, 'rb') as f:
+        for data in iter(lambda: f.read(chunk_size), b''):
+            chunk_digest, written = store.put(data)
+            chunks.append(chunk_digest)
+            digest.update(data)
+            size += len(data)
+            if written:
+                new_chunks += 1
+                stored_bytes += written
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "size": size,
+        "chunk_size": chunk_size,
+        "sha256": digest.hexdigest(),
+        "chunks": chunks,
+    }
+    temp_file = snapshot_file + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(temp_file, snapshot_file)
+
+    return {
+        "size": size,
+        "chunks": len(chunks),
+        "new_chunks": new_chunks,
+        "stored_bytes": stored_bytes,
+    }
+
+
+def restore_snapshot(snapshot_file, dest_file, store=None):
+    """
+    Reconstruye el archivo de base de datos de un backup
+
+    Los bloques se descomprimen y escriben de a uno; el resultado se compara
+    con el sha256 del manifiesto antes de devolverlo.
+
+    Raises:
+        ValueError: si falta un bloque o el resultado no coincide
+    """
+    store = store or store_for(snapshot_file)
+    snapshot = load_snapshot(snapshot_file)
+    digest = hashlib.sha256()
+    size = 0
+
+    with open(dest_file, 'wb') as out:
+        for chunk_digest in snapshot["chunks"]:
+            try:
+                for data in store.iter_chunk(chunk_digest):
+                    out.write(data)
+                    digest.update(data)
+                    size += len(data)
+            except FileNotFoundError:
+                raise ValueError(f"Falta el bloque {chunk_digest} del backup")
+
+    if size != snapshot["size"] or digest.hexdigest() != snapshot["sha256"]:
+        raise ValueError("El archivo reconstruido no coincide con el backup")
+    return size
+
+
+def referenced_chunks(snapshot_files):
+    """Bloques usados por un conjunto de manifiestos"""
+    referenced = set()
+    for snapshot_file in snapshot_files:
+        try:
+            referenced.update(load_snapshot(snapshot_file)["chunks"])
+        except FileNotFoundError:
+            continue
+    return referenced
@@ -0,0 +1,148 @@
+"""
+Benchmark de escritura: commits por segundo con cada perfil de conexión
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Añadir el directorio raíz al path para importaciones
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import MEMORY_DATABASE, PRAGMA_PROFILES, Database
+from src.write_queue import WriteQueue
+
+
+DEFAULT_COMMITS = 2000
+# Hilos que piden altas a la vez a la cola de escritura
+DEFAULT_PRODUCERS = 8
+# None = valores por defecto de SQLite (diario de rollback, synchronous=FULL)
+PROFILES = [None] + list(PRAGMA_PROFILES)
+
+
+def time_commits(db, commits):
+    """Altas de a una (un commit cada una); devuelve commits por segundo"""
+    start = time.perf_counter()
+    for i in range(commits):
+        db.add_device("UP01", f"COMMIT{i:07d}", "Laptop", "Dell XPS 13", "[0] Sin fallas", "Benchmark")
+    return commits / (time.perf_counter() - start)
+
+
+def time_write_queue(db, commits, producers=DEFAULT_PRODUCERS):
+    """
+    Las mismas altas pedidas por varios hilos a una WriteQueue
+
+    Devuelve (altas por segundo, commits realizados).
+    """
+    writes = WriteQueue(db)
+    writes.start()
+
+    def producer(offset):
+        futures = [writes.add_device("UP03", f"QUEUE{i:07d}", "Laptop", "Dell XPS 13",
+                                     "[0] Sin fallas", "Benchmark")
+                   for i in range(offset, commits, producers)]
+        for future in futures:
+            future.result()
+
+    threads = [threading.Thread(target=producer, args=(n,)) for n in range(producers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    writes.close()
+    return commits / elapsed, writes.commits
+
+
+def time_reads_during_writes(db_path, pragmas, duration=1.0):
+    """
+    Consultas completadas por un lector mientras otro hilo escribe
+
+    Con el diario de rollback el lector espera cada commit; con WAL lee la
+    última versión confirmada sin esperar.
+    """
+    stop = threading.Event()
+
+    def writer():
+        db = Database(db_path, profile=pragmas)
+        i = 0
+        while not stop.is_set():
+            db.add_device("UP02", f"WRITER{i:07d}", "Tablet", "iPad Pro", "[0] Sin fallas", "")
+            i += 1
+        db.close()
+
+    # Sin caché de consultas: entre dos commits el conteo se respondería de memoria
+    reader = Database(db_path, profile=pragmas, cache_rows=0)
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reads = 0
+    try:
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            reader.count_devices()
+            reads += 1
+    finally:
+        stop.set()
+        thread.join()
+        reader.close()
+    return reads / duration
+
+
+def run_benchmark(commits=DEFAULT_COMMITS, db_dir=None, memory=False):
+    """
+    Mide cada perfil sobre una base de datos nueva
+
+    Args:
+        db_dir: Directorio de las bases temporales (p. ej. un tmpfs como /dev/shm)
+        memory: Usar ':memory:' (mide solo el costo de CPU, sin disco)
+    """
+    results = []
+    for profile in PROFILES:
+        label = profile or "sqlite"
+        tmpdir = None if memory else tempfile.mkdtemp(dir=db_dir)
+        path = MEMORY_DATABASE if memory else os.path.join(tmpdir, 'bench.db')
+
+        # Silenciar los print de la base de datos durante la medición
+        with open(os.devnull, 'w') as devnull:
+            stdout = sys.stdout
+            sys.stdout = devnull
+            try:
+                db = Database(path, profile=profile)
+                try:
+                    rate = time_commits(db, commits)
+                    queued, batches = time_write_queue(db, commits)
+                finally:
+                    db.close()
+                reads = None if memory else time_reads_during_writes(path, db.pragmas)
+            finally:
+                sys.stdout = stdout
+                if tmpdir:
+                    for filename in os.listdir(tmpdir):
+                        os.remove(os.path.join(tmpdir, filename))
+                    os.rmdir(tmpdir)
+
+        results.append((label, rate, queued, reads))
+        line = f"   {label + ':':<12} {rate:9.0f} commits/s | {queued:9.0f} altas/s con cola ({batches} commits)"
+        if reads is not None:
+            line += f" | {reads:9.0f} lecturas/s durante escrituras"
+        print(line)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de commits por perfil de conexión")
+    parser.add_argument("--commits", type=int, default=DEFAULT_COMMITS, help="Altas a realizar")
+    parser.add_argument("--db-dir", help="Directorio para las bases temporales (p. ej. /dev/shm)")
+    parser.add_argument("--memory", action="store_true", help="Usar una base de datos en memoria")
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📊 BENCHMARK DE ESCRITURA POR PERFIL DE CONEXIÓN")
+    print("=" * 60)
+    run_benchmark(args.commits, args.db_dir, args.memory)
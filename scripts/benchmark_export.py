@@ -0,0 +1,108 @@
+"""
+Benchmark de exportación: DataFrame + to_excel contra los exportadores en
+streaming (openpyxl write-only, CSV y JSON Lines) desde el cursor
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Añadir el directorio raíz al path para importaciones
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import Database
+from src.export import (EXPORT_COLUMNS, export_rows_csv, export_rows_ndjson, export_rows_xlsx,
+                        format_export_row)
+from scripts.benchmark_search import populate
+
+
+def export_dataframe(db, filepath):
+    """Ruta anterior: lista de tuplas -> DataFrame -> to_excel"""
+    import pandas as pd
+
+    data = [format_export_row(row) for row in db.get_all_devices()]
+    df = pd.DataFrame(data, columns=EXPORT_COLUMNS)
+    df.to_excel(filepath, index=False, engine='openpyxl')
+    return len(data)
+
+
+def export_streaming(db, filepath):
+    """Ruta nueva: cursor -> libro write-only"""
+    return export_rows_xlsx(db.iter_devices(), filepath)
+
+
+def export_csv(db, filepath):
+    """Cursor -> CSV con búfer"""
+    return export_rows_csv(db.iter_devices(), filepath)
+
+
+def export_ndjson(db, filepath):
+    """Cursor -> JSON Lines"""
+    return export_rows_ndjson(db.iter_devices(), filepath)
+
+
+# (etiqueta, función, archivo de salida)
+EXPORTERS = [
+    ("DataFrame", export_dataframe, "df.xlsx"),
+    ("Write-only", export_streaming, "stream.xlsx"),
+    ("CSV", export_csv, "stream.csv"),
+    ("NDJSON", export_ndjson, "stream.ndjson"),
+]
+
+
+def measure(func, db, filepath):
+    """Devuelve (segundos, pico de memoria en MiB) de una exportación"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(db, filepath)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def run_benchmark(rows=100_000, db_dir=None):
+    """Compara ambas rutas sobre la misma base de datos (db_dir: p. ej. un tmpfs)"""
+    tmpdir = tempfile.mkdtemp(dir=db_dir)
+    # Sin caché de consultas: cada exportador lee de SQLite, no de lo que dejó el anterior
+    db = Database(db_name=os.path.join(tmpdir, 'bench.db'), cache_rows=0)
+    try:
+        print(f"🔄 Generando {rows:,} dispositivos...")
+        populate(db, rows)
+
+        # Silenciar los print de la base de datos durante la medición
+        results = []
+        with open(os.devnull, 'w') as devnull:
+            stdout = sys.stdout
+            sys.stdout = devnull
+            try:
+                for label, func, filename in EXPORTERS:
+                    results.append((label,) + measure(func, db, os.path.join(tmpdir, filename)))
+            finally:
+                sys.stdout = stdout
+
+        for label, elapsed, peak in results:
+            print(f"   {label + ':':<12} {elapsed:7.2f} s | pico {peak:8.1f} MiB")
+        return results
+    finally:
+        db.close()
+        for filename in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, filename))
+        os.rmdir(tmpdir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de exportación a Excel")
+    parser.add_argument("--rows", type=int, default=100_000, help="Cantidad de filas")
+    parser.add_argument("--db-dir", help="Directorio para los archivos temporales (p. ej. /dev/shm)")
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📊 BENCHMARK DE EXPORTACIÓN: DataFrame vs streaming")
+    print("=" * 60)
+    run_benchmark(args.rows, args.db_dir)
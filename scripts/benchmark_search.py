@@ -0,0 +1,122 @@
+"""
+Benchmark de búsqueda: índice FTS5 (trigram) contra el recorrido con LIKE
+"""
+import os
+import sys
+import random
+import string
+import tempfile
+import time
+from pathlib import Path
+
+# Añadir el directorio raíz al path para importaciones
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.database import Database
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+TYPES = ["Laptop", "Desktop", "Tablet", "Monitor", "Impresora"]
+MODELS = ["Dell XPS 13", "Dell OptiPlex", "HP EliteBook", "Lenovo ThinkPad", "iPad Pro"]
+PLANTS = ["UP01", "UP02", "UP03"]
+
+
+def _random_serial(rng):
+    return ''.join(rng.choices(string.ascii_uppercase + string.digits, k=12))
+
+
+def populate(db, rows, seed=42, batch=50_000):
+    """Llena la base de datos con dispositivos sintéticos"""
+    rng = random.Random(seed)
+    serials = []
+    inserted = 0
+    while inserted < rows:
+        size = min(batch, rows - inserted)
+        data = []
+        for _ in range(size):
+            serial = _random_serial(rng)
+            serials.append(serial)
+            data.append((rng.choice(PLANTS), serial, rng.choice(TYPES),
+                         rng.choice(MODELS), "[0] Sin fallas", "Benchmark"))
+        with db.write() as cur:
+            cur.executemany('''INSERT OR IGNORE INTO DeviceReg
+                               (plant, serialno, type, model, failuretype, observations)
+                               VALUES (?, ?, ?, ?, ?, ?)''', data)
+        inserted += size
+    return serials
+
+
+def time_searches(db, terms, search_by, use_fts):
+    """Ejecuta las búsquedas y devuelve el tiempo medio en milisegundos"""
+    fts_enabled = db.fts_enabled
+    db.fts_enabled = fts_enabled and use_fts
+    try:
+        start = time.perf_counter()
+        for term in terms:
+            db.search_device(term, search_by)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.fts_enabled = fts_enabled
+    return elapsed * 1000 / len(terms)
+
+
+def run_benchmark(sizes=None, queries=20, search_by="serialno", db_dir=None):
+    """Compara LIKE y FTS5 para cada tamaño de tabla (db_dir: p. ej. un tmpfs)"""
+    sizes = sizes or DEFAULT_SIZES
+    rng = random.Random(7)
+    results = []
+
+    for rows in sizes:
+        fd, path = tempfile.mkstemp(suffix='.db', dir=db_dir)
+        os.close(fd)
+        # Sin caché de consultas: la pasada FTS5 repite los términos de la de LIKE
+        # y sin ninguna escritura en medio solo mediría aciertos de la caché
+        db = Database(db_name=path, cache_rows=0)
+        try:
+            if not db.fts_enabled:
+                print("❌ FTS5 no disponible en este SQLite, no hay nada que comparar")
+                return results
+
+            print(f"🔄 Generando {rows:,} dispositivos...")
+            serials = populate(db, rows)
+            # Subcadenas de seriales existentes, como las teclea un operador
+            terms = [s[2:8] for s in rng.sample(serials, queries)]
+
+            # Silenciar los print de search_device durante la medición
+            with open(os.devnull, 'w') as devnull:
+                stdout = sys.stdout
+                sys.stdout = devnull
+                try:
+                    like_ms = time_searches(db, terms, search_by, use_fts=False)
+                    fts_ms = time_searches(db, terms, search_by, use_fts=True)
+                finally:
+                    sys.stdout = stdout
+
+            results.append((rows, like_ms, fts_ms))
+            print(f"   LIKE: {like_ms:8.2f} ms/búsqueda | FTS5: {fts_ms:8.2f} ms/búsqueda "
+                  f"| x{like_ms / fts_ms:.1f}")
+        finally:
+            db.close()
+            os.unlink(path)
+
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda LIKE vs FTS5")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Cantidad de filas a probar")
+    parser.add_argument("--queries", type=int, default=20, help="Búsquedas por tamaño")
+    parser.add_argument("--by", default="serialno",
+                        choices=["serialno", "type", "model", "plant", "all"],
+                        help="Modo de búsqueda")
+    parser.add_argument("--db-dir", help="Directorio para las bases temporales (p. ej. /dev/shm)")
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📊 BENCHMARK DE BÚSQUEDA: LIKE vs FTS5 (trigram)")
+    print("=" * 60)
+    run_benchmark(args.sizes, args.queries, args.by, args.db_dir)
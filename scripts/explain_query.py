@@ -0,0 +1,46 @@
+"""
+Muestra cómo se ejecuta una consulta del lenguaje de búsqueda
+
+    python scripts/explain_query.py "plant:UP02 type:Laptop failure:3 date:2024-01..2024-03"
+
+Imprime el SQL generado, sus parámetros, el plan de SQLite (EXPLAIN QUERY
+PLAN) y la cantidad de resultados.
+"""
+import sys
+from pathlib import Path
+
+# Añadir el directorio raíz al path para importaciones
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from src.database import Database
+from src.query_language import QuerySyntaxError
+
+
+def explain(query, db_path=settings.DATABASE_PATH):
+    """Imprime SQL, parámetros, plan y conteo de la consulta; devuelve False si no es válida"""
+    with Database(db_path) as db:
+        try:
+            sql, params, plan = db.explain_query(query)
+        except QuerySyntaxError as e:
+            print(f"❌ {e}")
+            return False
+
+        print(f"\nSQL:\n   {sql}")
+        print(f"\nParámetros:\n   {params}")
+        print("\nPlan:")
+        for line in plan:
+            print(f"   {line}")
+        print(f"\nℹ️ Resultados: {db.count_devices(query, 'query')}")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plan de ejecución de una consulta de búsqueda")
+    parser.add_argument("query", help='Consulta, p. ej. "plant:UP02 type:Laptop serial:AB12*"')
+    parser.add_argument("--db", default=settings.DATABASE_PATH, help="Base de datos a consultar")
+
+    args = parser.parse_args()
+    sys.exit(0 if explain(args.query, args.db) else 1)
@@ -0,0 +1,327 @@
+"""
+Script para importar dispositivos desde planillas Excel (.xlsx) o CSV
+
+Las filas se leen en streaming (openpyxl en modo read-only / csv.reader) y se
+insertan por lotes con Database.add_devices_bulk, de modo que la memoria usada
+no depende del tamaño del archivo. Los duplicados se detectan contra el índice
+UNIQUE de serialno en cada lote, lo que también cubre seriales repetidos en
+lotes anteriores del mismo archivo sin mantener un conjunto en memoria.
+"""
+import csv
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+# Añadir el directorio raíz al path para importaciones
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import settings
+from src.database import PRAGMA_PROFILES, Database
+from src.utils import validate_serial_number, validate_device_inputs
+
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Perfil de conexión de la importación. Con la caché por defecto (2 MiB) las
+# fusiones de segmentos del índice FTS5 releen disco en cada lote y el tiempo
+# por lote crece con el tamaño de la tabla; bulk-load usa 256 MiB y no hace
+# fsync en cada lote.
+IMPORT_PROFILE = "bulk-load"
+DEFAULT_FAILURE_TYPE = "[0] Sin fallas"
+
+# Encabezados aceptados para cada columna de DeviceReg (en minúsculas)
+HEADER_ALIASES = {
+    'plant': ['plant', 'planta', 'código planta', 'codigo planta'],
+    'serialno': ['serialno', 'serial', 'número de serie', 'numero de serie'],
+    'type': ['type', 'tipo', 'tipo de dispositivo'],
+    'model': ['model', 'modelo'],
+    'failuretype': ['failuretype', 'falla', 'tipo de falla'],
+    'observations': ['observations', 'observaciones'],
+    'entry_date': ['entry_date', 'fecha', 'fecha de ingreso'],
+}
+
+DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y',
+]
+
+
+@dataclass
+class ImportStats:
+    """Contadores de una importación"""
+    read: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+def iter_xlsx_rows(filepath, sheet=None):
+    """Recorre las filas de una hoja de Excel sin cargar el libro en memoria"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        for row in worksheet.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(filepath, delimiter=',', encoding='utf-8-sig'):
+    """Recorre las filas de un CSV de forma incremental"""
+    with open(filepath, newline='', encoding=encoding) as f:
+        for row in csv.reader(f, delimiter=delimiter):
+            yield row
+
+
+def iter_source_rows(filepath, sheet=None, delimiter=',', encoding='utf-8-sig'):
+    """Elige el lector según la extensión del archivo"""
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        return iter_xlsx_rows(filepath, sheet)
+    if extension in ('.csv', '.txt'):
+        return iter_csv_rows(filepath, delimiter, encoding)
+    raise ValueError(f"Formato no soportado: {extension} (use .xlsx o .csv)")
+
+
+def map_header(header):
+    """Devuelve {columna: índice} a partir de la fila de encabezados"""
+    normalized = [str(value).strip().lower() if value is not None else '' for value in header]
+    columns = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for index, name in enumerate(normalized):
+            if name in aliases:
+                columns[field] = index
+                break
+
+    missing = [field for field in ('serialno', 'type', 'model') if field not in columns]
+    if missing:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(missing)}")
+    return columns
+
+
+def parse_date(value):
+    """Normaliza una fecha de la planilla al formato de SQLite"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha inválida: {text}")
+
+
+def parse_row(values, columns):
+    """
+    Convierte una fila de la planilla en la tupla que espera add_devices_bulk
+
+    Returns:
+        (tupla, None) si la fila es válida o (None, mensaje de error)
+    """
+    def get(field):
+        index = columns.get(field)
+        if index is None or index >= len(values) or values[index] is None:
+            return ''
+        return str(values[index]).strip()
+
+    serialno = get('serialno')
+    device_type = get('type')
+    model = get('model')
+
+    errors = validate_device_inputs(serialno, device_type, model)
+    if not errors:
+        valid, message = validate_serial_number(serialno)
+        if not valid:
+            errors.append(message)
+
+    entry_date = None
+    if 'entry_date' in columns and columns['entry_date'] < len(values):
+        try:
+            entry_date = parse_date(values[columns['entry_date']])
+        except ValueError as e:
+            errors.append(str(e))
+
+    if errors:
+        return None, "; ".join(errors)
+
+    return (get('plant'), serialno, device_type, model,
+            get('failuretype') or DEFAULT_FAILURE_TYPE, get('observations'), entry_date), None
+
+
+def _flush_batch(db, batch, stats, rejects=None, verbose=True):
+    """Inserta un lote y acumula los resultados por fila"""
+    results = db.add_devices_bulk((device for _, device in batch), verbose=verbose)
+    for (line, device), result in zip(batch, results):
+        if result.status == 'inserted':
+            stats.inserted += 1
+            continue
+
+        if result.status == 'duplicate':
+            stats.duplicates += 1
+            reason = "Serial duplicado"
+        else:
+            stats.invalid += 1
+            reason = "Error al insertar"
+        if rejects:
+            rejects.writerow([line, device[1], reason])
+
+
+def _print_progress(stats, start):
+    elapsed = time.perf_counter() - start
+    rate = stats.read / elapsed if elapsed else 0
+    print(f"🔄 {stats.read:,} filas leídas | {stats.inserted:,} agregadas | "
+          f"{stats.duplicates:,} duplicadas | {stats.invalid:,} inválidas | {rate:,.0f} filas/s")
+
+
+def import_file(filepath, db, batch_size=DEFAULT_BATCH_SIZE, sheet=None, delimiter=',',
+                encoding='utf-8-sig', rejects_path=None, verbose=True):
+    """
+    Importa un archivo completo a la base de datos por lotes
+
+    Args:
+        filepath: Ruta del .xlsx o .csv (la primera fila son los encabezados)
+        db: Instancia de Database
+        batch_size: Filas por transacción
+        rejects_path: CSV opcional donde se escriben las filas rechazadas y el motivo
+
+    Returns:
+        ImportStats con los contadores de la importación
+    """
+    stats = ImportStats()
+    start = time.perf_counter()
+    rows = iter_source_rows(filepath, sheet, delimiter, encoding)
+
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("El archivo está vacío")
+    columns = map_header(header)
+
+    rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8') if rejects_path else None
+    rejects = csv.writer(rejects_file) if rejects_file else None
+    if rejects:
+        rejects.writerow(['fila', 'serial', 'motivo'])
+
+    # El índice de texto completo queda en pausa y se reconstruye una sola vez al final
+    db.suspend_fulltext()
+    try:
+        batch = []
+        for line, values in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in values):
+                continue  # Fila vacía
+
+            stats.read += 1
+            device, error = parse_row(values, columns)
+            if error:
+                stats.invalid += 1
+                if rejects:
+                    serial_index = columns['serialno']
+                    serialno = values[serial_index] if serial_index < len(values) else ''
+                    rejects.writerow([line, serialno, error])
+                continue
+
+            batch.append((line, device))
+            if len(batch) >= batch_size:
+                _flush_batch(db, batch, stats, rejects, verbose)
+                batch = []
+                if verbose:
+                    _print_progress(stats, start)
+
+        if batch:
+            _flush_batch(db, batch, stats, rejects, verbose)
+    finally:
+        db.resume_fulltext()
+        if rejects_file:
+            rejects_file.close()
+
+    # Estadísticas del planificador con los datos ya cargados
+    db.optimize()
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None):
+    """Punto de entrada de bodega-import"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importa dispositivos desde Excel o CSV")
+    parser.add_argument("file", nargs="?", help="Archivo .xlsx o .csv a importar")
+    # Por defecto la misma base que la aplicación y los backups, desde cualquier directorio
+    parser.add_argument("--db", default=settings.DATABASE_PATH,
+                        help="Base de datos (por defecto la de la aplicación; "
+                             "una ruta relativa se resuelve en data/ del directorio actual)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Filas por transacción")
+    parser.add_argument("--sheet", help="Hoja de Excel (por defecto la activa)")
+    parser.add_argument("--delimiter", default=",", help="Separador del CSV")
+    parser.add_argument("--encoding", default="utf-8-sig", help="Codificación del CSV")
+    parser.add_argument("--rejects", help="CSV donde guardar las filas rechazadas")
+    parser.add_argument("--profile", default=IMPORT_PROFILE, choices=list(PRAGMA_PROFILES),
+                        help="Perfil de conexión de la base de datos")
+    parser.add_argument("--rebuild-index", action="store_true",
+                        help="Reconstruir el índice de búsqueda si una importación se interrumpió")
+    parser.add_argument("--quiet", action="store_true", help="Modo silencioso")
+
+    args = parser.parse_args(argv)
+    verbose = not args.quiet
+
+    if args.rebuild_index:
+        with Database(args.db, profile=args.profile) as db:
+            return 0 if db.rebuild_fulltext() else 1
+    if args.file is None:
+        parser.error("falta el archivo a importar")
+
+    if not os.path.exists(args.file):
+        print(f"❌ Error: Archivo no encontrado: {args.file}")
+        return 1
+
+    if verbose:
+        print("=" * 50)
+        print("📥 INICIANDO IMPORTACIÓN DE DISPOSITIVOS")
+        print("=" * 50)
+        print(f"📄 Archivo: {args.file}")
+        print(f"🗄️  Base de datos: {args.db}")
+
+    try:
+        with Database(args.db, profile=args.profile) as db:
+            stats = import_file(args.file, db, batch_size=args.batch_size, sheet=args.sheet,
+                                delimiter=args.delimiter, encoding=args.encoding,
+                                rejects_path=args.rejects, verbose=verbose)
+    except (ValueError, KeyError, OSError) as e:
+        print(f"❌ Error en importación: {e}")
+        return 1
+
+    if verbose:
+        print("=" * 50)
+        print("✅ IMPORTACIÓN COMPLETADA")
+        print(f"   📊 Filas leídas: {stats.read:,}")
+        print(f"   ➕ Agregadas:     {stats.inserted:,}")
+        print(f"   🔁 Duplicadas:    {stats.duplicates:,}")
+        print(f"   ⚠️  Inválidas:     {stats.invalid:,}")
+        print(f"   ⏱️  Tiempo:        {stats.elapsed:.1f} s ({stats.rows_per_second:,.0f} filas/s)")
+        if args.rejects:
+            print(f"   📄 Rechazos:      {args.rejects}")
+        print("=" * 50)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,17 +3,22 @@ import customtkinter as ctk
 from tkinter import messagebox, filedialog
 from datetime import datetime, timedelta
 import tkinter as tk
-import pandas as pd
 import os
 
 # Importaciones internas
 from src.database import Database
+from src.export import export_filetypes, get_exporter, normalize_export_format
+from src.utils import generate_filename
+from src.workers import BackupJob, ExportJob, POLL_INTERVAL_MS
+from src.write_queue import WriteQueue
 from config import settings
 from config.device_config import *
 from views.register_view import RegisterView
 from views.search_view import SearchView
 from views.info_view import InfoView
-from scripts.backup_database import backup_database
+from views.progress_dialog import ProgressDialog
+from scripts.backup_catalog import BackupCatalog
+from scripts.backup_database import backup_database, backup_is_current
 
 
 class App(ctk.CTk):
@@ -21,7 +26,12 @@ class App(ctk.CTk):
         super().__init__()
         
         # Inicializar base de datos
-        self.db = Database()
+        self.db = Database(settings.DATABASE_PATH, profile=settings.DATABASE_PROFILE,
+                           pragmas=settings.DATABASE_PRAGMAS)
+        
+        # Las altas pasan por un hilo escritor que agrupa varias en un mismo commit
+        self.write_queue = WriteQueue(self.db, settings.WRITE_BATCH_DELAY_MS, settings.WRITE_BATCH_SIZE)
+        self.write_queue.start()
         
         self.title('Bodega Register App')
         self.geometry('1366x768')
@@ -38,6 +48,11 @@ class App(ctk.CTk):
 
         # Variables para control de backup
         self.last_backup_check = None
+        self.backup_job = None
+        
+        # Exportación en curso (se ejecuta en un hilo aparte)
+        self.export_job = None
+        self.export_dialog = None
         
         # Iniciar verificación de backup si está configurado
         if settings.BACKUP_ENABLED and settings.AUTO_BACKUP_ON_START:
@@ -91,7 +106,8 @@ class App(ctk.CTk):
             self.registertab,
             self.db,
             on_save_callback=self.on_device_saved,
-            on_cancel_callback=self.hide_register_view
+            on_cancel_callback=self.hide_register_view,
+            write_queue=self.write_queue
         )
         self.register_view.pack(fill="both", expand=True, padx=10, pady=10)
     
@@ -116,94 +132,99 @@ class App(ctk.CTk):
         )
         self.search_view.pack(fill="both", expand=True)
     
-    def on_export_requested(self, data, search_by):
-        """Callback para exportación"""
+    def on_export_requested(self, query, search_by):
+        """Callback para exportación: la escritura corre en segundo plano"""
         try:
-            if not data:
+            if query is None:
                 messagebox.showwarning("Advertencia", "No hay datos para exportar")
                 return
             
+            if self.export_job and self.export_job.is_alive():
+                messagebox.showwarning("Advertencia", "Ya hay una exportación en curso")
+                return
+            
             # Crear directorio de exportaciones si no existe
             export_dir = os.path.join('data', 'exports')
             os.makedirs(export_dir, exist_ok=True)
             
-            # Generar nombre de archivo con fecha y hora
-            fecha_hora = datetime.now().strftime("%Y%m%d_%H%M%S")
-            default_filename = f"bodega_export_{fecha_hora}.xlsx"
+            # Generar nombre de archivo con fecha y hora en el formato configurado
+            export_format = normalize_export_format(settings.EXPORT_FORMAT)
+            default_filename = generate_filename("bodega_export", export_format)
             
             # Abrir diálogo en el directorio exports
             file_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
+                defaultextension=f".{export_format}",
                 initialfile=default_filename,
                 initialdir=export_dir,
-                filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+                filetypes=export_filetypes(export_format)
             )
             
             if not file_path:
                 return
             
-            # Procesar datos - SOLO código de planta (no nombre)
-            processed_data = []
-            
-            for row in data:
-                # Asegurar que la fila tenga al menos 8 elementos
-                if len(row) >= 8:
-                    # Obtener código de planta (ya está en la base de datos)
-                    plant_code = row[1] if row[1] else ""
-                    
-                    # Formatear fecha para mejor legibilidad
-                    fecha = row[7] if len(row) > 7 and row[7] else ""
-                    if fecha:
-                        try:
-                            dt = datetime.strptime(str(fecha), '%Y-%m-%d %H:%M:%S')
-                            fecha = dt.strftime('%d/%m/%Y %H:%M')
-                        except:
-                            # Si falla, mantener el formato original
-                            pass
-                    
-                    # Crear fila procesada - SOLO código de planta
-                    processed_row = (
-                        row[0] if len(row) > 0 and row[0] else "",      # ID
-                        plant_code,                                      # Código Planta (ej: "UP02")
-                        row[2] if len(row) > 2 and row[2] else "",      # Serial
-                        row[3] if len(row) > 3 and row[3] else "",      # Tipo
-                        row[4] if len(row) > 4 and row[4] else "",      # Modelo
-                        row[5] if len(row) > 5 and row[5] else "",      # Falla
-                        row[6] if len(row) > 6 and row[6] else "",      # Observaciones
-                        fecha                                           # Fecha
-                    )
-                    processed_data.append(processed_row)
-            
-            # Definir columnas (ahora 8 columnas - sin "Nombre Planta")
-            columns = [
-                "ID", 
-                "Código Planta",  # Solo el código
-                "Serial", 
-                "Tipo", 
-                "Modelo", 
-                "Falla", 
-                "Fecha", 
-                "Observaciones"
-            ]
-            
-            # Convertir a DataFrame
-            df = pd.DataFrame(processed_data, columns=columns)
+            # La extensión elegida manda; sin extensión reconocida se usa la configuración
+            writer = get_exporter(file_path, export_format)
             
-            # Exportar a Excel
-            df.to_excel(file_path, index=False, engine='openpyxl')
-            
-            # Preguntar si quiere abrir la carpeta
-            open_folder = messagebox.askyesno(
-                "✅ Exportación Completada",
-                f"Archivo guardado en:\n{file_path}\n\n"
-                f"¿Abrir carpeta contenedora?"
-            )
-            
-            if open_folder:
-                self.open_file_explorer(file_path)
+            # La consulta y la escritura corren en un hilo con una conexión de lectura del pool
+            self.export_job = ExportJob(self.db, query, file_path, writer=writer)
+            self.export_dialog = ProgressDialog(self, title="Exportando",
+                                                on_cancel=self.export_job.cancel)
+            self.export_job.start()
+            self.after(POLL_INTERVAL_MS, self.poll_export_job)
             
         except Exception as e:
             messagebox.showerror("❌ Error", f"Error al exportar: {str(e)}")
+    
+    def poll_export_job(self):
+        """Lee los eventos de la exportación en curso desde el hilo de Tk"""
+        job = self.export_job
+        if job is None:
+            return
+        
+        for kind, value in job.poll():
+            if kind == 'progress':
+                if self.export_dialog:
+                    self.export_dialog.update_progress(*value)
+            else:
+                self.finish_export(kind, value)
+                return
+        
+        self.after(POLL_INTERVAL_MS, self.poll_export_job)
+    
+    def finish_export(self, kind, value):
+        """Cierra la ventana de progreso e informa el resultado de la exportación"""
+        file_path = self.export_job.filepath
+        self.export_job = None
+        if self.export_dialog:
+            self.export_dialog.destroy()
+            self.export_dialog = None
+        
+        if kind == 'cancelled':
+            print("⚠️  Exportación cancelada")
+            return
+        
+        if kind == 'error':
+            if isinstance(value, PermissionError):
+                messagebox.showerror("❌ Error", "Error de permisos. ¿El archivo está abierto en otro programa?")
+            else:
+                messagebox.showerror("❌ Error", f"Error al exportar: {str(value)}")
+            return
+        
+        if value == 0:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            messagebox.showwarning("Advertencia", "No hay datos para exportar")
+            return
+        
+        # Preguntar si quiere abrir la carpeta
+        open_folder = messagebox.askyesno(
+            "✅ Exportación Completada",
+            f"{value} registros guardados en:\n{file_path}\n\n"
+            f"¿Abrir carpeta contenedora?"
+        )
+        
+        if open_folder:
+            self.open_file_explorer(file_path)
         
     def open_file_explorer(self, file_path):
         """Abre el explorador de archivos en la ubicación del archivo"""
@@ -244,11 +265,10 @@ class App(ctk.CTk):
                 
                 if confirm:
                     # Buscar el serial del dispositivo
-                    self.db.cur.execute("SELECT serialno FROM DeviceReg WHERE id = ?", (identifier,))
-                    result = self.db.cur.fetchone()
+                    result = self.db.get_device(identifier)
                     
                     if result:
-                        serialno = result[0]
+                        serialno = result[2]
                         deleted = self.db.del_SData(serialno, "serialno", exact_match=True)
                         
                         if deleted > 0:
@@ -256,8 +276,8 @@ class App(ctk.CTk):
                             if hasattr(self, 'search_view'):
                                 self.search_view.refresh_results()
             else:
-                # VALIDACIÓN: No permitir eliminar por "Todos" o "Por Tipo"
-                if search_by in ["Todos", "Por Tipo"]:
+                # VALIDACIÓN: No permitir eliminar por "Todos", "Por Tipo" o una consulta combinada
+                if search_by in ["Todos", "Por Tipo", "Consulta"]:
                     messagebox.showerror(
                         "Operación no permitida",
                         f"No está permitido eliminar dispositivos usando '{search_by}'.\n"
@@ -289,31 +309,16 @@ class App(ctk.CTk):
         self.info_view = InfoView(self.infotab)
         self.info_view.pack(fill="both", expand=True, padx=10, pady=10)
 
-    def get_last_backup_file(self):
-            """Obtiene el archivo de backup más reciente"""
-            try:
-                from config.settings import BACKUP_DIR
-                
-                if not os.path.exists(BACKUP_DIR):
-                    return None
-                
-                backup_files = []
-                for filename in os.listdir(BACKUP_DIR):
-                    if filename.startswith("bodega_backup_") and filename.endswith(".db"):
-                        filepath = os.path.join(BACKUP_DIR, filename)
-                        if os.path.isfile(filepath):
-                            backup_files.append((filepath, os.path.getmtime(filepath)))
-                
-                if not backup_files:
-                    return None
-                
-                # Ordenar por fecha (más reciente primero)
-                backup_files.sort(key=lambda x: x[1], reverse=True)
-                return backup_files[0][0]
-                
-            except Exception as e:
-                print(f"⚠️ Error obteniendo último backup: {e}")
-                return None
+    def get_last_backup(self):
+        """Obtiene el backup más reciente según el catálogo (BackupEntry o None)"""
+        try:
+            from config.settings import BACKUP_DIR
+            
+            return BackupCatalog(BACKUP_DIR).latest()
+            
+        except Exception as e:
+            print(f"⚠️ Error obteniendo último backup: {e}")
+            return None
 
     def setup_backup_system(self):
         """Configura el sistema de backup automático"""
@@ -338,17 +343,15 @@ class App(ctk.CTk):
             self.after(3600000, self.periodic_backup_check)
 
     def check_auto_backup(self):
-        last_backup_file = self.get_last_backup_file()
+        last_backup = self.get_last_backup()
         
         # Determinar si se necesita crear backup
-        if self.should_create_backup(last_backup_file):
+        if self.should_create_backup(last_backup):
             print("C. Creando backup automatico...")
             self.create_auto_backup()
         else:
-            if last_backup_file:
-                last_time = os.path.getmtime(last_backup_file)
-                last_date = datetime.fromtimestamp(last_time)
-                next_backup = last_date + timedelta(hours=settings.BACKUP_INTERVAL_HOURS)
+            if last_backup:
+                next_backup = last_backup.created_at + timedelta(hours=settings.BACKUP_INTERVAL_HOURS)
                 print(f"C. Próximo backup programado: {next_backup.strftime('%d/%m/%Y %H:%M')}")
 
     def check_min_db_size(self):
@@ -366,16 +369,15 @@ class App(ctk.CTk):
             print(f"⚠️ Error verificando tamaño de BD: {e}")
             return False
 
-    def should_create_backup(self, last_backup_file):
+    def should_create_backup(self, last_backup):
         """Determina si se debe crear backup basado en configuración"""
         try:
             # Si nunca se ha creado backup
-            if last_backup_file is None:
+            if last_backup is None:
                 return True
             
             # Verificar intervalo configurado
-            last_backup_time = os.path.getmtime(last_backup_file)
-            last_backup_date = datetime.fromtimestamp(last_backup_time)
+            last_backup_date = last_backup.created_at
             current_date = datetime.now()
             
             # Calcular diferencia en horas
@@ -389,26 +391,62 @@ class App(ctk.CTk):
             return True  # En caso de error, mejor crear backup
 
     def create_auto_backup(self):
-        """Crea backup automático usando configuración"""
+        """Lanza el backup automático en segundo plano"""
+        if self.backup_job and self.backup_job.is_alive():
+            print("ℹ️  Ya hay un backup en curso")
+            return
+        
         try:
-            from config.settings import MAX_BACKUP_FILES
-            
-            success, result = backup_database(verbose=False)
-            
-            if success:
-                print(f"✅ Backup automático creado: {os.path.basename(result)}")
-                
-                # Limpiar backups antiguos según configuración
-                self.cleanup_old_backups(MAX_BACKUP_FILES)
-                
-                # Registrar hora del último backup
-                self.last_backup_check = datetime.now()
-                
-            else:
-                print(f"⚠️ No se pudo crear backup automático: {result}")
-                
+            self.backup_job = BackupJob(self.run_backup)
+            self.backup_job.start()
+            self.after(POLL_INTERVAL_MS, self.poll_backup_job)
         except Exception as e:
             print(f"❌ Error en backup automático: {e}")
+    
+    def run_backup(self):
+        """
+        Backup y limpieza de antiguos (se ejecuta en el hilo del BackupJob)
+        
+        Devuelve None si se omitió porque la base de datos no cambió.
+        """
+        from config.settings import MAX_BACKUP_FILES
+        
+        # Sin cambios desde el último backup: no hace falta copiar nada
+        if backup_is_current():
+            return None
+        
+        success, result = backup_database(verbose=False)
+        if success:
+            # Limpiar backups antiguos según configuración
+            self.cleanup_old_backups(MAX_BACKUP_FILES)
+        return success, result
+    
+    def poll_backup_job(self):
+        """Lee el resultado del backup en curso desde el hilo de Tk"""
+        job = self.backup_job
+        if job is None:
+            return
+        
+        for kind, value in job.poll():
+            if kind == 'done' and value is None:
+                print("ℹ️  Sin cambios desde el último backup, se omite")
+                # El backup vigente sigue siendo válido
+                self.last_backup_check = datetime.now()
+                return
+            if kind == 'done':
+                success, result = value
+                if success:
+                    print(f"✅ Backup automático creado: {os.path.basename(result)}")
+                    # Registrar hora del último backup
+                    self.last_backup_check = datetime.now()
+                else:
+                    print(f"⚠️ No se pudo crear backup automático: {result}")
+                return
+            if kind == 'error':
+                print(f"❌ Error en backup automático: {value}")
+                return
+        
+        self.after(POLL_INTERVAL_MS, self.poll_backup_job)
 
     def cleanup_old_backups(self, max_files):
         """Limpia backups antiguos según configuración"""
@@ -417,38 +455,37 @@ class App(ctk.CTk):
             
             if not os.path.exists(BACKUP_DIR):
                 return
-                
-            # Obtener todos los backups
-            backup_files = []
-            for filename in os.listdir(BACKUP_DIR):
-                if filename.startswith("bodega_backup_") and filename.endswith(".db"):
-                    filepath = os.path.join(BACKUP_DIR, filename)
-                    if os.path.isfile(filepath):
-                        backup_files.append((filepath, os.path.getmtime(filepath)))
-            
-            # Ordenar por fecha (más antiguos primero)
-            backup_files.sort(key=lambda x: x[1])
             
-            # Eliminar excedentes
-            if len(backup_files) > max_files:
-                files_to_delete = backup_files[:len(backup_files) - max_files]
-                for filepath, _ in files_to_delete:
-                    try:
-                        os.remove(filepath)
-                        print(f"🗑️  Eliminado backup antiguo: {os.path.basename(filepath)}")
-                    except Exception as e:
-                        print(f"⚠️  No se pudo eliminar backup: {e}")
+            BackupCatalog(BACKUP_DIR).prune(max_files)
                         
         except Exception as e:
             print(f"⚠️ Error limpiando backups antiguos: {e}")
 
     def on_closing(self):
         """Cierra la aplicación con backup si está configurado"""
+        # La ventana desaparece enseguida; el backup pendiente termina detrás
+        self.withdraw()
+        
         try:
+            # Detener la exportación en curso (el archivo parcial se elimina)
+            if self.export_job and self.export_job.is_alive():
+                self.export_job.cancel()
+                self.export_job.join(timeout=5)
+            
+            # Confirmar las altas pendientes antes del backup de cierre
+            self.write_queue.close(timeout=5)
+            
             # Backup antes de cerrar si está configurado
             if settings.BACKUP_ENABLED and settings.AUTO_BACKUP_ON_EXIT:
                 self.create_exit_backup()
             
+            # Esperar, con límite, al backup que esté en curso
+            if self.backup_job and self.backup_job.is_alive():
+                print("📦 Esperando a que termine el backup...")
+                self.backup_job.join(timeout=settings.BACKUP_EXIT_TIMEOUT)
+                if self.backup_job.is_alive():
+                    print("⚠️ El backup no terminó a tiempo, se cierra sin esperar")
+            
         except Exception as e:
             print(f"⚠️ Error en proceso de cierre: {e}")
         finally:
@@ -457,26 +494,39 @@ class App(ctk.CTk):
             self.destroy()
 
     def create_exit_backup(self):
-        """Crea backup al cerrar la aplicación si es necesario"""
+        """Lanza el backup de cierre en segundo plano si es necesario"""
         try:
+            # Un backup automático en curso ya sirve como backup de cierre
+            if self.backup_job and self.backup_job.is_alive():
+                return
+            
             # Verificar si se necesita backup
-            last_backup_file = self.get_last_backup_file()
+            last_backup = self.get_last_backup()
             
-            if last_backup_file is None or self.should_create_exit_backup(last_backup_file):
+            if last_backup is None or self.should_create_exit_backup(last_backup):
                 print("📦 Creando backup antes de cerrar...")
-                success, result = backup_database(verbose=False)
-                if success:
-                    print(f"✅ Backup de cierre creado: {os.path.basename(result)}")
+                self.backup_job = BackupJob(self.run_exit_backup, name="ExitBackupJob")
+                self.backup_job.start()
                     
         except Exception as e:
             print(f"⚠️ Error en backup de cierre: {e}")
 
-    def should_create_exit_backup(self, last_backup_file):
+    def run_exit_backup(self):
+        """Backup de cierre (se ejecuta en el hilo del BackupJob)"""
+        if backup_is_current():
+            print("ℹ️  Sin cambios desde el último backup, se omite el backup de cierre")
+            return None
+        
+        success, result = backup_database(verbose=False)
+        if success:
+            print(f"✅ Backup de cierre creado: {os.path.basename(result)}")
+        return success, result
+
+    def should_create_exit_backup(self, last_backup):
         """Determina si se debe crear backup al cerrar"""
         try:
             # Si el último backup fue hace más de 6 horas, crear uno nuevo
-            last_backup_time = os.path.getmtime(last_backup_file)
-            last_backup_date = datetime.fromtimestamp(last_backup_time)
+            last_backup_date = last_backup.created_at
             current_date = datetime.now()
             
             time_diff = current_date - last_backup_date
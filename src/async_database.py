@@ -0,0 +1,149 @@
+"""
+Fachada asyncio sobre Database
+
+Para código asyncio (demonios de escáner, una API local) que no puede
+bloquear el loop con SQLite. Las lecturas corren en un ThreadPoolExecutor
+acotado al tamaño del pool de lectura de Database; las escrituras van a una
+WriteQueue y se esperan con su Future, sin ocupar hilos del executor.
+
+Cuando hay max_pending_writes escrituras sin confirmar, las siguientes
+esperan (sin bloquear el loop) a que se libere lugar: así un productor
+rápido no acumula operaciones sin límite en la cola, que además está
+acotada al mismo tamaño.
+
+Las escrituras informan los errores con excepciones. Las lecturas son las
+de Database, con su caché de consultas y sus mensajes: Database imprime al
+conectarse y count/get_device registran los errores de SQLite y devuelven
+0 o None, igual que en la interfaz.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.database import DEFAULT_PAGE_SIZE, Database
+from src.write_queue import WriteQueue
+
+
+# Escrituras encoladas sin confirmar antes de frenar a quien escribe
+DEFAULT_MAX_PENDING_WRITES = 1000
+
+
+class AsyncDatabase:
+    """
+    Versiones awaitables de las operaciones de Database
+
+    Uso:
+        async with AsyncDatabase("bodega.db") as db:
+            device_id = await db.add_device("UP01", "ABC123", "Laptop", "Dell", "[0] Sin fallas", "")
+            async for row in db.iter_devices("Dell", "model"):
+                ...
+    """
+
+    def __init__(self, db, write_queue=None, max_workers=None,
+                 max_pending_writes=DEFAULT_MAX_PENDING_WRITES):
+        """
+        Args:
+            db: Database compartida (no se cierra) o nombre de archivo para
+                abrir una propia
+            write_queue: WriteQueue ya iniciada sobre db; None crea una propia
+                         acotada a max_pending_writes
+            max_workers: Hilos para lecturas (por defecto, el pool de lectura de db)
+            max_pending_writes: Escrituras sin confirmar antes de esperar
+        """
+        self._owns_db = not isinstance(db, Database)
+        self.db = Database(db) if self._owns_db else db
+        self.max_pending_writes = max(1, max_pending_writes)
+        self._owns_queue = write_queue is None
+        if self._owns_queue:
+            write_queue = WriteQueue(self.db, max_pending=self.max_pending_writes)
+            write_queue.start()
+        self.write_queue = write_queue
+        self._executor = ThreadPoolExecutor(max_workers or self.db.pool_size,
+                                            thread_name_prefix="AsyncDatabase")
+        # El semáforo se crea dentro del loop (en 3.8/3.9 queda ligado al loop actual)
+        self._write_slots = None
+
+    async def _run(self, function, *args, **kwargs):
+        """Ejecuta una lectura bloqueante en el executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    async def _write(self, submit, *args, **kwargs):
+        """Encola una escritura respetando max_pending_writes y espera su commit"""
+        if self._write_slots is None:
+            self._write_slots = asyncio.Semaphore(self.max_pending_writes)
+        async with self._write_slots:
+            return await asyncio.wrap_future(submit(*args, **kwargs))
+
+    # --- Escrituras ---
+
+    async def add_device(self, plant, serialno, device_type, model, failuretype, observations):
+        """Alta de un dispositivo; devuelve el id o lanza DuplicateSerialError"""
+        return await self._write(self.write_queue.add_device, plant, serialno, device_type,
+                                 model, failuretype, observations)
+
+    async def update_device(self, device_id, **changes):
+        """Modifica un dispositivo; devuelve True si existía"""
+        return await self._write(self.write_queue.update_device, device_id, **changes)
+
+    async def delete_devices(self, search_term, search_by="serialno", exact_match=False):
+        """Baja por criterio (como del_SData); devuelve la cantidad eliminada"""
+        return await self._write(self.write_queue.delete_devices, search_term, search_by, exact_match)
+
+    # --- Lecturas ---
+
+    async def get_device(self, device_id):
+        """Fila de un dispositivo por id, o None si no existe"""
+        return await self._run(self.db.get_device, device_id)
+
+    async def search(self, search_term=None, search_by=None, page_size=DEFAULT_PAGE_SIZE, token=None):
+        """Una página de resultados: (filas, token) como Database.search_page"""
+        return await self._run(self.db.search_page, search_term, search_by, page_size, token)
+
+    async def list_devices(self, page_size=DEFAULT_PAGE_SIZE, token=None):
+        """Una página de todos los dispositivos, de la más reciente a la más antigua"""
+        return await self.search(None, None, page_size, token)
+
+    async def count(self, search_term=None, search_by=None):
+        """Cantidad de dispositivos que cumplen un criterio"""
+        return await self._run(self.db.count_devices, search_term, search_by)
+
+    async def iter_pages(self, search_term=None, search_by=None, page_size=DEFAULT_PAGE_SIZE, token=None):
+        """
+        Páginas de resultados con 'async for'
+
+        Cada página es una consulta keyset independiente: entre páginas no
+        queda ninguna conexión de lectura tomada.
+        """
+        while True:
+            rows, token = await self.search(search_term, search_by, page_size, token)
+            if rows:
+                yield rows
+            if token is None:
+                return
+
+    async def iter_devices(self, search_term=None, search_by=None, page_size=DEFAULT_PAGE_SIZE):
+        """Filas de resultados con 'async for', leídas de a page_size"""
+        async for rows in self.iter_pages(search_term, search_by, page_size):
+            for row in rows:
+                yield row
+
+    # --- Cierre ---
+
+    async def close(self):
+        """Confirma las escrituras pendientes y libera los hilos (y la base si es propia)"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._close)
+
+    def _close(self):
+        if self._owns_queue:
+            self.write_queue.close()
+        self._executor.shutdown(wait=True)
+        if self._owns_db:
+            self.db.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
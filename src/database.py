@@ -1,184 +1,1037 @@
 # src/database.py
 import sqlite3 as sql
+import json
 import os
+import queue
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+
+from src.migrations import SCHEMA_VERSION, get_schema_version, migrate
+from src.query_cache import MISSING, QUERY_CACHE_ROWS, QueryCache
+from src.query_language import compile_query, prefix_range
+
+
+# Filas por página en las consultas paginadas
+DEFAULT_PAGE_SIZE = 200
+
+# Columnas de DeviceReg en el orden de SELECT *
+DEVICE_COLUMNS = ('id', 'plant', 'serialno', 'type', 'model', 'failuretype', 'entry_date', 'observations')
+
+# Posición de entry_date en las filas de DeviceReg (SELECT *)
+ENTRY_DATE_INDEX = 6
+
+# Columnas que update_device permite modificar
+UPDATABLE_COLUMNS = ('plant', 'serialno', 'type', 'model', 'failuretype', 'observations')
+
+# Cantidad máxima de parámetros por consulta IN (...) en operaciones masivas
+BULK_CHUNK_SIZE = 500
+
+# Resultado por fila de add_devices_bulk: estado es 'inserted', 'duplicate' o 'error'
+BulkResult = namedtuple('BulkResult', ['serialno', 'device_id', 'status'])
+
+# Longitud mínima de término que el tokenizer trigram puede indexar
+FTS_MIN_TERM_LENGTH = 3
+
+# Filtros de columna FTS5 para cada modo de búsqueda por subcadena
+FTS_COLUMN_FILTERS = {
+    "serialno": "serialno",
+    "type": "type",
+    "model": "model",
+    "plant": "plant",
+    "all": "{serialno type model plant}",
+}
+
+
+# Conexiones de solo lectura que puede abrir cada Database
+READER_POOL_SIZE = 4
+
+# Intervalo con el que ReaderPool.acquire() revisa, mientras espera una
+# conexión libre, si el pool se cerró (segundos)
+READER_WAIT_SECONDS = 0.1
+
+# Instrucciones de SQLite entre cada consulta del pedido de cancelación (interruptible)
+PROGRESS_HANDLER_STEPS = 1000
+
+# Filas que ANALYZE examina por índice (PRAGMA analysis_limit): estadísticas
+# aproximadas pero suficientes para el planificador, sin leer toda la tabla
+ANALYSIS_LIMIT = 1000
+
+# Base de datos en memoria (benchmarks y pruebas)
+MEMORY_DATABASE = ':memory:'
+
+# PRAGMAs de conexión que puede fijar un perfil
+CONNECTION_PRAGMAS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout')
+
+# Perfiles de conexión. Con journal_mode=WAL las lecturas no esperan a quien
+# escribe y cada commit solo agrega al WAL; synchronous=NORMAL en WAL no
+# corrompe la base ante un corte de luz, a lo sumo pierde los últimos commits.
+PRAGMA_PROFILES = {
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -8000,           # KiB (negativo) = 8 MiB
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,          # ms
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "mmap_size": 268435456,        # 256 MiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Importaciones masivas: sin fsync en cada commit (un corte de luz puede
+    # perder la importación en curso, que se vuelve a ejecutar)
+    "bulk-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,         # 256 MiB
+        "mmap_size": 1073741824,       # 1 GiB
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+}
+
+
+def connection_pragmas(profile=None, overrides=None):
+    """
+    PRAGMAs de conexión de un perfil con los ajustes indicados encima
+    
+    Args:
+        profile: Nombre de PRAGMA_PROFILES, diccionario de PRAGMAs o None (ninguno)
+        overrides: Diccionario de PRAGMAs que reemplazan a los del perfil
+    
+    Raises:
+        ValueError: si el perfil no existe o un PRAGMA o valor no es válido
+    """
+    if isinstance(profile, str):
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Perfil de conexión desconocido: {profile} "
+                             f"(disponibles: {', '.join(PRAGMA_PROFILES)})")
+        profile = PRAGMA_PROFILES[profile]
+    
+    pragmas = dict(profile or {})
+    pragmas.update(overrides or {})
+    for name, value in pragmas.items():
+        if name not in CONNECTION_PRAGMAS:
+            raise ValueError(f"PRAGMA no permitido en un perfil de conexión: {name}")
+        # Se interpolan en el SQL: solo enteros o palabras clave
+        if not isinstance(value, int) and not (isinstance(value, str) and value.isalpha()):
+            raise ValueError(f"Valor no válido para PRAGMA {name}: {value!r}")
+    return pragmas
+
+
+def row_to_json(row):
+    """Fila de DeviceReg (SELECT *) en JSON, para ChangeLogs.change_data"""
+    return json.dumps(dict(zip(DEVICE_COLUMNS, row)), ensure_ascii=False)
+
+
+def like_contains(search_term):
+    """
+    Patrón de LIKE ? ESCAPE '\\' que busca search_term como subcadena literal
+    
+    '%' y '_' son comodines de LIKE pero caracteres comunes para FTS5 y para
+    el filtro en memoria: se escapan para que búsqueda, conteo y baja
+    coincidan siempre en las mismas filas.
+    """
+    escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+# Comparación de like_contains
+LIKE_CONTAINS = "LIKE ? ESCAPE '\\'"
+
+
+def _chunks(items, size):
+    """Divide una lista en trozos de tamaño máximo size"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ReaderPool:
+    """
+    Conexiones de solo lectura reutilizables
+    
+    Se abren a demanda hasta max_size; si están todas en uso, acquire()
+    espera a que se libere una o a que se cierre el pool.
+    """
+    
+    def __init__(self, factory, max_size=READER_POOL_SIZE):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+    
+    def acquire(self):
+        """
+        Conexión libre, nueva o la primera que se libere
+        
+        Raises:
+            sql.ProgrammingError: si el pool se cerró (también durante la espera)
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise sql.ProgrammingError("La base de datos está cerrada")
+                try:
+                    return self._idle.get_nowait()
+                except queue.Empty:
+                    pass
+                create = self._opened < self.max_size
+                if create:
+                    self._opened += 1
+            
+            if create:
+                try:
+                    return self.factory()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            
+            # Espera acotada: close() no devuelve conexiones, así que se revisa el cierre
+            try:
+                return self._idle.get(timeout=READER_WAIT_SECONDS)
+            except queue.Empty:
+                continue
+    
+    def release(self, conn):
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+        # El pool se cerró mientras la conexión estaba en uso
+        conn.close()
+    
+    def close(self):
+        """Cierra las conexiones libres; las que están en uso se cierran al liberarse"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
 
 
 class Database:
-    def __init__(self, db_name='bodega.db'):
-        # Asegurar que la base de datos esté en el directorio data/
-        self.db_name = os.path.join('data', db_name)
+    """
+    Acceso a la base de datos seguro entre hilos
+    
+    Las escrituras pasan por una única conexión serializada con un lock
+    (write()); las lecturas usan un pool de conexiones de solo lectura
+    (read()), así búsquedas, exportaciones y backups pueden correr en hilos de
+    trabajo mientras la interfaz sigue registrando. Cada operación abre su
+    propio cursor. cur y conn son los de la conexión de escritura y quedan
+    para el hilo principal (scripts y pruebas).
+    """
+    
+    pool_size = READER_POOL_SIZE
+    
+    def __init__(self, db_name='bodega.db', profile=None, pragmas=None, pool_size=READER_POOL_SIZE,
+                 cache_rows=QUERY_CACHE_ROWS):
+        """
+        Args:
+            db_name: Archivo (relativo a data/ o ruta absoluta, p. ej.
+                     settings.DATABASE_PATH) o ':memory:'
+            profile: Perfil de conexión de PRAGMA_PROFILES o diccionario de PRAGMAs;
+                     None deja los valores por defecto de SQLite
+            pragmas: PRAGMAs que reemplazan a los del perfil
+            pool_size: Máximo de conexiones de lectura simultáneas
+            cache_rows: Filas que retiene la caché de consultas (0 la desactiva)
+        """
+        if str(db_name) == MEMORY_DATABASE:
+            self.db_name = MEMORY_DATABASE
+        else:
+            # Asegurar que la base de datos esté en el directorio data/
+            self.db_name = os.path.join('data', str(db_name))
+        self.pragmas = connection_pragmas(profile, pragmas)
+        self.pool_size = pool_size
         self.conn = None
         self.cur = None
+        self.fts_enabled = False
+        self._fts_marker = None        # Marca de suspend_fulltext de esta Database
+        self._write_lock = threading.RLock()
+        # Pedido de cancelación de las lecturas de cada hilo (interruptible)
+        self._local = threading.local()
+        # Caché de consultas: se invalida con cada escritura (data_version)
+        self.query_cache = QueryCache(cache_rows)
+        self.generation = 0
+        self._version_conn = None
+        self._version_lock = threading.Lock()
         self._connect()
         self.create_tables()
     
     def _connect(self):
-        """Establece conexión a la base de datos"""
+        """Establece la conexión de escritura y deja vacío el pool de lectura"""
         try:
-            # Crear directorio data si no existe
-            os.makedirs('data', exist_ok=True)
+            if self.db_name != MEMORY_DATABASE:
+                # Crear el directorio de la base de datos si no existe
+                os.makedirs(os.path.dirname(self.db_name) or '.', exist_ok=True)
             
-            self.conn = sql.connect(self.db_name)
+            # check_same_thread=False: el lock de escritura serializa el acceso entre hilos
+            self.conn = sql.connect(self.db_name, check_same_thread=False)
             self.cur = self.conn.cursor()
+            for name, value in self.pragmas.items():
+                self.cur.execute(f'PRAGMA {name} = {value}')
+                self.cur.fetchall()
             print(f"✅ Conectado a: {self.db_name}")
         except sql.Error as e:
             print(f'❌ Error al conectar: {e}')
             raise
+        
+        self._pool = ReaderPool(self._open_reader, self.pool_size)
+        # Conexión nueva (p. ej. después de restaurar): nada de lo leído antes sirve
+        self.generation += 1
+    
+    def _open_reader(self):
+        """Nueva conexión de solo lectura con los PRAGMAs del perfil"""
+        uri = Path(os.path.abspath(self.db_name)).as_uri() + '?mode=ro'
+        conn = sql.connect(uri, uri=True, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            # journal_mode es del archivo, no de la conexión (y requiere escribir)
+            if name != 'journal_mode':
+                conn.execute(f'PRAGMA {name} = {value}').fetchall()
+        return conn
+    
+    @contextmanager
+    def read(self):
+        """
+        Cursor de solo lectura para una operación (seguro desde cualquier hilo)
+        
+        Cada consulta ve los últimos datos confirmados; con WAL no espera a
+        quien está escribiendo.
+        """
+        if self.db_name == MEMORY_DATABASE:
+            # Cada conexión a ':memory:' es una base distinta: se lee por la de escritura
+            with self._write_lock:
+                with self._cancellable(self.conn) as cur:
+                    yield cur
+            return
+        
+        pool = self._pool
+        conn = pool.acquire()
+        try:
+            with self._cancellable(conn) as cur:
+                yield cur
+        finally:
+            pool.release(conn)
+    
+    @contextmanager
+    def _cancellable(self, conn):
+        """Cursor de conn que se aborta si se activa el pedido de cancelación del hilo"""
+        cancel = getattr(self._local, 'cancel', None)
+        if cancel is not None:
+            # Un valor verdadero del handler aborta la consulta con OperationalError
+            conn.set_progress_handler(cancel.is_set, PROGRESS_HANDLER_STEPS)
+        cur = conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+            if cancel is not None:
+                conn.set_progress_handler(None, 0)
+    
+    @contextmanager
+    def interruptible(self, cancel_event):
+        """
+        Las lecturas de este hilo dentro del bloque se abortan al activarse cancel_event
+        
+        La consulta en curso termina con sqlite3.OperationalError ('interrupted')
+        sin esperar a que SQLite recorra toda la tabla. Solo afecta al hilo que
+        abre el bloque.
+        """
+        previous = getattr(self._local, 'cancel', None)
+        self._local.cancel = cancel_event
+        try:
+            yield
+        finally:
+            self._local.cancel = previous
+    
+    def _interrupted(self):
+        """Indica si este hilo pidió cancelar sus lecturas (el error es la interrupción)"""
+        cancel = getattr(self._local, 'cancel', None)
+        return cancel is not None and cancel.is_set()
+    
+    @contextmanager
+    def write(self, immediate=False):
+        """
+        Cursor de la conexión de escritura para una operación
+        
+        Toma el lock de escritura, confirma al salir y deshace todo si hay una
+        excepción (que se vuelve a lanzar).
+        
+        Args:
+            immediate: Tomar el bloqueo de escritura de SQLite desde el inicio
+                       (BEGIN IMMEDIATE), para verificar y escribir sin que otro
+                       proceso escriba en medio
+        """
+        with self._write_lock:
+            cur = self.conn.cursor()
+            try:
+                if immediate and not self.conn.in_transaction:
+                    cur.execute('BEGIN IMMEDIATE')
+                yield cur
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+            finally:
+                cur.close()
+                self.generation += 1
+    
+    def data_version(self):
+        """
+        Versión de los datos para la caché de consultas
+        
+        Cambia con cada escritura de esta Database (generation) y con los
+        commits de otras conexiones o procesos (PRAGMA data_version, que
+        SQLite actualiza cuando otra conexión modifica el archivo).
+        """
+        generation = self.generation
+        if self.db_name == MEMORY_DATABASE:
+            # Nadie más puede escribir en una base en memoria; total_changes
+            # cuenta también lo escrito con cur fuera de write()
+            return (generation, self.conn.total_changes)
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = self._open_reader()
+            return (generation, self._version_conn.execute('PRAGMA data_version').fetchone()[0])
+    
+    def _cached(self, key, query, size=len):
+        """Resultado de query() desde la caché si los datos no cambiaron desde que se guardó"""
+        version = self.data_version()
+        value = self.query_cache.get(key, version)
+        if value is MISSING:
+            value = query()
+            self.query_cache.put(key, version, value, size(value))
+        return value
     
     def create_tables(self):
-        """Crea todas las tablas necesarias"""
-        try:
-            # Tabla principal de dispositivos - AÑADIDA COLUMNA plant
-            self.cur.execute('''CREATE TABLE IF NOT EXISTS DeviceReg (
-                id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, 
-                plant TEXT,
-                serialno TEXT UNIQUE,
-                type VARCHAR(60), 
-                model TEXT, 
-                failuretype VARCHAR(60), 
-                entry_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                observations TEXT)
-                ''')
-            
-            # Tabla de logs para cambios
-            self.cur.execute('''CREATE TABLE IF NOT EXISTS ChangeLogs (
-                log_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
-                device_id INTEGER,
-                action TEXT,
-                change_details TEXT,
-                change_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (device_id) REFERENCES DeviceReg(id))''')
-            
-            self.conn.commit()
-            print("✅ Tablas creadas/verificadas")
+        """Crea o actualiza el esquema mediante las migraciones pendientes"""
+        try:
+            # Esquema al día: no se ejecuta ningún DDL ni commit
+            if get_schema_version(self.conn) < SCHEMA_VERSION:
+                migrate(self.conn)
+                print("✅ Tablas creadas/verificadas")
         except sql.Error as e:
             print(f'❌ Error creando tablas: {e}')
             if self.conn:
                 self.conn.rollback()
+        
+        self.fts_enabled = self._has_fulltext()
+    
+    def _has_fulltext(self):
+        """Indica si existe el índice FTS5 de DeviceReg"""
+        try:
+            self.cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'DeviceFTS'")
+            if self.cur.fetchone() is None:
+                return False
+            self.cur.execute('SELECT COUNT(*) FROM FtsDeferred')
+            deferred = self.cur.fetchone()[0]
+        except sql.Error:
+            return False
+        
+        if deferred:
+            # Una carga masiva en curso (o que terminó sin reanudarlo): se busca
+            # con LIKE hasta que se reconstruya; reconstruir aquí pisaría su trabajo
+            print("⚠️  Índice de texto completo en pausa por una carga masiva: "
+                  "las búsquedas usan LIKE hasta que termine")
+        return True
+    
+    def _fulltext_deferred(self):
+        """Indica si alguna carga masiva tiene en pausa el índice FTS5 (de cualquier proceso)"""
+        def query():
+            with self.read() as cur:
+                cur.execute('SELECT EXISTS (SELECT 1 FROM FtsDeferred)')
+                return bool(cur.fetchone()[0])
+        
+        return self._cached(('fts_deferred',), query, size=lambda deferred: 1)
+    
+    def suspend_fulltext(self):
+        """
+        Pone en pausa la actualización del índice FTS5
+        
+        Para cargas masivas: reconstruir el índice una vez al final con
+        resume_fulltext() es mucho más rápido que mantenerlo fila a fila.
+        Los triggers no se borran: se detienen mientras haya una marca en
+        FtsDeferred, así ninguna conexión (de este u otro proceso) deja el
+        índice a medias; mientras tanto las búsquedas usan LIKE.
+        """
+        if not self.fts_enabled:
+            return
+        with self.write() as cur:
+            cur.execute('INSERT INTO FtsDeferred DEFAULT VALUES')
+            self._fts_marker = cur.lastrowid
+    
+    def resume_fulltext(self):
+        """Quita la marca de suspend_fulltext y, si era la última, reconstruye el índice FTS5"""
+        marker = self._fts_marker
+        if not self.fts_enabled or marker is None:
+            return
+        self._fts_marker = None
+        try:
+            with self.write() as cur:
+                cur.execute('DELETE FROM FtsDeferred WHERE id = ?', (marker,))
+                cur.execute('SELECT EXISTS (SELECT 1 FROM FtsDeferred)')
+                if cur.fetchone()[0]:
+                    # Otra carga sigue en curso: reconstruye ella al terminar
+                    return
+                cur.execute("INSERT INTO DeviceFTS (DeviceFTS) VALUES ('rebuild')")
+            print("✅ Índice de búsqueda de texto completo reconstruido")
+        except sql.Error as e:
+            print(f'❌ Error reconstruyendo índice de texto completo: {e}')
+    
+    def rebuild_fulltext(self):
+        """
+        Quita todas las marcas de pausa y reconstruye el índice FTS5
+        
+        Para reparar el índice si una carga masiva terminó sin reanudarlo
+        (proceso interrumpido). No usar mientras otra carga está en curso.
+        """
+        if not self.fts_enabled:
+            return False
+        try:
+            with self.write() as cur:
+                cur.execute('DELETE FROM FtsDeferred')
+                cur.execute("INSERT INTO DeviceFTS (DeviceFTS) VALUES ('rebuild')")
+            print("✅ Índice de búsqueda de texto completo reconstruido")
+            return True
+        except sql.Error as e:
+            print(f'❌ Error reconstruyendo índice de texto completo: {e}')
+            return False
+    
+    def optimize(self):
+        """
+        Actualiza las estadísticas del planificador (sqlite_stat1)
+        
+        Las migraciones ejecutan ANALYZE con la tabla vacía, y PRAGMA optimize
+        no analiza una tabla que nunca tuvo estadísticas: sin ellas consultas
+        como "plant:UP01 serial:SER0001*" eligen el índice de planta y ordenan
+        en un B-tree temporal. Si DeviceReg ya tiene filas pero no estadísticas
+        se analiza una vez; después basta con PRAGMA optimize, que solo vuelve
+        a analizar lo que cambió mucho.
+        """
+        try:
+            with self.write() as cur:
+                cur.execute(f'PRAGMA analysis_limit = {int(ANALYSIS_LIMIT)}')
+                cur.fetchall()
+                cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'")
+                has_stats = cur.fetchone() is not None
+                if has_stats:
+                    cur.execute("SELECT 1 FROM sqlite_stat1 WHERE tbl = 'DeviceReg' LIMIT 1")
+                    has_stats = cur.fetchone() is not None
+                cur.execute('SELECT 1 FROM DeviceReg LIMIT 1')
+                if cur.fetchone() is not None and not has_stats:
+                    cur.execute('ANALYZE DeviceReg')
+                else:
+                    cur.execute('PRAGMA optimize')
+                    cur.fetchall()
+            return True
+        except sql.Error as e:
+            print(f'⚠️  No se pudieron actualizar las estadísticas: {e}')
+            return False
+    
+    @staticmethod
+    def insert_device(cur, plant, serialno, device_type, model, failuretype, observations):
+        """
+        Alta de un dispositivo con su log, dentro de una sesión de escritura
+        
+        No confirma ni captura errores: add_device y la cola de escritura
+        (src.write_queue) deciden cuándo hacer commit.
+        
+        Returns:
+            id del dispositivo
+        
+        Raises:
+            sqlite3.IntegrityError: si el serial ya existe
+        """
+        # Insertar dispositivo - AGREGADO plant
+        cur.execute('''INSERT INTO DeviceReg 
+                       (plant, serialno, type, model, failuretype, observations) 
+                       VALUES (?, ?, ?, ?, ?, ?)''',
+                    (plant, serialno, device_type, model, failuretype, observations))
+        device_id = cur.lastrowid
+        cur.execute('SELECT * FROM DeviceReg WHERE id = ?', (device_id,))
+        row = cur.fetchone()
+        
+        # Registrar en logs
+        cur.execute('''INSERT INTO ChangeLogs 
+                       (device_id, action, change_details, change_data) 
+                       VALUES (?, ?, ?, ?)''',
+                    (device_id, 'INSERT', 
+                     f'Dispositivo {serialno} ({model}) de planta {plant} agregado',
+                     row_to_json(row)))
+        return device_id
     
     def add_device(self, plant, serialno, device_type, model, failuretype, observations):
         """Añade un dispositivo y registra en logs"""
         try:
-            # Insertar dispositivo - AGREGADO plant
-            self.cur.execute('''INSERT INTO DeviceReg 
-                              (plant, serialno, type, model, failuretype, observations) 
-                              VALUES (?, ?, ?, ?, ?, ?)''',
-                              (plant, serialno, device_type, model, failuretype, observations))
-            device_id = self.cur.lastrowid
-            
-            # Registrar en logs
-            self.cur.execute('''INSERT INTO ChangeLogs 
-                              (device_id, action, change_details) 
-                              VALUES (?, ?, ?)''',
-                              (device_id, 'INSERT', 
-                               f'Dispositivo {serialno} ({model}) de planta {plant} agregado'))
+            with self.write() as cur:
+                device_id = self.insert_device(cur, plant, serialno, device_type, model,
+                                               failuretype, observations)
             
-            self.conn.commit()
             print(f"✅ Dispositivo agregado: {serialno} (ID: {device_id})")
             return device_id
         except sql.IntegrityError:
             print(f'❌ Error: Serial {serialno} ya existe')
-            if self.conn:
-                self.conn.rollback()
             return None
         except sql.Error as e:
             print(f'❌ Error: {e}')
-            if self.conn:
-                self.conn.rollback()
             return None
     
+    def add_devices_bulk(self, devices, verbose=True):
+        """
+        Añade muchos dispositivos en una sola transacción con sus registros en ChangeLogs
+        
+        Args:
+            devices: iterable de Device, diccionarios con los argumentos de add_device
+                     o tuplas (plant, serialno, device_type, model, failuretype,
+                     observations[, entry_date])
+            verbose: Imprimir el resumen del lote
+        
+        Returns:
+            Lista de BulkResult en el mismo orden de entrada. Los seriales que ya
+            existen (en la base de datos o repetidos en el lote) se marcan como
+            'duplicate' y las filas sin serial como 'error', sin abortar el resto
+            del lote.
+        """
+        rows = [self._device_params(device) for device in devices]
+        results = [None] * len(rows)
+        
+        # Duplicados dentro del propio lote: gana la primera aparición
+        seen = set()
+        pending = []
+        for i, row in enumerate(rows):
+            serialno = row[1]
+            if not serialno:
+                # Sin serial no hay forma de detectar duplicados ni enlazar el log
+                results[i] = BulkResult(serialno, None, 'error')
+            elif serialno in seen:
+                results[i] = BulkResult(serialno, None, 'duplicate')
+            else:
+                seen.add(serialno)
+                pending.append(i)
+        
+        try:
+            # Bloqueo de escritura desde el inicio: nadie inserta entre la verificación y el INSERT
+            with self.write(immediate=True) as cur:
+                # Duplicados contra la base de datos (usa el índice UNIQUE de serialno)
+                existing = set()
+                for chunk in _chunks([rows[i][1] for i in pending], BULK_CHUNK_SIZE):
+                    placeholders = ','.join('?' * len(chunk))
+                    cur.execute(f'SELECT serialno FROM DeviceReg WHERE serialno IN ({placeholders})',
+                                chunk)
+                    existing.update(r[0] for r in cur.fetchall())
+                
+                to_insert = []
+                for i in pending:
+                    if rows[i][1] in existing:
+                        results[i] = BulkResult(rows[i][1], None, 'duplicate')
+                    else:
+                        to_insert.append(i)
+                
+                cur.executemany('''INSERT INTO DeviceReg 
+                                   (plant, serialno, type, model, failuretype, observations, entry_date) 
+                                   VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))''',
+                                (rows[i] for i in to_insert))
+                
+                # Recuperar las filas insertadas (ids asignados y fechas) para enlazar los logs
+                inserted = {}
+                for chunk in _chunks([rows[i][1] for i in to_insert], BULK_CHUNK_SIZE):
+                    placeholders = ','.join('?' * len(chunk))
+                    cur.execute(f'SELECT * FROM DeviceReg WHERE serialno IN ({placeholders})',
+                                chunk)
+                    inserted.update((row[2], row) for row in cur.fetchall())
+                
+                logs = []
+                for i in to_insert:
+                    plant, serialno, _, model = rows[i][:4]
+                    row = inserted[serialno]
+                    results[i] = BulkResult(serialno, row[0], 'inserted')
+                    logs.append((row[0], 'INSERT',
+                                 f'Dispositivo {serialno} ({model}) de planta {plant} agregado',
+                                 row_to_json(row)))
+                
+                cur.executemany('''INSERT INTO ChangeLogs 
+                                   (device_id, action, change_details, change_data) 
+                                   VALUES (?, ?, ?, ?)''', logs)
+            
+            if verbose:
+                print(f"✅ Carga masiva: {len(to_insert)} agregados, "
+                      f"{len(rows) - len(to_insert)} duplicados")
+            return results
+        except sql.Error as e:
+            print(f'❌ Error en carga masiva: {e}')
+            return [BulkResult(row[1], None, 'error') for row in rows]
+    
+    @staticmethod
+    def _device_params(device):
+        """Normaliza un dispositivo al orden de columnas usado por add_devices_bulk"""
+        if isinstance(device, dict):
+            entry_date = device.get('entry_date')
+            params = (device.get('plant'), device.get('serialno'),
+                      device.get('device_type', device.get('type')), device.get('model'),
+                      device.get('failuretype', device.get('failure_type')),
+                      device.get('observations'))
+        elif hasattr(device, 'serialno'):
+            entry_date = device.entry_date
+            params = (device.plant, device.serialno, device.device_type, device.model,
+                      device.failure_type, device.observations)
+        else:
+            device = tuple(device)
+            entry_date = device[6] if len(device) > 6 else None
+            params = device[:6]
+        
+        if isinstance(entry_date, datetime):
+            entry_date = entry_date.strftime('%Y-%m-%d %H:%M:%S')
+        return tuple(params) + (entry_date,)
+    
+    @classmethod
+    def delete_devices(cls, cur, search_term, search_by="serialno", exact_match=False):
+        """
+        Baja de los dispositivos de un criterio con un log por fila, dentro de una sesión
+        
+        Returns:
+            Cantidad de dispositivos eliminados
+        """
+        where, params = cls._delete_filter(search_term, search_by, exact_match)
+        
+        # Filas que se van a eliminar, leídas en la misma transacción que el DELETE
+        cur.execute(f'SELECT * FROM DeviceReg WHERE {where}', params)
+        rows = cur.fetchall()
+        
+        cur.execute(f'DELETE FROM DeviceReg WHERE {where}', params)
+        deleted_count = cur.rowcount
+        
+        cur.executemany('''INSERT INTO ChangeLogs 
+                           (device_id, action, change_details, change_data) 
+                           VALUES (?, ?, ?, ?)''',
+                        ((row[0], 'DELETE',
+                          f'Dispositivo {row[2]} ({row[4]}) de planta {row[1]} eliminado',
+                          row_to_json(row)) for row in rows))
+        return deleted_count
+    
     def del_SData(self, search_term, search_by="serialno", exact_match=False):
-        """Elimina datos según criterio de búsqueda"""
+        """Elimina datos según criterio de búsqueda y registra cada baja en logs"""
         try:
-            if search_by == "serialno":
-                if exact_match:
-                    self.cur.execute('DELETE FROM DeviceReg WHERE serialno = ?', (search_term,))
-                else:
-                    self.cur.execute('DELETE FROM DeviceReg WHERE serialno LIKE ?', 
-                                (f'%{search_term}%',))
-            elif search_by == "model":
-                if exact_match:
-                    self.cur.execute('DELETE FROM DeviceReg WHERE model = ?', (search_term,))
-                else:
-                    self.cur.execute('DELETE FROM DeviceReg WHERE model LIKE ?', 
-                                (f'%{search_term}%',))
-            elif search_by == "type":
-                if exact_match:
-                    self.cur.execute('DELETE FROM DeviceReg WHERE type = ?', (search_term,))
-                else:
-                    self.cur.execute('DELETE FROM DeviceReg WHERE type LIKE ?', 
-                                (f'%{search_term}%',))
-            elif search_by == "plant":
-                if exact_match:
-                    self.cur.execute('DELETE FROM DeviceReg WHERE plant = ?', (search_term,))
-                else:
-                    self.cur.execute('DELETE FROM DeviceReg WHERE plant LIKE ?', 
-                                (f'%{search_term}%',))
-            elif search_by == "entry_date":
-                self.cur.execute('DELETE FROM DeviceReg WHERE entry_date = ?', 
-                            (search_term,))
-            else:
-                self.cur.execute('DELETE FROM DeviceReg WHERE serialno LIKE ? OR model LIKE ? OR plant LIKE ?', 
-                            (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
+            with self.write(immediate=True) as cur:
+                deleted_count = self.delete_devices(cur, search_term, search_by, exact_match)
             
-            deleted_count = self.cur.rowcount
-            self.conn.commit()
             print(f"✅ Eliminados {deleted_count} registros")
             return deleted_count
         except Exception as e:
             print(f'❌ Error al eliminar información: {e}')
-            if self.conn:
-                self.conn.rollback()
             return 0
+    
+    @staticmethod
+    def _delete_filter(search_term, search_by, exact_match):
+        """Condición WHERE y parámetros de del_SData"""
+        if search_by in ("serialno", "model", "type", "plant"):
+            if exact_match:
+                return f'{search_by} = ?', (search_term,)
+            return f'{search_by} {LIKE_CONTAINS}', (like_contains(search_term),)
+        if search_by == "entry_date":
+            return 'entry_date = ?', (search_term,)
+        pattern = like_contains(search_term)
+        return (f'serialno {LIKE_CONTAINS} OR model {LIKE_CONTAINS} OR plant {LIKE_CONTAINS}',
+                (pattern, pattern, pattern))
+    
+    @staticmethod
+    def check_changes(changes):
+        """Valida las columnas de una modificación (ValueError si alguna no es modificable)"""
+        invalid = set(changes) - set(UPDATABLE_COLUMNS)
+        if invalid:
+            raise ValueError(f"Columnas no modificables: {', '.join(sorted(invalid))}")
+    
+    @staticmethod
+    def modify_device(cur, device_id, changes):
+        """
+        Modificación de un dispositivo con su log, dentro de una sesión de escritura
+        
+        Returns:
+            La fila actualizada, o None si el dispositivo no existe
+        """
+        if not changes:
+            return None
+        assignments = ', '.join(f'{column} = ?' for column in changes)
+        cur.execute(f'UPDATE DeviceReg SET {assignments} WHERE id = ?',
+                    tuple(changes.values()) + (device_id,))
+        if cur.rowcount == 0:
+            return None
+        
+        cur.execute('SELECT * FROM DeviceReg WHERE id = ?', (device_id,))
+        row = cur.fetchone()
+        details = ', '.join(f'{column}={value}' for column, value in changes.items())
+        cur.execute('''INSERT INTO ChangeLogs 
+                       (device_id, action, change_details, change_data) 
+                       VALUES (?, ?, ?, ?)''',
+                    (device_id, 'UPDATE', f'Dispositivo {row[2]} actualizado: {details}',
+                     row_to_json(row)))
+        return row
+    
+    def update_device(self, device_id, **changes):
+        """
+        Modifica columnas de un dispositivo y registra el cambio en logs
+        
+        Args:
+            device_id: id del dispositivo
+            **changes: columnas de UPDATABLE_COLUMNS con su nuevo valor
+        
+        Returns:
+            True si el dispositivo existía y se actualizó
+        """
+        self.check_changes(changes)
+        if not changes:
+            return False
+        
+        try:
+            with self.write() as cur:
+                row = self.modify_device(cur, device_id, changes)
+            if row is None:
+                return False
+            
+            print(f"✅ Dispositivo actualizado: {row[2]} (ID: {device_id})")
+            return True
+        except sql.IntegrityError:
+            print(f'❌ Error: Serial {changes.get("serialno")} ya existe')
+            return False
+        except sql.Error as e:
+            print(f'❌ Error al actualizar dispositivo: {e}')
+            return False
 
+    def get_device(self, device_id):
+        """Fila de un dispositivo por id, o None si no existe"""
+        try:
+            with self.read() as cur:
+                cur.execute('SELECT * FROM DeviceReg WHERE id = ?', (device_id,))
+                return cur.fetchone()
+        except sql.Error as e:
+            print(f'❌ Error en consulta: {e}')
+            return None
+    
     def search_device(self, search_term, search_by="serialno"):
         """Busca dispositivos por criterio"""
+        def query():
+            where, params = self._search_filter(search_term, search_by)
+            with self.read() as cur:
+                cur.execute(f'SELECT * FROM DeviceReg WHERE {where}', params)
+                return cur.fetchall()
+        
         try:
-            if search_by == "serialno":
-                self.cur.execute('SELECT * FROM DeviceReg WHERE serialno LIKE ?', 
-                            (f'%{search_term}%',))
-            elif search_by == "type":
-                self.cur.execute('SELECT * FROM DeviceReg WHERE type LIKE ?', 
-                            (f'%{search_term}%',))
-            elif search_by == "model":
-                self.cur.execute('SELECT * FROM DeviceReg WHERE model LIKE ?', 
-                            (f'%{search_term}%',))
-            elif search_by == "plant":
-                self.cur.execute('SELECT * FROM DeviceReg WHERE plant LIKE ?', 
-                            (f'%{search_term}%',))
-            elif search_by == "entry_date":
-                self.cur.execute('SELECT * FROM DeviceReg WHERE entry_date LIKE ?', 
-                            (f'{search_term}%',))
-            else:
-                self.cur.execute('SELECT * FROM DeviceReg WHERE serialno LIKE ? OR type LIKE ? OR model LIKE ? OR plant LIKE ?', 
-                            (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-            
-            results = self.cur.fetchall()
+            # Copia: quien llama puede modificar la lista sin tocar la caché
+            results = list(self._cached(('search', search_by, search_term), query))
             print(f"✅ Búsqueda encontrada: {len(results)} resultados")
             return results
         except sql.Error as e:
             print(f'❌ Error en búsqueda: {e}')
             return []
+    
+    def _can_use_fts(self, search_term):
+        """Indica si el término puede resolverse con el índice trigram"""
+        return (self.fts_enabled and len(search_term) >= FTS_MIN_TERM_LENGTH
+                and not self._fulltext_deferred())
+    
+    def _search_filter(self, search_term, search_by):
+        """Construye la condición WHERE y sus parámetros para un criterio de búsqueda"""
+        if search_by is None:
+            # Sin criterio: todos los dispositivos
+            return '1', ()
+        
+        if search_by == "query":
+            # Consulta combinada (plant:UP02 type:Laptop ...); las palabras sueltas como "all"
+            return compile_query(search_term, lambda word: self._search_filter(word, "all"))
+        
+        if search_by == "entry_date":
+            # Rango en lugar de LIKE 'prefijo%' para aprovechar el índice de entry_date
+            return 'entry_date >= ? AND entry_date < ?', prefix_range(search_term)
+        
+        if self._can_use_fts(search_term):
+            # Búsqueda por subcadena usando el índice FTS5
+            columns = FTS_COLUMN_FILTERS.get(search_by, FTS_COLUMN_FILTERS["all"])
+            # El término va como frase entre comillas: trigram la trata como subcadena literal
+            phrase = search_term.replace('"', '""')
+            return ('id IN (SELECT rowid FROM DeviceFTS WHERE DeviceFTS MATCH ?)',
+                    (f'{columns} : "{phrase}"',))
+        
+        # Búsqueda por subcadena con LIKE (recorre toda la tabla)
+        pattern = like_contains(search_term)
+        if search_by in ("serialno", "type", "model", "plant"):
+            return f'{search_by} {LIKE_CONTAINS}', (pattern,)
+        return (f'(serialno {LIKE_CONTAINS} OR type {LIKE_CONTAINS} OR model {LIKE_CONTAINS} '
+                f'OR plant {LIKE_CONTAINS})',
+                (pattern, pattern, pattern, pattern))
                 
     def get_all_devices(self):
         """Obtiene todos los dispositivos"""
+        def query():
+            with self.read() as cur:
+                cur.execute('SELECT * FROM DeviceReg ORDER BY entry_date DESC')
+                return cur.fetchall()
+        
         try:
-            self.cur.execute('SELECT * FROM DeviceReg ORDER BY entry_date DESC')
-            results = self.cur.fetchall()
+            results = list(self._cached(('all',), query))
             print(f"✅ Total dispositivos: {len(results)}")
             return results
         except sql.Error as e:
             print(f'❌ Error en consulta: {e}')
             return []
     
+    def search_page(self, search_term=None, search_by=None, page_size=DEFAULT_PAGE_SIZE, token=None):
+        """
+        Devuelve una página de dispositivos ordenada por (entry_date, id) descendente
+        
+        Con search_by=None se listan todos los dispositivos. token es el valor de
+        continuación devuelto por la página anterior (None para la primera).
+        
+        Returns:
+            (filas, token) donde token es None si no hay más páginas
+        """
+        key = ('page', search_by, search_term, page_size, token)
+        rows, token = self._cached(key, lambda: self._fetch_page(search_term, search_by, page_size, token),
+                                   size=lambda page: len(page[0]))
+        return list(rows), token
+    
+    def _fetch_page(self, search_term, search_by, page_size, token):
+        """Consulta de search_page (sin caché)"""
+        where, params = self._search_filter(search_term, search_by)
+        if token is not None:
+            # Keyset: continuar justo después de la última fila entregada
+            where = f'{where} AND (entry_date, id) < (?, ?)'
+            params = tuple(params) + tuple(token)
+        
+        with self.read() as cur:
+            # Se pide una fila extra para saber si existe una página siguiente
+            cur.execute(f'''SELECT * FROM DeviceReg WHERE {where}
+                            ORDER BY entry_date DESC, id DESC LIMIT ?''',
+                        tuple(params) + (page_size + 1,))
+            rows = cur.fetchall()
+        
+        if len(rows) <= page_size:
+            return rows, None
+        
+        rows = rows[:page_size]
+        last = rows[-1]
+        return rows, (last[ENTRY_DATE_INDEX], last[0])
+    
+    def page_token_at(self, offset, search_term=None, search_by=None):
+        """
+        Token de search_page para empezar en la fila número offset
+
+        Permite saltar a cualquier página sin traer las anteriores: el OFFSET
+        solo recorre la clave (entry_date, id), no las filas completas.
+
+        Returns:
+            El token, o None si offset es 0 o está más allá del último resultado
+        """
+        if offset <= 0:
+            return None
+        
+        def query():
+            where, params = self._search_filter(search_term, search_by)
+            with self.read() as cur:
+                cur.execute(f'''SELECT entry_date, id FROM DeviceReg WHERE {where}
+                                ORDER BY entry_date DESC, id DESC LIMIT 1 OFFSET ?''',
+                            tuple(params) + (offset - 1,))
+                row = cur.fetchone()
+            return tuple(row) if row else None
+        
+        return self._cached(('token', search_by, search_term, offset), query, size=lambda token: 1)
+
+    def explain_query(self, search_term=None, search_by="query"):
+        """
+        Plan de SQLite para la búsqueda (EXPLAIN QUERY PLAN), para depurar filtros
+        
+        Returns:
+            (sql, parámetros, líneas del plan) de la consulta que hace search_page
+        """
+        where, params = self._search_filter(search_term, search_by)
+        query = f'SELECT * FROM DeviceReg WHERE {where} ORDER BY entry_date DESC, id DESC'
+        with self.read() as cur:
+            cur.execute(f'EXPLAIN QUERY PLAN {query}', params)
+            plan = [row[3] for row in cur.fetchall()]
+        return query, params, plan
+    
+    def iter_pages(self, search_term=None, search_by=None, page_size=DEFAULT_PAGE_SIZE, token=None):
+        """Generador de páginas de resultados; consulta la siguiente solo cuando se pide"""
+        while True:
+            rows, token = self.search_page(search_term, search_by, page_size, token)
+            if rows:
+                yield rows
+            if token is None:
+                return
+    
+    def iter_devices(self, search_term=None, search_by=None, chunk_size=DEFAULT_PAGE_SIZE):
+        """
+        Recorre los dispositivos de un criterio directamente desde el cursor
+        
+        Las filas se leen con fetchmany en bloques de chunk_size, en el mismo orden
+        que search_page, sin cargar el resultado completo en memoria.
+        """
+        where, params = self._search_filter(search_term, search_by)
+        # La conexión de lectura queda tomada hasta que se agota o se cierra el generador
+        with self.read() as cur:
+            cur.execute(f'SELECT * FROM DeviceReg WHERE {where} ORDER BY entry_date DESC, id DESC',
+                        params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+    
+    def count_devices(self, search_term=None, search_by=None):
+        """Cuenta los dispositivos que cumplen un criterio sin traer las filas"""
+        def query():
+            where, params = self._search_filter(search_term, search_by)
+            with self.read() as cur:
+                cur.execute(f'SELECT COUNT(*) FROM DeviceReg WHERE {where}', params)
+                return cur.fetchone()[0]
+        
+        try:
+            return self._cached(('count', search_by, search_term), query, size=lambda count: 1)
+        except sql.Error as e:
+            if self._interrupted():
+                # Búsqueda cancelada (interruptible): no es un conteo de 0
+                raise
+            print(f'❌ Error contando dispositivos: {e}')
+            return 0
+    
+    def reopen(self):
+        """
+        Vuelve a abrir la conexión sobre el archivo actual
+        
+        Después de restaurar un backup (que reemplaza el archivo) la conexión
+        anterior seguiría viendo la base vieja; así la aplicación continúa
+        sin reiniciarse.
+        """
+        with self._write_lock:
+            self.close()
+            self._connect()
+            self.create_tables()
+    
     def close(self):
         """Cierra la conexión de forma segura"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.cur = None
-            print("✅ Conexión a base de datos cerrada")
+        with self._write_lock:
+            if self.conn:
+                if self.db_name != MEMORY_DATABASE:
+                    # Estadísticas al día para la próxima sesión
+                    self.optimize()
+                self._pool.close()
+                with self._version_lock:
+                    if self._version_conn is not None:
+                        self._version_conn.close()
+                        self._version_conn = None
+                self.conn.close()
+                self.conn = None
+                self.cur = None
+                print("✅ Conexión a base de datos cerrada")
     
     def __enter__(self):
         """Para usar con 'with' statement"""
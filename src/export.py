@@ -0,0 +1,206 @@
+"""
+Exportación de dispositivos en streaming
+
+Las filas se escriben a medida que se leen del cursor de la base de datos,
+de modo que la memoria usada no depende de la cantidad de filas exportadas.
+"""
+import csv
+import json
+import os
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, List, Optional
+
+
+# Encabezados en el orden de las columnas de DeviceReg
+EXPORT_COLUMNS = [
+    "ID",
+    "Código Planta",
+    "Serial",
+    "Tipo",
+    "Modelo",
+    "Falla",
+    "Fecha",
+    "Observaciones",
+]
+
+# Claves de cada objeto en JSON Lines (nombres de columna de DeviceReg)
+NDJSON_FIELDS = [
+    "id",
+    "plant",
+    "serialno",
+    "type",
+    "model",
+    "failuretype",
+    "entry_date",
+    "observations",
+]
+
+# Filas escritas entre cada aviso de progreso
+EXPORT_CHUNK_SIZE = 1000
+
+# Búfer de escritura de los exportadores de texto (bytes)
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+DEFAULT_EXPORT_FORMAT = "xlsx"
+
+
+def format_export_row(row: tuple) -> tuple:
+    """Prepara una fila de DeviceReg para exportar (fecha legible, sin None)"""
+    values = [value if value is not None else "" for value in row[:8]]
+    values.extend([""] * (8 - len(values)))
+
+    fecha = values[6]
+    if fecha:
+        try:
+            values[6] = datetime.strptime(str(fecha), '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%Y %H:%M')
+        except ValueError:
+            # Si falla, mantener el formato original
+            pass
+
+    return tuple(values)
+
+
+def export_rows_xlsx(rows: Iterable[tuple], filepath: str,
+                     columns: Optional[List[str]] = None,
+                     formatter: Optional[Callable[[tuple], tuple]] = format_export_row,
+                     progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Escribe filas en un libro de Excel en modo write-only
+
+    Args:
+        rows: Iterable de filas (p. ej. Database.iter_devices)
+        filepath: Ruta del .xlsx a crear
+        columns: Encabezados (por defecto EXPORT_COLUMNS)
+        formatter: Función aplicada a cada fila antes de escribirla (None para ninguna)
+        progress: Callback opcional que recibe la cantidad de filas escritas
+
+    Returns:
+        Cantidad de filas escritas
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Datos')
+    sheet.append(columns or EXPORT_COLUMNS)
+
+    count = 0
+    for row in rows:
+        sheet.append(formatter(row) if formatter else row)
+        count += 1
+        if progress and count % EXPORT_CHUNK_SIZE == 0:
+            progress(count)
+
+    workbook.save(filepath)
+    if progress:
+        progress(count)
+    return count
+
+
+def export_rows_csv(rows: Iterable[tuple], filepath: str,
+                    columns: Optional[List[str]] = None,
+                    formatter: Optional[Callable[[tuple], tuple]] = format_export_row,
+                    progress: Optional[Callable[[int], None]] = None,
+                    delimiter: str = ',', encoding: str = 'utf-8-sig') -> int:
+    """
+    Escribe filas en un CSV por bloques con un búfer grande
+
+    utf-8-sig por defecto para que Excel reconozca los acentos al abrirlo.
+    Mismos argumentos y valor de retorno que export_rows_xlsx.
+    """
+    rows = iter(rows)
+    count = 0
+    with open(filepath, 'w', newline='', encoding=encoding, buffering=EXPORT_BUFFER_SIZE) as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(columns or EXPORT_COLUMNS)
+        while True:
+            chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            writer.writerows(map(formatter, chunk) if formatter else chunk)
+            count += len(chunk)
+            if progress:
+                progress(count)
+
+    if progress and count == 0:
+        progress(count)
+    return count
+
+
+def export_rows_ndjson(rows: Iterable[tuple], filepath: str,
+                       columns: Optional[List[str]] = None,
+                       formatter: Optional[Callable[[tuple], tuple]] = None,
+                       progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Escribe filas como JSON Lines: un objeto por línea
+
+    Las claves son los nombres de columna de DeviceReg (NDJSON_FIELDS) y la
+    fecha se deja en el formato de SQLite, pensado para otros programas.
+    """
+    fields = columns or NDJSON_FIELDS
+    rows = iter(rows)
+    count = 0
+    with open(filepath, 'w', encoding='utf-8', buffering=EXPORT_BUFFER_SIZE) as f:
+        while True:
+            chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            f.writelines(
+                json.dumps(dict(zip(fields, formatter(row) if formatter else row)),
+                           ensure_ascii=False, default=str) + '\n'
+                for row in chunk
+            )
+            count += len(chunk)
+            if progress:
+                progress(count)
+
+    if progress and count == 0:
+        progress(count)
+    return count
+
+
+# Formato -> (función de exportación, descripción para el diálogo de guardado)
+EXPORT_FORMATS = {
+    "xlsx": (export_rows_xlsx, "Excel files"),
+    "csv": (export_rows_csv, "CSV files"),
+    "ndjson": (export_rows_ndjson, "JSON Lines files"),
+}
+
+# Extensiones alternativas aceptadas para cada formato
+FORMAT_ALIASES = {
+    "jsonl": "ndjson",
+}
+
+
+def normalize_export_format(export_format: Optional[str]) -> str:
+    """Devuelve un formato conocido a partir de un nombre o extensión ('.CSV', 'jsonl'...)"""
+    name = (export_format or "").lower().lstrip('.')
+    name = FORMAT_ALIASES.get(name, name)
+    if name not in EXPORT_FORMATS:
+        if name:
+            print(f"⚠️  Formato de exportación desconocido: {export_format}, se usa {DEFAULT_EXPORT_FORMAT}")
+        return DEFAULT_EXPORT_FORMAT
+    return name
+
+
+def export_format_for(filepath: str, default: str = DEFAULT_EXPORT_FORMAT) -> str:
+    """Formato según la extensión del archivo; si no la tiene o no se reconoce, el default"""
+    extension = os.path.splitext(filepath)[1].lower().lstrip('.')
+    extension = FORMAT_ALIASES.get(extension, extension)
+    if extension in EXPORT_FORMATS:
+        return extension
+    return normalize_export_format(default)
+
+
+def get_exporter(filepath: str, default: str = DEFAULT_EXPORT_FORMAT) -> Callable[..., int]:
+    """Función de exportación adecuada para el archivo elegido"""
+    return EXPORT_FORMATS[export_format_for(filepath, default)][0]
+
+
+def export_filetypes(preferred: str = DEFAULT_EXPORT_FORMAT) -> List[tuple]:
+    """Tipos de archivo para filedialog, con el formato preferido primero"""
+    preferred = normalize_export_format(preferred)
+    order = [preferred] + [name for name in EXPORT_FORMATS if name != preferred]
+    filetypes = [(EXPORT_FORMATS[name][1], f"*.{name}") for name in order]
+    filetypes.append(("All files", "*.*"))
+    return filetypes
@@ -0,0 +1,194 @@
+"""
+Migraciones del esquema de la base de datos
+
+Cada migración lleva un número de versión que se guarda en PRAGMA user_version.
+Al abrir la base de datos solo se ejecutan las migraciones pendientes; si el
+esquema ya está al día no se ejecuta ningún DDL.
+"""
+import sqlite3 as sql
+
+
+def _create_base_tables(cur):
+    """Tablas DeviceReg y ChangeLogs"""
+    # Tabla principal de dispositivos - AÑADIDA COLUMNA plant
+    cur.execute('''CREATE TABLE IF NOT EXISTS DeviceReg (
+        id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        plant TEXT,
+        serialno TEXT UNIQUE,
+        type VARCHAR(60),
+        model TEXT,
+        failuretype VARCHAR(60),
+        entry_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        observations TEXT)
+        ''')
+
+    # Tabla de logs para cambios
+    cur.execute('''CREATE TABLE IF NOT EXISTS ChangeLogs (
+        log_id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        device_id INTEGER,
+        action TEXT,
+        change_details TEXT,
+        change_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (device_id) REFERENCES DeviceReg(id))''')
+
+
+def _create_fulltext(cur):
+    """Índice FTS5 (trigram) de DeviceReg y los triggers que lo sincronizan"""
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='DeviceFTS'")
+    exists = cur.fetchone() is not None
+
+    try:
+        # Tabla sombra de contenido externo: solo guarda el índice, no duplica los datos
+        cur.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS DeviceFTS USING fts5(
+            serialno, type, model, plant, observations,
+            content='DeviceReg', content_rowid='id', tokenize='trigram')''')
+    except sql.OperationalError as e:
+        # SQLite sin FTS5 o sin tokenizer trigram: las búsquedas usan LIKE
+        print(f"⚠️  Búsqueda de texto completo no disponible: {e}")
+        return
+
+    create_fulltext_triggers(cur)
+
+    if not exists:
+        # Backfill único para bases de datos creadas antes del índice
+        cur.execute("INSERT INTO DeviceFTS (DeviceFTS) VALUES ('rebuild')")
+        print("✅ Índice de búsqueda de texto completo construido")
+
+
+def create_fulltext_triggers(cur):
+    """
+    Triggers que mantienen DeviceFTS sincronizado con DeviceReg
+
+    Mientras FtsDeferred tenga filas (una carga masiva en curso, ver
+    Database.suspend_fulltext) no actualizan el índice, para nadie: al
+    terminar la carga se reconstruye completo, incluidas las filas que
+    otros procesos escribieron mientras tanto.
+    """
+    cur.execute('''CREATE TABLE IF NOT EXISTS FtsDeferred (
+        id INTEGER PRIMARY KEY,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    cur.execute('''CREATE TRIGGER IF NOT EXISTS DeviceReg_fts_insert
+        AFTER INSERT ON DeviceReg WHEN NOT EXISTS (SELECT 1 FROM FtsDeferred) BEGIN
+            INSERT INTO DeviceFTS (rowid, serialno, type, model, plant, observations)
+            VALUES (new.id, new.serialno, new.type, new.model, new.plant, new.observations);
+        END''')
+    cur.execute('''CREATE TRIGGER IF NOT EXISTS DeviceReg_fts_delete
+        AFTER DELETE ON DeviceReg WHEN NOT EXISTS (SELECT 1 FROM FtsDeferred) BEGIN
+            INSERT INTO DeviceFTS (DeviceFTS, rowid, serialno, type, model, plant, observations)
+            VALUES ('delete', old.id, old.serialno, old.type, old.model, old.plant, old.observations);
+        END''')
+    cur.execute('''CREATE TRIGGER IF NOT EXISTS DeviceReg_fts_update
+        AFTER UPDATE ON DeviceReg WHEN NOT EXISTS (SELECT 1 FROM FtsDeferred) BEGIN
+            INSERT INTO DeviceFTS (DeviceFTS, rowid, serialno, type, model, plant, observations)
+            VALUES ('delete', old.id, old.serialno, old.type, old.model, old.plant, old.observations);
+            INSERT INTO DeviceFTS (rowid, serialno, type, model, plant, observations)
+            VALUES (new.id, new.serialno, new.type, new.model, new.plant, new.observations);
+        END''')
+
+
+def _create_secondary_indexes(cur):
+    """Índices para filtros, ordenamiento e historial"""
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_devicereg_model ON DeviceReg (model)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_devicereg_type ON DeviceReg (type)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_devicereg_plant ON DeviceReg (plant)')
+    # (entry_date, id) cubre el ORDER BY de get_all_devices y los rangos de fecha
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_devicereg_entry_date ON DeviceReg (entry_date, id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_changelogs_device ON ChangeLogs (device_id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_changelogs_date ON ChangeLogs (change_date)')
+
+
+def _add_change_data(cur):
+    """Columna change_data en ChangeLogs: la fila afectada en JSON"""
+    cur.execute('PRAGMA table_info(ChangeLogs)')
+    if 'change_data' not in {row[1] for row in cur.fetchall()}:
+        cur.execute('ALTER TABLE ChangeLogs ADD COLUMN change_data TEXT')
+
+
+def _create_failuretype_index(cur):
+    """Índice de failuretype para los filtros failure: del lenguaje de consulta"""
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_devicereg_failuretype ON DeviceReg (failuretype)')
+
+
+def _defer_fulltext_triggers(cur):
+    """Triggers del índice FTS5 que se pausan con FtsDeferred en lugar de borrarse"""
+    cur.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') "
+                "AND name IN ('DeviceFTS', 'DeviceReg_fts_insert')")
+    names = {row[0] for row in cur.fetchall()}
+    if 'DeviceFTS' not in names:
+        return
+    for trigger in ('DeviceReg_fts_insert', 'DeviceReg_fts_delete', 'DeviceReg_fts_update'):
+        cur.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    create_fulltext_triggers(cur)
+    if 'DeviceReg_fts_insert' not in names:
+        # Quedó suspendido con el mecanismo anterior (trigger borrado)
+        cur.execute("INSERT INTO DeviceFTS (DeviceFTS) VALUES ('rebuild')")
+
+
+def _create_nocase_indexes(cur):
+    """
+    Índices NOCASE para los términos campo:valor del lenguaje de consulta
+
+    src.query_language compara con COLLATE NOCASE y SQLite solo usa un índice
+    con la misma intercalación. Los de planta, tipo, modelo y falla solo los
+    usaba ese lenguaje, así que se reemplazan; el de serial es nuevo porque
+    el UNIQUE (binario) sigue haciendo falta para detectar duplicados.
+    """
+    for name, column in (('idx_devicereg_plant', 'plant'), ('idx_devicereg_type', 'type'),
+                         ('idx_devicereg_model', 'model'), ('idx_devicereg_failuretype', 'failuretype')):
+        cur.execute(f'DROP INDEX IF EXISTS {name}')
+        cur.execute(f'CREATE INDEX {name} ON DeviceReg ({column} COLLATE NOCASE)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_devicereg_serialno_nocase ON DeviceReg (serialno COLLATE NOCASE)')
+
+
+# (versión, descripción, función, ejecutar ANALYZE al terminar)
+MIGRATIONS = [
+    (1, "Tablas base", _create_base_tables, False),
+    (2, "Índice de texto completo", _create_fulltext, False),
+    (3, "Índices secundarios", _create_secondary_indexes, True),
+    (4, "Datos de cambios en ChangeLogs", _add_change_data, False),
+    (5, "Índice de tipo de falla", _create_failuretype_index, True),
+    (6, "Pausa del índice de texto completo", _defer_fulltext_triggers, False),
+    (7, "Índices sin distinción de mayúsculas", _create_nocase_indexes, True),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Devuelve la versión de esquema guardada en la base de datos"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Aplica las migraciones pendientes y devuelve las versiones aplicadas"""
+    current = get_schema_version(conn)
+    applied = []
+    needs_analyze = False
+
+    for version, description, func, analyze in MIGRATIONS:
+        if version <= current:
+            continue
+
+        cur = conn.cursor()
+        try:
+            # Cada migración es atómica, incluido el cambio de user_version
+            cur.execute('BEGIN')
+            func(cur)
+            cur.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except sql.Error:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+        print(f"✅ Migración {version} aplicada: {description}")
+        applied.append(version)
+        needs_analyze = needs_analyze or analyze
+
+    if needs_analyze:
+        # Estadísticas frescas para que el planificador use los índices nuevos
+        conn.execute('ANALYZE')
+        conn.commit()
+
+    return applied
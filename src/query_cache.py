@@ -0,0 +1,85 @@
+"""
+Caché de resultados de consultas
+
+Las mismas búsquedas se repiten (refrescar después de eliminar, volver a la
+pestaña y pedir "Todos"). QueryCache guarda los últimos resultados, acotado
+por la cantidad total de filas, junto con la versión de los datos con la
+que se leyeron: cuando la versión cambia (cualquier escritura) se descarta
+todo, así nunca se devuelven filas viejas.
+"""
+import threading
+from collections import OrderedDict
+
+
+# Filas que puede retener la caché entre todas sus entradas
+QUERY_CACHE_ROWS = 50000
+
+# Valor de get() cuando la consulta no está en la caché
+MISSING = object()
+
+
+class QueryCache:
+    """LRU de resultados por clave de consulta, segura entre hilos"""
+
+    def __init__(self, max_rows=QUERY_CACHE_ROWS):
+        """
+        Args:
+            max_rows: Filas totales que se retienen (0 desactiva la caché)
+        """
+        self.max_rows = max_rows
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        """Descarta todo si los datos cambiaron desde que se guardaron las entradas"""
+        if version != self._version:
+            self._entries.clear()
+            self.rows = 0
+            self._version = version
+
+    def get(self, key, version):
+        """Resultado guardado para key con esta versión de los datos, o MISSING"""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, version, value, size):
+        """
+        Guarda un resultado leído con esta versión de los datos (tras un get() sin resultado)
+
+        Args:
+            size: Filas que ocupa el resultado (los que no entran no se guardan)
+        """
+        if self.max_rows <= 0 or size > self.max_rows:
+            return
+        with self._lock:
+            if version != self._version:
+                # Otro hilo ya vio datos más nuevos: este resultado puede estar viejo
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.rows -= previous[1]
+            self._entries[key] = (value, size)
+            self.rows += size
+            while self.rows > self.max_rows:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.rows -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.rows = 0
+            self._version = None
+
+    def __len__(self):
+        return len(self._entries)
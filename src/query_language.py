@@ -0,0 +1,171 @@
+"""
+Lenguaje de consulta para filtros combinados
+
+    plant:UP02 type:Laptop failure:3 date:2024-01..2024-03 serial:AB12*
+
+Cada término campo:valor se compila a un predicado que puede usar un índice:
+valor exacto con '=', prefijo (valor*) y fechas con rangos >= / <. Los
+términos se combinan con AND; varios valores del mismo campo, con OR. Las
+palabras sin campo buscan por subcadena en serial, tipo, modelo y planta
+(como el modo "all"). Los valores con espacios van entre comillas:
+model:"Dell XPS*".
+
+Los valores exactos y los prefijos no distinguen mayúsculas ASCII: se
+comparan con COLLATE NOCASE, que usa los índices NOCASE de la migración 7.
+Un prefijo desconocido (AB:12) no es un campo sino una palabra más.
+"""
+import re
+import string
+
+
+# Campo del lenguaje -> columna de DeviceReg
+QUERY_FIELDS = {
+    "plant": "plant",
+    "serial": "serialno",
+    "type": "type",
+    "model": "model",
+    "failure": "failuretype",
+    "date": "entry_date",
+}
+
+# campo:"valor", campo:valor, "frase" o palabra
+_TOKEN = re.compile(r'(\w+):(?:"([^"]*)"|(\S*))|"([^"]*)"|(\S+)')
+
+# Fechas aceptadas en date: año, año-mes o año-mes-día
+_DATE = re.compile(r'\d{4}(-\d{2}(-\d{2})?)?$')
+
+
+# COLLATE NOCASE (y LIKE) solo igualan mayúsculas y minúsculas ASCII
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class QuerySyntaxError(ValueError):
+    """La consulta no se puede interpretar"""
+
+
+def fold_case(text):
+    """Minúsculas como las compara SQLite (solo A-Z; 'Ñ' y 'ñ' siguen siendo distintas)"""
+    return text.translate(_ASCII_LOWER)
+
+
+def prefix_range(prefix):
+    """Convierte un prefijo (con o sin '%' final) en límites [inicio, fin) para comparar texto"""
+    prefix = prefix.rstrip('%')
+    if not prefix:
+        return ('', '\U0010ffff')
+    return (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+def _nocase_prefix_range(prefix):
+    """
+    prefix_range para comparar con COLLATE NOCASE
+
+    Los límites van en minúsculas, que es como NOCASE compara ("AZ" ->
+    ["az", "a{")). Si el fin cae en A-Z, NOCASE también lo pasaría a
+    minúsculas y el rango abarcaría "[\\]^_`": ahí el siguiente carácter en
+    el orden de NOCASE es "[" ("AB@" -> ["ab@", "ab[")).
+    """
+    start, end = prefix_range(fold_case(prefix))
+    if end and 'A' <= end[-1] <= 'Z':
+        end = end[:-1] + '['
+    return start, end
+
+
+def parse_query(text):
+    """
+    Separa la consulta en términos
+
+    Returns:
+        Lista de (campo, valor); campo es None para las palabras sueltas
+    """
+    terms = []
+    for match in _TOKEN.finditer(text):
+        name, quoted, value, phrase, word = match.groups()
+        value = quoted if quoted is not None else value
+        if name is not None and name.lower() not in QUERY_FIELDS:
+            # No es un campo (p. ej. un serial con ':'): se busca como texto
+            name, word = None, f"{name}:{value}"
+        if name is not None:
+            field = name.lower()
+            if not value:
+                raise QuerySyntaxError(f"Falta el valor de {field}:")
+            terms.append((field, value))
+        else:
+            text_term = phrase if phrase is not None else word
+            if text_term:
+                terms.append((None, text_term))
+    if not terms:
+        raise QuerySyntaxError("La consulta está vacía")
+    return terms
+
+
+def _date_bound(value):
+    if not _DATE.match(value):
+        raise QuerySyntaxError(f"Fecha inválida: {value} (formato AAAA, AAAA-MM o AAAA-MM-DD)")
+    return prefix_range(value)
+
+
+def _date_predicate(value):
+    """date:inicio..fin (extremos opcionales e incluidos) o date:prefijo"""
+    if '..' not in value:
+        return 'entry_date >= ? AND entry_date < ?', _date_bound(value)
+
+    start, end = value.split('..', 1)
+    if not start and not end:
+        raise QuerySyntaxError("Rango de fechas vacío: indique inicio, fin o ambos")
+    conditions, params = [], []
+    if start:
+        conditions.append('entry_date >= ?')
+        params.append(_date_bound(start)[0])
+    if end:
+        # El fin es inclusivo: hasta el final del mes o día indicado
+        conditions.append('entry_date < ?')
+        params.append(_date_bound(end)[1])
+    return ' AND '.join(conditions), tuple(params)
+
+
+def _field_predicate(field, value):
+    """Predicado indexable de un término campo:valor"""
+    if field == "date":
+        return _date_predicate(value)
+
+    # La intercalación del índice NOCASE de la columna, para que SQLite lo use
+    column = f'{QUERY_FIELDS[field]} COLLATE NOCASE'
+    if field == "failure" and value.isdigit():
+        # failure:3 -> las fallas "[3] ..."
+        return f'{column} >= ? AND {column} < ?', _nocase_prefix_range(f'[{value}]')
+    if value.endswith('*'):
+        # Rango en lugar de LIKE 'prefijo%': LIKE no usa el índice
+        return f'{column} >= ? AND {column} < ?', _nocase_prefix_range(value[:-1])
+    return f'{column} = ?', (value,)
+
+
+def compile_query(text, text_filter):
+    """
+    Compila la consulta a una condición WHERE con sus parámetros
+
+    Args:
+        text: Consulta en el lenguaje de este módulo
+        text_filter: Función palabra -> (where, params) para las palabras sin
+                     campo (Database usa su filtro "all", con FTS5 si está)
+
+    Raises:
+        QuerySyntaxError: si la consulta no es válida
+    """
+    by_field = {}
+    conditions, params = [], []
+    for field, value in parse_query(text):
+        if field is None:
+            where, term_params = text_filter(value)
+            conditions.append(f'({where})')
+            params.extend(term_params)
+        else:
+            by_field.setdefault(field, []).append(_field_predicate(field, value))
+
+    for predicates in by_field.values():
+        where = ' OR '.join(f'({where})' for where, _ in predicates)
+        conditions.append(where if len(predicates) == 1 else f'({where})')
+        for _, term_params in predicates:
+            params.extend(term_params)
+
+    return ' AND '.join(conditions), tuple(params)
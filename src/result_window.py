@@ -0,0 +1,174 @@
+"""
+Ventana de filas sobre el resultado de una búsqueda
+
+La tabla virtual de SearchView pide solo las filas que se ven. ResultWindow
+las trae por páginas con search_page (keyset) y guarda en memoria las
+últimas max_pages; al saltar lejos (arrastrar el scrollbar) obtiene el
+token de la página destino con page_token_at en lugar de recorrer todas
+las anteriores.
+
+Las páginas que faltan se traen en un hilo de trabajo (src.workers.PageJob):
+mientras tanto rows(..., fetch=False) devuelve None en su lugar y la tabla
+muestra una fila de espera, así desplazarse nunca consulta SQLite desde Tk.
+
+Los resultados chicos se traen completos a una MemoryWindow: al seguir
+escribiendo el mismo término se filtran en memoria sin volver a SQLite.
+"""
+import threading
+from collections import OrderedDict
+
+from src.database import DEFAULT_PAGE_SIZE, DEVICE_COLUMNS
+from src.query_language import fold_case
+
+
+# Páginas que se conservan en memoria (las menos usadas se descartan)
+MAX_CACHED_PAGES = 20
+
+# Resultados hasta este tamaño se guardan completos en una MemoryWindow
+MAX_MEMORY_ROWS = 5000
+
+# Columnas en las que busca cada criterio por subcadena (como _search_filter)
+REFINE_COLUMNS = {
+    "serialno": (DEVICE_COLUMNS.index("serialno"),),
+    "type": (DEVICE_COLUMNS.index("type"),),
+    "model": (DEVICE_COLUMNS.index("model"),),
+    "plant": (DEVICE_COLUMNS.index("plant"),),
+    "all": tuple(DEVICE_COLUMNS.index(name) for name in ("serialno", "type", "model", "plant")),
+}
+
+
+def row_matches(row, search_term, search_by):
+    """Indica si la fila contiene search_term en las columnas del criterio (como LIKE '%término%')"""
+    term = fold_case(search_term)
+    return any(term in fold_case(row[index] or "") for index in REFINE_COLUMNS[search_by])
+
+
+class ResultWindow:
+    """
+    Acceso por posición a los resultados de (search_term, search_by)
+
+    La cantidad total se cuenta al crearla; para ver cambios posteriores
+    se crea una ventana nueva.
+    """
+
+    def __init__(self, db, search_term=None, search_by=None, page_size=DEFAULT_PAGE_SIZE,
+                 max_pages=MAX_CACHED_PAGES):
+        self.db = db
+        self.query = (search_term, search_by)
+        self.page_size = page_size
+        self.max_pages = max(1, max_pages)
+        self.total = db.count_devices(search_term, search_by)
+        self._pages = OrderedDict()
+        # Token de inicio de cada página conocida (la 0 empieza sin token)
+        self._tokens = {0: None}
+        # La tabla lee desde el hilo de Tk mientras PageJob carga páginas
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.total
+
+    def _page_range(self, start, count):
+        """Rango de posiciones válido y páginas que lo cubren"""
+        start = max(0, min(start, self.total))
+        stop = min(self.total, start + max(0, count))
+        if start >= stop:
+            return start, stop, range(0)
+        return start, stop, range(start // self.page_size, (stop - 1) // self.page_size + 1)
+
+    def rows(self, start, count, fetch=True):
+        """
+        Filas desde la posición start (hasta count, menos al final del resultado)
+
+        Args:
+            fetch: Consultar las páginas que no están en memoria; con False
+                   sus filas se devuelven como None (para no bloquear la interfaz)
+        """
+        start, stop, pages = self._page_range(start, count)
+        rows = []
+        for index in pages:
+            if fetch:
+                rows.extend(self.page(index))
+                continue
+            with self._lock:
+                page = self._pages.get(index)
+            if page is None:
+                page_rows = min(self.page_size, self.total - index * self.page_size)
+                page = [None] * page_rows
+            rows.extend(page)
+        offset = start - pages.start * self.page_size if pages else 0
+        return rows[offset:offset + stop - start]
+
+    def missing_pages(self, start, count):
+        """Páginas del rango [start, start + count) que no están en memoria"""
+        pages = self._page_range(start, count)[2]
+        with self._lock:
+            return [index for index in pages if index not in self._pages]
+
+    def page(self, index):
+        """Filas de la página index, desde memoria o desde la base de datos"""
+        with self._lock:
+            if index in self._pages:
+                self._pages.move_to_end(index)
+                return self._pages[index]
+            known = index in self._tokens
+            token = self._tokens.get(index)
+
+        if not known:
+            token = self.db.page_token_at(index * self.page_size, *self.query)
+            if token is None:
+                # Más allá del último resultado (se borraron filas desde el conteo)
+                return []
+
+        rows, next_token = self.db.search_page(*self.query, page_size=self.page_size, token=token)
+        with self._lock:
+            self._tokens[index] = token
+            if next_token is not None:
+                self._tokens[index + 1] = next_token
+
+            self._pages[index] = rows
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return rows
+
+
+class MemoryWindow:
+    """
+    Resultado completo de una búsqueda, en memoria
+
+    Misma interfaz que ResultWindow. Si el término nuevo contiene al de esta
+    búsqueda, sus resultados son un subconjunto de estas filas y refine() los
+    obtiene sin consultar la base de datos.
+    """
+
+    def __init__(self, rows, search_term=None, search_by=None):
+        self._rows = rows
+        self.query = (search_term, search_by)
+        self.total = len(rows)
+
+    def __len__(self):
+        return self.total
+
+    def rows(self, start, count, fetch=True):
+        start = max(0, start)
+        return self._rows[start:start + max(0, count)]
+
+    def missing_pages(self, start, count):
+        return []
+
+    def can_refine(self, search_term, search_by):
+        """
+        Indica si la búsqueda (search_term, search_by) puede resolverse filtrando estas filas
+
+        Los términos con caracteres no ASCII van siempre a la base de datos:
+        el índice trigram y LIKE los comparan distinto y el filtro en memoria
+        no podría dar el mismo resultado que ambos.
+        """
+        term, by = self.query
+        return (by == search_by and by in REFINE_COLUMNS and term is not None
+                and search_term.isascii() and fold_case(term) in fold_case(search_term))
+
+    def refine(self, search_term):
+        """Nueva ventana con las filas que también contienen search_term, en el mismo orden"""
+        search_by = self.query[1]
+        return MemoryWindow([row for row in self._rows if row_matches(row, search_term, search_by)],
+                            search_term, search_by)
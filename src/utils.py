@@ -1,10 +1,12 @@
 """
 Utility functions for Bodega App
 """
+import os
 import re
 from datetime import datetime
-from typing import Optional, Tuple, List, Any
-import pandas as pd
+from typing import Optional, Tuple, List, Any, Iterable
+
+from src.export import export_rows_xlsx, normalize_export_format
 
 
 def validate_serial_number(serial: str) -> Tuple[bool, str]:
@@ -177,16 +179,17 @@ def get_safe_value(row: tuple, index: int, default: Any = "") -> Any:
         return default
 
 
-def export_to_excel(data: List, columns: List[str], filepath: str) -> Tuple[bool, str]:
-    """Exports data to Excel file"""
+def export_to_excel(data: Iterable, columns: List[str], filepath: str) -> Tuple[bool, str]:
+    """Exports data to Excel file, streaming rows (lists, generators or DB cursors)"""
     try:
-        if not data:
+        if isinstance(data, (list, tuple)) and not data:
             return False, "No hay datos para exportar"
         
-        df = pd.DataFrame(data, columns=columns)
+        count = export_rows_xlsx(data, filepath, columns=columns, formatter=None)
         
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Datos')
+        if count == 0:
+            os.remove(filepath)
+            return False, "No hay datos para exportar"
         
         return True, f"Datos exportados exitosamente a {filepath}"
         
@@ -197,9 +200,9 @@ def export_to_excel(data: List, columns: List[str], filepath: str) -> Tuple[bool
 
 
 def generate_filename(prefix: str = "export", extension: str = "xlsx") -> str:
-    """Generates a filename with timestamp"""
+    """Generates a filename with timestamp (extension may be any export format, e.g. settings.EXPORT_FORMAT)"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"{prefix}_{timestamp}.{extension}"
+    return f"{prefix}_{timestamp}.{normalize_export_format(extension)}"
 
 
 class ValidationError(Exception):
@@ -0,0 +1,231 @@
+"""
+Tareas en segundo plano para la interfaz
+
+Cada tarea corre en un hilo propio y usa las sesiones de Database (read() y
+write()), que son seguras entre hilos, o abre su propia conexión. La interfaz no
+toca la tarea directamente: lee los eventos con poll() desde un after() del
+hilo de Tk y puede pedir la cancelación con cancel().
+"""
+import os
+import queue
+import sqlite3 as sql
+import threading
+
+from src.database import DEFAULT_PAGE_SIZE, Database
+from src.export import export_rows_xlsx
+from src.result_window import MAX_MEMORY_ROWS, MemoryWindow, ResultWindow
+
+
+# Intervalo con el que la interfaz consulta los eventos de una tarea (ms)
+POLL_INTERVAL_MS = 100
+
+
+def when_done(widget, future, callback, interval=POLL_INTERVAL_MS):
+    """
+    Llama callback(future) desde el hilo de Tk cuando el Future termina
+
+    Los Future se resuelven en otros hilos (p. ej. la cola de escritura) y Tk
+    solo puede tocarse desde el suyo, así que se consulta con after(). Si el
+    widget ya se destruyó (la vista se cerró) se deja de consultar y no se
+    llama a callback.
+    """
+    if not widget.winfo_exists():
+        return
+    if future.done():
+        callback(future)
+    else:
+        widget.after(interval, when_done, widget, future, callback, interval)
+
+
+class JobCancelled(Exception):
+    """Se lanza dentro de una tarea cuando el usuario pidió cancelarla"""
+
+
+class BackgroundJob(threading.Thread):
+    """
+    Hilo de trabajo que comunica su estado mediante una cola de eventos
+
+    Eventos: ('progress', valor), ('done', resultado), ('cancelled', None)
+    y ('error', excepción). Las subclases implementan execute().
+    """
+
+    def __init__(self, name):
+        super().__init__(name=name, daemon=True)
+        self.events = queue.Queue()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Pide la cancelación; la tarea se detiene en el siguiente punto de control"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Punto de control: interrumpe la tarea si se pidió cancelarla"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def emit(self, kind, value=None):
+        self.events.put((kind, value))
+
+    def poll(self):
+        """Devuelve los eventos pendientes sin bloquear (llamar desde el hilo de Tk)"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def run(self):
+        try:
+            result = self.execute()
+        except JobCancelled:
+            self.emit('cancelled')
+        except Exception as e:
+            self.emit('error', e)
+        else:
+            self.emit('done', result)
+
+    def execute(self):
+        raise NotImplementedError
+
+
+class ExportJob(BackgroundJob):
+    """Exporta el resultado de una búsqueda a un archivo sin bloquear la interfaz"""
+
+    def __init__(self, db, query, filepath, writer=export_rows_xlsx):
+        """
+        Args:
+            db: Database compartida (la tarea lee con una conexión de su pool) o
+                ruta de la base de datos (la tarea abre y cierra su propia Database)
+            query: (término, criterio de BD) de la búsqueda a exportar
+            filepath: Archivo de destino
+            writer: Función que escribe las filas (export_rows_xlsx por defecto)
+        """
+        super().__init__(name="ExportJob")
+        self.db = db if isinstance(db, Database) else None
+        self.db_path = None if self.db else os.path.abspath(db)
+        self.query = query
+        self.filepath = filepath
+        self.writer = writer
+        self.total = 0
+
+    def _rows(self, db):
+        """Filas de la búsqueda, con un punto de control de cancelación por fila"""
+        search_term, search_by = self.query
+        for row in db.iter_devices(search_term, search_by):
+            self.check_cancelled()
+            yield row
+
+    def execute(self):
+        search_term, search_by = self.query
+        db = self.db or Database(self.db_path)
+        try:
+            self.total = db.count_devices(search_term, search_by)
+            self.emit('progress', (0, self.total))
+            count = self.writer(self._rows(db), self.filepath,
+                                progress=lambda written: self.emit('progress', (written, self.total)))
+            self.check_cancelled()
+            return count
+        except Exception:
+            # No dejar archivos a medio escribir
+            if os.path.exists(self.filepath):
+                os.remove(self.filepath)
+            raise
+        finally:
+            if db is not self.db:
+                db.close()
+
+
+class SearchJob(BackgroundJob):
+    """
+    Ejecuta una búsqueda sin bloquear la interfaz
+
+    Cuenta los resultados y trae la primera página; el resultado es una
+    ResultWindow lista para mostrar, o una MemoryWindow con todas las filas
+    si no pasan de memory_limit. cancel() aborta la consulta en curso
+    (Database.interruptible), no solo la siguiente.
+    """
+
+    def __init__(self, db, query, page_size=DEFAULT_PAGE_SIZE, memory_limit=MAX_MEMORY_ROWS):
+        """
+        Args:
+            db: Database compartida (la tarea lee con una conexión de su pool)
+            query: (término, criterio de BD) de la búsqueda
+            page_size: Filas por página de la ResultWindow
+            memory_limit: Máximo de resultados que se traen completos a memoria
+        """
+        super().__init__(name="SearchJob")
+        self.db = db
+        self.query = query
+        self.page_size = page_size
+        self.memory_limit = memory_limit
+
+    def execute(self):
+        try:
+            with self.db.interruptible(self._cancel_event):
+                window = ResultWindow(self.db, *self.query, page_size=self.page_size)
+                if len(window) <= self.memory_limit:
+                    window = MemoryWindow(list(self.db.iter_devices(*self.query)), *self.query)
+                else:
+                    window.page(0)
+        except sql.OperationalError:
+            # 'interrupted' si se canceló durante la consulta
+            self.check_cancelled()
+            raise
+        self.check_cancelled()
+        return window
+
+
+class PageJob(BackgroundJob):
+    """
+    Trae páginas de una ResultWindow sin bloquear la interfaz
+
+    Al desplazarse o saltar con el scrollbar la tabla pide las páginas que
+    faltan; el salto (page_token_at) es un OFFSET que con términos cortos
+    recorre la tabla, así que corre aquí y se puede interrumpir como una
+    búsqueda. El resultado es la lista de páginas cargadas.
+    """
+
+    def __init__(self, db, window, pages):
+        """
+        Args:
+            db: Database de la ventana (para interrumpir sus lecturas)
+            window: ResultWindow a la que se agregan las páginas
+            pages: Índices de las páginas a traer
+        """
+        super().__init__(name="PageJob")
+        self.db = db
+        self.window = window
+        self.pages = list(pages)
+
+    def execute(self):
+        try:
+            with self.db.interruptible(self._cancel_event):
+                for index in self.pages:
+                    self.check_cancelled()
+                    self.window.page(index)
+        except sql.OperationalError:
+            self.check_cancelled()
+            raise
+        self.check_cancelled()
+        return self.pages
+
+
+class BackupJob(BackgroundJob):
+    """Ejecuta un backup sin bloquear la interfaz"""
+
+    def __init__(self, task, name="BackupJob"):
+        """
+        Args:
+            task: Función sin argumentos que hace el backup y devuelve (éxito, resultado),
+                  como scripts.backup_database.backup_database
+        """
+        super().__init__(name=name)
+        self.task = task
+
+    def execute(self):
+        return self.task()
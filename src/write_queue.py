@@ -0,0 +1,215 @@
+"""
+Cola de escritura con commit agrupado
+
+Un hilo escritor dedicado toma las altas, modificaciones y bajas pendientes y
+las confirma juntas: espera hasta max_delay_ms desde la primera operación o
+hasta juntar max_batch, y hace un solo commit (un solo fsync) para todo el
+grupo. Con ráfagas del lector de códigos de barras el costo del commit se
+reparte entre todas las operaciones del grupo.
+
+Cada operación corre dentro de su propio SAVEPOINT: si una falla (serial
+duplicado, por ejemplo) se deshace solo esa y el resto del grupo se confirma.
+Quien la pidió recibe un Future con el resultado, que se resuelve después
+del commit.
+"""
+import queue
+import sqlite3 as sql
+import threading
+import time
+from concurrent.futures import Future
+
+from src.database import Database
+
+
+# Espera máxima desde la primera operación pendiente hasta el commit (ms)
+DEFAULT_BATCH_DELAY_MS = 10
+
+# Máximo de operaciones por commit
+DEFAULT_BATCH_SIZE = 200
+
+# Operaciones encoladas que todavía no tomó el hilo escritor; al llegar a este
+# límite submit() espera, así un productor rápido no acumula memoria sin fin
+DEFAULT_MAX_PENDING = 10000
+
+# Marca de fin para el hilo escritor
+_STOP = object()
+
+
+class DuplicateSerialError(ValueError):
+    """El serial ya existe en la base de datos"""
+
+    def __init__(self, serialno):
+        super().__init__(f"Serial {serialno} ya existe")
+        self.serialno = serialno
+
+
+class WriteQueue(threading.Thread):
+    """
+    Hilo escritor que agrupa las operaciones de varios llamadores en un commit
+
+    Uso:
+        writes = WriteQueue(db)
+        writes.start()
+        future = writes.add_device("UP01", "ABC123", "Laptop", "Dell", "[0] Sin fallas", "")
+        device_id = future.result()   # o future.add_done_callback(...)
+        writes.close()
+    """
+
+    def __init__(self, db, max_delay_ms=DEFAULT_BATCH_DELAY_MS, max_batch=DEFAULT_BATCH_SIZE,
+                 max_pending=DEFAULT_MAX_PENDING):
+        """
+        Args:
+            db: Database sobre la que se escribe (usa su sesión write())
+            max_delay_ms: Espera máxima para juntar operaciones (0 = solo las ya encoladas)
+            max_batch: Máximo de operaciones por commit
+            max_pending: Operaciones en cola antes de que submit() espere (0 = sin límite)
+        """
+        super().__init__(name="WriteQueue", daemon=True)
+        self.db = db
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.pending = queue.Queue(maxsize=max(0, max_pending))
+        self.commits = 0
+        self._closed = False
+        # Cerrar y encolar bajo el mismo lock: nada puede quedar detrás de _STOP
+        self._lock = threading.Lock()
+
+    def submit(self, operation):
+        """
+        Encola una operación: función que recibe el cursor de la sesión de
+        escritura y devuelve el resultado del Future
+
+        Con la cola llena espera a que el hilo escritor tome operaciones.
+
+        Raises:
+            RuntimeError: si la cola ya se cerró
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("La cola de escritura está cerrada")
+            self.pending.put((operation, future))
+        return future
+
+    def add_device(self, plant, serialno, device_type, model, failuretype, observations):
+        """Alta de un dispositivo; el Future devuelve el id o falla con DuplicateSerialError"""
+        def operation(cur):
+            try:
+                return Database.insert_device(cur, plant, serialno, device_type, model,
+                                              failuretype, observations)
+            except sql.IntegrityError:
+                raise DuplicateSerialError(serialno)
+        return self.submit(operation)
+
+    def update_device(self, device_id, **changes):
+        """Modificación de un dispositivo; el Future devuelve True si existía"""
+        Database.check_changes(changes)
+
+        def operation(cur):
+            try:
+                return Database.modify_device(cur, device_id, changes) is not None
+            except sql.IntegrityError:
+                raise DuplicateSerialError(changes.get('serialno'))
+        return self.submit(operation)
+
+    def delete_devices(self, search_term, search_by="serialno", exact_match=False):
+        """Baja por criterio (como del_SData); el Future devuelve la cantidad eliminada"""
+        return self.submit(lambda cur: Database.delete_devices(cur, search_term, search_by, exact_match))
+
+    def flush(self, timeout=None):
+        """Espera a que se confirme todo lo encolado hasta ahora"""
+        self.submit(lambda cur: None).result(timeout)
+
+    def close(self, timeout=None):
+        """
+        Confirma lo pendiente y detiene el hilo escritor
+
+        Si el hilo no llegó a iniciarse (o ya terminó) las operaciones que
+        quedan en la cola fallan con RuntimeError en lugar de quedar esperando.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self.is_alive():
+                # Sin hilo escritor nadie vaciaría la cola: no se espera lugar para _STOP
+                self.pending.put(_STOP)
+        if self.is_alive():
+            self.join(timeout)
+        if not self.is_alive():
+            self._fail_pending(RuntimeError("La cola de escritura se cerró sin confirmar la operación"))
+
+    def _fail_pending(self, error):
+        """Vacía la cola y hace fallar los Future que no se llegaron a ejecutar"""
+        while True:
+            try:
+                item = self.pending.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(error)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self.pending.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            stopping = self._collect(batch)
+            self._commit(batch)
+
+    def _collect(self, batch):
+        """Junta operaciones hasta max_batch o max_delay; devuelve True si llegó _STOP"""
+        deadline = None
+        while len(batch) < self.max_batch:
+            try:
+                if self.max_delay <= 0:
+                    item = self.pending.get_nowait()
+                else:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.max_delay
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    def _commit(self, batch):
+        """Ejecuta un grupo en una transacción, con un SAVEPOINT por operación"""
+        # Los Future cancelados antes de empezar no se ejecutan
+        batch = [(operation, future) for operation, future in batch
+                 if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        outcomes = []
+        try:
+            with self.db.write(immediate=True) as cur:
+                for operation, future in batch:
+                    cur.execute('SAVEPOINT write_queue_op')
+                    try:
+                        outcomes.append((future, True, operation(cur)))
+                    except Exception as e:
+                        cur.execute('ROLLBACK TO write_queue_op')
+                        outcomes.append((future, False, e))
+                    cur.execute('RELEASE write_queue_op')
+            self.commits += 1
+        except Exception as e:
+            # Falló el commit: no se guardó ninguna operación del grupo
+            print(f'❌ Error confirmando {len(batch)} operaciones: {e}')
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        # Los resultados se entregan solo cuando ya están confirmados
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
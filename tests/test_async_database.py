@@ -0,0 +1,103 @@
+"""
+Pruebas unitarias para la fachada asyncio de Database
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+
+from src.async_database import AsyncDatabase
+from src.database import Database
+from src.write_queue import DuplicateSerialError, WriteQueue
+
+
+class TestAsyncDatabase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(db_name=os.path.join(self.tmpdir.name, "async.db"))
+        self.adb = AsyncDatabase(self.db, max_pending_writes=8)
+
+    async def asyncTearDown(self):
+        """Limpieza después de cada prueba"""
+        await self.adb.close()
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    async def add(self, serialno, model="Dell XPS"):
+        return await self.adb.add_device("UP01", serialno, "Laptop", model, "[0] Sin fallas", "")
+
+    async def test_add_search_delete(self):
+        """Alta, búsqueda, conteo y baja awaitables"""
+        device_id = await self.add("ASYNC0001")
+
+        row = await self.adb.get_device(device_id)
+        self.assertEqual(row[2], "ASYNC0001")
+        rows, token = await self.adb.search("ASYNC0001", "serialno")
+        self.assertEqual([r[0] for r in rows], [device_id])
+        self.assertIsNone(token)
+        self.assertEqual(await self.adb.count(), 1)
+
+        self.assertEqual(await self.adb.delete_devices("ASYNC0001", exact_match=True), 1)
+        self.assertIsNone(await self.adb.get_device(device_id))
+
+    async def test_duplicate_raises(self):
+        """Un serial repetido llega como DuplicateSerialError"""
+        await self.add("DUP0001")
+        with self.assertRaises(DuplicateSerialError):
+            await self.add("DUP0001")
+
+    async def test_concurrent_writes_with_back_pressure(self):
+        """Más escrituras que max_pending_writes esperan turno y se guardan todas"""
+        submit = self.adb.write_queue.add_device
+        in_flight = []
+
+        def tracked_add(*args):
+            future = submit(*args)
+            in_flight.append(future)
+            # Encoladas y todavía sin confirmar al momento de encolar esta
+            tracked_add.peak = max(tracked_add.peak, sum(not f.done() for f in in_flight))
+            return future
+        tracked_add.peak = 0
+        self.adb.write_queue.add_device = tracked_add
+
+        ids = await asyncio.gather(*(self.add(f"MANY{i:04d}") for i in range(50)))
+
+        self.assertEqual(len(set(ids)), 50)
+        self.assertLessEqual(tracked_add.peak, self.adb.max_pending_writes)
+        self.assertEqual(await self.adb.count(), 50)
+
+    async def test_async_iteration_over_pages(self):
+        """iter_pages e iter_devices recorren todos los resultados en orden"""
+        for i in range(25):
+            await self.add(f"PAGE{i:04d}", model="Dell" if i % 2 else "HP")
+
+        pages = [rows async for rows in self.adb.iter_pages(page_size=10)]
+        self.assertEqual([len(rows) for rows in pages], [10, 10, 5])
+
+        rows = [row async for row in self.adb.iter_devices("HP", "model", page_size=4)]
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows, sorted(rows, key=lambda r: (r[6], r[0]), reverse=True))
+
+        listed, token = await self.adb.list_devices(page_size=30)
+        self.assertEqual(len(listed), 25)
+        self.assertIsNone(token)
+
+    async def test_shared_write_queue_is_not_closed(self):
+        """Una WriteQueue ajena sigue funcionando después de cerrar la fachada"""
+        writes = WriteQueue(self.db)
+        writes.start()
+        try:
+            shared = AsyncDatabase(self.db, write_queue=writes)
+            await shared.add_device("UP02", "SHARED01", "Tablet", "iPad", "[0] Sin fallas", "")
+            await shared.close()
+
+            self.assertTrue(writes.is_alive())
+            self.assertIsNotNone(writes.add_device("UP02", "SHARED02", "Tablet", "iPad",
+                                                   "[0] Sin fallas", "").result(timeout=5))
+        finally:
+            writes.close(timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
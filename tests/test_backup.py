@@ -0,0 +1,338 @@
+"""
+Pruebas unitarias para el backup online de la base de datos
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from src.database import Database
+import scripts.backup_database as backup_module
+import scripts.backup_delta as delta_module
+from scripts.backup_catalog import MANIFEST_FILE, BackupCatalog
+from scripts.backup_database import (backup_database, backup_is_current, database_fingerprint,
+                                     online_backup, resolve_log_id, restore_backup,
+                                     restore_point_in_time, verify_backup)
+from scripts.backup_store import CHUNKS_DIR, create_snapshot, restore_snapshot
+
+
+class TestOnlineBackup(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "bodega.db")
+        self.backup_dir = os.path.join(self.tmpdir.name, "backups")
+        self.db = Database(db_name=self.db_path)
+        self.db.add_devices_bulk([("UP01", f"BKP{i:05d}", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+                                  for i in range(2000)])
+
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def count_rows(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM DeviceReg").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_online_backup_is_consistent_with_concurrent_writes(self):
+        """Con escrituras durante la copia, el resultado es una foto consistente"""
+        dest = os.path.join(self.tmpdir.name, "copy.db")
+        stop = threading.Event()
+
+        def writer():
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            for i in range(200):
+                if stop.is_set():
+                    break
+                conn.execute("INSERT INTO DeviceReg (serialno, type, model) VALUES (?, 'Laptop', 'X')",
+                             (f"LIVE{i:05d}",))
+                conn.commit()
+            conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            online_backup(self.db_path, dest, pages=1, sleep=0.001)
+        finally:
+            stop.set()
+            thread.join()
+
+        self.assertEqual(verify_backup(dest), (True, 'ok'))
+        self.assertGreaterEqual(self.count_rows(dest), 2000)
+
+    def test_verify_backup_rejects_corrupt_file(self):
+        """quick_check detecta un archivo que no es una base de datos válida"""
+        corrupt = os.path.join(self.tmpdir.name, "corrupt.db")
+        with open(self.db_path, 'rb') as f:
+            data = bytearray(f.read())
+        data[100:4096] = b'\xff' * (4096 - 100)
+        with open(corrupt, 'wb') as f:
+            f.write(data)
+
+        valid, _ = verify_backup(corrupt)
+        self.assertFalse(valid)
+
+    def test_backup_database_creates_verified_copy(self):
+        """backup_database deja el archivo final registrado en el catálogo, sin temporales"""
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, backup_file = backup_database(verbose=False, pages_per_step=16, step_sleep=0,
+                                                   backup_format="db")
+
+        self.assertTrue(success, backup_file)
+        self.assertEqual(sorted(os.listdir(self.backup_dir)),
+                         sorted([os.path.basename(backup_file), MANIFEST_FILE]))
+        self.assertEqual(self.count_rows(backup_file), 2000)
+
+
+    def test_backup_is_current_follows_changes(self):
+        """La huella cambia con altas y bajas; sin cambios el backup se considera vigente"""
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            self.assertFalse(backup_is_current())
+
+            success, backup_file = backup_database(verbose=False, step_sleep=0, backup_format="db")
+            self.assertTrue(success)
+            self.assertEqual(database_fingerprint(backup_file), database_fingerprint(self.db_path))
+            self.assertTrue(backup_is_current())
+
+            self.db.add_device("UP01", "BKPNEW01", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+            self.assertFalse(backup_is_current())
+
+            backup_database(verbose=False, step_sleep=0)
+            self.assertTrue(backup_is_current())
+
+            # Las bajas no generan log, pero cambian la cantidad de filas
+            self.db.del_SData("BKP00001", "serialno", exact_match=True)
+            self.assertFalse(backup_is_current())
+
+
+    def test_chunked_backups_are_deduplicated(self):
+        """Backups repetidos de una base sin cambios no agregan bloques nuevos"""
+        copy = os.path.join(self.tmpdir.name, "copy.db")
+        online_backup(self.db_path, copy, sleep=0)
+        os.makedirs(self.backup_dir)
+
+        first = create_snapshot(copy, os.path.join(self.backup_dir, "bodega_backup_1.snap"), chunk_size=4096)
+        second = create_snapshot(copy, os.path.join(self.backup_dir, "bodega_backup_2.snap"), chunk_size=4096)
+
+        self.assertGreater(first["new_chunks"], 0)
+        self.assertLess(first["stored_bytes"], first["size"])
+        self.assertEqual(second["new_chunks"], 0)
+        self.assertEqual(second["stored_bytes"], 0)
+
+        rebuilt = os.path.join(self.tmpdir.name, "rebuilt.db")
+        restore_snapshot(os.path.join(self.backup_dir, "bodega_backup_2.snap"), rebuilt)
+        with open(copy, 'rb') as a, open(rebuilt, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_chunked_backup_restore_roundtrip(self):
+        """backup_database en formato chunked se restaura con restore_backup"""
+        target = os.path.join(self.tmpdir.name, "restored.db")
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, backup_file = backup_database(verbose=False, step_sleep=0, backup_format="chunked")
+        self.assertTrue(success, backup_file)
+        self.assertTrue(backup_file.endswith(".snap"))
+        self.assertTrue(os.path.isdir(os.path.join(self.backup_dir, CHUNKS_DIR)))
+
+        with mock.patch.object(backup_module, 'DATABASE_PATH', target), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, _ = restore_backup(backup_file, verbose=False)
+        self.assertTrue(success)
+        self.assertEqual(self.count_rows(target), 2000)
+
+
+    def test_incremental_backups_restore_base_plus_deltas(self):
+        """Los deltas guardan solo los cambios y la restauración aplica base + deltas"""
+        target = os.path.join(self.tmpdir.name, "restored.db")
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, base_file = backup_database(verbose=False, step_sleep=0, incremental=True)
+            self.assertTrue(base_file.endswith(".snap"))
+
+            self.db.add_device("UP02", "INC00001", "Tablet", "iPad Pro", "[0] Sin fallas", "")
+            self.db.cur.execute("SELECT id FROM DeviceReg WHERE serialno = 'BKP00005'")
+            self.db.update_device(self.db.cur.fetchone()[0], model="Dell Latitude")
+            self.db.del_SData("BKP00007", "serialno", exact_match=True)
+            success, first_delta = backup_database(verbose=False, incremental=True)
+            self.assertTrue(success)
+            self.assertTrue(first_delta.endswith(".delta"))
+            self.assertLess(os.path.getsize(first_delta), 4096)
+
+            # Alta y baja del mismo dispositivo dentro de un delta
+            self.db.add_device("UP02", "INC00002", "Tablet", "iPad Pro", "[0] Sin fallas", "")
+            self.db.del_SData("INC00002", "serialno", exact_match=True)
+            success, second_delta = backup_database(verbose=False, incremental=True)
+            self.assertTrue(second_delta.endswith(".delta"))
+
+        with mock.patch.object(backup_module, 'DATABASE_PATH', target), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, message = restore_backup(second_delta, verbose=False)
+        self.assertTrue(success, message)
+
+        self.assertEqual(database_fingerprint(target), database_fingerprint(self.db_path))
+        restored = Database(db_name=target)
+        try:
+            self.assertEqual(restored.search_device("Latitude", "model")[0][2], "BKP00005")
+            self.assertEqual(restored.search_device("INC00001", "serialno")[0][1], "UP02")
+            self.assertEqual(restored.search_device("BKP00007", "serialno"), [])
+        finally:
+            restored.close()
+
+    def test_incremental_chain_fits_retention(self):
+        """La cadena no supera MAX_BACKUP_FILES: llegado el límite se hace un backup completo"""
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir), \
+             mock.patch.object(backup_module, 'MAX_BACKUP_FILES', 3):
+            kinds = []
+            for i in range(4):
+                self.db.add_device("UP02", f"RET{i:05d}", "Tablet", "iPad", "[0] Sin fallas", "")
+                success, backup_file = backup_database(verbose=False, step_sleep=0, incremental=True)
+                self.assertTrue(success, backup_file)
+                kinds.append(os.path.splitext(backup_file)[1])
+
+        self.assertEqual(kinds, [".snap", ".delta", ".delta", ".snap"])
+        self.assertLessEqual(len(BackupCatalog(self.backup_dir).entries()), 4)
+
+    def test_unlogged_changes_force_full_backup(self):
+        """Si los logs no explican los cambios, el siguiente backup es completo"""
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            backup_database(verbose=False, step_sleep=0, incremental=True)
+
+            self.db.cur.execute("DELETE FROM DeviceReg WHERE serialno = 'BKP00003'")
+            self.db.conn.commit()
+            success, backup_file = backup_database(verbose=False, step_sleep=0, incremental=True)
+
+        self.assertTrue(success)
+        self.assertTrue(backup_file.endswith(".snap"))
+
+    def test_restore_replaces_database_and_reopens_connection(self):
+        """La restauración reemplaza el archivo de una vez y la conexión abierta ve la base restaurada"""
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, backup_file = backup_database(verbose=False, step_sleep=0, backup_format="db")
+            self.db.del_SData("BKP0001", "serialno")
+
+            success, message = restore_backup(backup_file, verbose=False, db=self.db)
+            self.assertTrue(success, message)
+
+        # La copia de seguridad previa pasa por el catálogo como un backup más
+        safety = BackupCatalog(self.backup_dir).latest()
+        self.assertNotEqual(safety.file, os.path.basename(backup_file))
+        self.assertEqual(safety.fingerprint[3], 1990)
+
+        self.assertEqual(self.db.count_devices(), 2000)
+        self.assertEqual(len(self.db.search_device("BKP0001", "serialno")), 10)
+        leftovers = [name for name in os.listdir(self.tmpdir.name) if name.endswith(".tmp")]
+        self.assertEqual(leftovers, [])
+
+    def test_restore_wal_database(self):
+        """Una base en modo WAL se respalda y restaura sin dejar un WAL viejo junto a la nueva"""
+        self.db.close()
+        self.db = Database(db_name=self.db_path, profile="balanced")
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, backup_file = backup_database(verbose=False, step_sleep=0)
+            self.assertTrue(success, backup_file)
+            self.db.del_SData("BKP000", "serialno")
+
+            success, message = restore_backup(backup_file, verbose=False, db=self.db)
+        self.assertTrue(success, message)
+        self.assertEqual(self.db.count_devices(), 2000)
+        self.db.cur.execute("PRAGMA journal_mode")
+        self.assertEqual(self.db.cur.fetchone()[0], "wal")
+
+    def test_restore_refuses_database_open_elsewhere(self):
+        """Sin la Database de la aplicación, no se reemplaza una base que otra conexión tiene abierta"""
+        self.db.close()
+        self.db = Database(db_name=self.db_path, profile="balanced")
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, backup_file = backup_database(verbose=False, step_sleep=0, backup_format="db")
+            self.db.del_SData("BKP000", "serialno")
+
+            success, message = restore_backup(backup_file, verbose=False)
+        self.assertFalse(success)
+        self.assertIn("abierta", message)
+        # La aplicación sigue escribiendo en la misma base
+        self.db.add_device("UP01", "AFTER0001", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+        self.assertEqual(self.count_rows(self.db_path), 1901)
+        self.assertFalse(os.path.exists(self.db_path + ".restore.tmp"))
+
+    def test_corrupt_backup_leaves_database_untouched(self):
+        """Un backup dañado no llega a reemplazar la base de datos en uso"""
+        os.makedirs(self.backup_dir)
+        corrupt = os.path.join(self.backup_dir, "bodega_backup_corrupt.db")
+        with open(corrupt, 'wb') as f:
+            f.write(b"no es una base de datos" * 100)
+
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            success, _ = restore_backup(corrupt, verbose=False, db=self.db)
+
+        self.assertFalse(success)
+        self.assertEqual(self.db.count_devices(), 2000)
+        self.assertFalse(os.path.exists(self.db_path + ".restore.tmp"))
+
+    def test_point_in_time_restore_undoes_bulk_delete(self):
+        """Se recupera el estado previo a una baja masiva sin perder las altas posteriores al backup"""
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            backup_database(verbose=False, step_sleep=0)
+
+            self.db.add_devices_bulk([("UP03", f"PIT{i:05d}", "Tablet", "iPad", "[0] Sin fallas", "")
+                                      for i in range(300)])
+            self.db.cur.execute("SELECT id FROM DeviceReg WHERE serialno = 'BKP00010'")
+            self.db.update_device(self.db.cur.fetchone()[0], plant="UP09")
+            self.db.cur.execute("SELECT MAX(log_id) FROM ChangeLogs")
+            before_delete = self.db.cur.fetchone()[0]
+
+            self.assertEqual(self.db.del_SData("BKP0", "serialno"), 2000)
+            self.db.close()
+
+            # Umbral bajo para pasar por la reconstrucción única del índice FTS
+            with mock.patch.object(delta_module, 'FTS_REBUILD_THRESHOLD', 100):
+                success, message = restore_point_in_time(before_delete, verbose=False)
+        self.assertTrue(success, message)
+
+        restored = Database(db_name=self.db_path)
+        try:
+            self.assertEqual(restored.count_devices(), 2300)
+            self.assertEqual(restored.search_device("BKP00010", "serialno")[0][1], "UP09")
+            self.assertEqual(len(restored.search_device("PIT", "serialno")), 300)
+            restored.cur.execute("SELECT MAX(log_id) FROM ChangeLogs")
+            self.assertEqual(restored.cur.fetchone()[0], before_delete)
+        finally:
+            restored.close()
+        self.db = Database(db_name=self.db_path)
+
+    def test_point_in_time_requires_earlier_backup(self):
+        """Sin un backup anterior al punto pedido no se toca la base de datos"""
+        with mock.patch.object(backup_module, 'DATABASE_PATH', self.db_path), \
+             mock.patch.object(backup_module, 'BACKUP_DIR', self.backup_dir):
+            backup_database(verbose=False, step_sleep=0)
+            success, message = restore_point_in_time(1, verbose=False)
+        self.assertFalse(success)
+        self.assertEqual(self.count_rows(self.db_path), 2000)
+
+    def test_resolve_log_id_by_local_time(self):
+        """Las fechas se interpretan en hora local y change_date está en UTC"""
+        self.db.cur.execute("UPDATE ChangeLogs SET change_date = '2024-01-15 12:00:00' WHERE log_id <= 1000")
+        self.db.conn.commit()
+        local = datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        self.assertEqual(resolve_log_id(self.db.conn, local), 1000)
+        self.assertEqual(resolve_log_id(self.db.conn, local - timedelta(seconds=1)), 0)
+        self.assertEqual(resolve_log_id(self.db.conn, 42), 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Pruebas unitarias para el catálogo de backups
+"""
+import json
+import os
+import tempfile
+import unittest
+import zlib
+
+from scripts.backup_catalog import MANIFEST_FILE, BackupCatalog, file_checksum
+
+
+class TestBackupCatalog(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.backup_dir = self.tmpdir.name
+        self.catalog = BackupCatalog(self.backup_dir)
+
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.tmpdir.cleanup()
+
+    def make_backup(self, name, content=b"backup"):
+        path = os.path.join(self.backup_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_add_and_latest(self):
+        """El último backup registrado es el más reciente, con checksum y huella"""
+        first = self.make_backup("bodega_backup_20240101_000000.db")
+        self.catalog.add(first, fingerprint=[3, 1, 1, 1], checksum=file_checksum(first))
+        second = self.make_backup("bodega_backup_20240102_000000.db", b"otro")
+        self.catalog.add(second, fingerprint=[3, 2, 2, 2])
+
+        latest = BackupCatalog(self.backup_dir).latest()
+        self.assertEqual(latest.file, os.path.basename(second))
+        self.assertEqual(latest.fingerprint, [3, 2, 2, 2])
+        self.assertEqual(len(self.catalog.entries()[0].checksum), 64)
+
+    def test_first_use_imports_existing_backups(self):
+        """Sin manifiesto, el catálogo se construye una vez a partir del directorio"""
+        self.make_backup("bodega_backup_20240101_000000.db")
+        self.make_backup("bodega_backup_20240102_000000.db")
+        self.make_backup("pre_restore_20240103_000000.db")
+
+        entries = self.catalog.entries()
+
+        self.assertEqual(len(entries), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.backup_dir, MANIFEST_FILE)))
+
+    def test_prune_keeps_most_recent(self):
+        """La retención elimina los archivos más antiguos y los quita del manifiesto"""
+        paths = []
+        for day in range(1, 5):
+            path = self.make_backup(f"bodega_backup_2024010{day}_000000.db")
+            self.catalog.add(path)
+            paths.append(path)
+        # Fechas distintas para que el orden no dependa del reloj
+        with open(self.catalog.manifest_path, encoding='utf-8') as f:
+            data = json.load(f)
+        for day, item in enumerate(data["backups"], start=1):
+            item["created"] = f"2024-01-0{day}T00:00:00"
+        with open(self.catalog.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        deleted, freed = self.catalog.prune(2, verbose=False)
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(freed, 2 * len(b"backup"))
+        self.assertEqual([e.file for e in self.catalog.entries()],
+                         [os.path.basename(p) for p in paths[2:]])
+        self.assertFalse(os.path.exists(paths[0]))
+
+
+    def add_dated(self, name, day, kind="full", base=None):
+        """Registra un backup con fecha fija (el orden no depende del reloj)"""
+        if kind == "delta":
+            delta = {"base": base, "fingerprint": [5, day, day, day]}
+            path = self.make_backup(name, zlib.compress(json.dumps(delta).encode('utf-8')))
+        else:
+            path = self.make_backup(name)
+        os.utime(path, (1704067200 + day * 86400,) * 2)
+        self.catalog.add(path, kind=kind, base=base)
+        with open(self.catalog.manifest_path, encoding='utf-8') as f:
+            data = json.load(f)
+        data["backups"][-1]["created"] = f"2024-01-{day:02d}T00:00:00"
+        with open(self.catalog.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def make_chains(self):
+        """Dos cadenas: A + 2 deltas y B + 1 delta"""
+        self.add_dated("bodega_backup_A.db", 1)
+        self.add_dated("bodega_backup_A1.delta", 2, "delta", "bodega_backup_A.db")
+        self.add_dated("bodega_backup_A2.delta", 3, "delta", "bodega_backup_A.db")
+        self.add_dated("bodega_backup_B.db", 4)
+        self.add_dated("bodega_backup_B1.delta", 5, "delta", "bodega_backup_B.db")
+
+    def test_prune_with_incremental_chain(self):
+        """La retención borra cadenas completas y nunca deja un delta sin su base"""
+        self.make_chains()
+
+        # Cortar en 3 dejaría A2 sin A: se conserva toda la cadena
+        self.assertEqual(self.catalog.prune(3, verbose=False), (0, 0))
+        self.assertEqual(len(self.catalog.entries()), 5)
+
+        deleted, _ = self.catalog.prune(2, verbose=False)
+        self.assertEqual(deleted, 3)
+        self.assertEqual([e.file for e in self.catalog.entries()],
+                         ["bodega_backup_B.db", "bodega_backup_B1.delta"])
+        self.assertEqual(self.catalog.chain_for("bodega_backup_B1.delta"),
+                         ["bodega_backup_B.db", "bodega_backup_B1.delta"])
+
+    def test_rebuild_recovers_delta_base(self):
+        """Sin manifiesto, la base de cada delta se lee de su encabezado"""
+        self.make_chains()
+        os.remove(self.catalog.manifest_path)
+
+        chain = BackupCatalog(self.backup_dir).chain_for("bodega_backup_A2.delta")
+
+        self.assertEqual(chain, ["bodega_backup_A.db", "bodega_backup_A1.delta", "bodega_backup_A2.delta"])
+        entry = BackupCatalog(self.backup_dir).entries()
+        self.assertIn([5, 3, 3, 3], [e.fingerprint for e in entry])
+
+    def test_prune_collects_unused_chunks(self):
+        """Al borrar un backup por bloques se eliminan los bloques que ya nadie usa"""
+        from scripts.backup_store import create_snapshot, store_for
+
+        for day, content in enumerate([b"c" * 4096 + b"a" * 4096, b"a" * 4096 + b"b" * 4096], start=1):
+            source = os.path.join(self.tmpdir.name, f"source{day}.db")
+            with open(source, 'wb') as f:
+                f.write(content)
+            snapshot = os.path.join(self.backup_dir, f"bodega_backup_2024010{day}_000000.snap")
+            create_snapshot(source, snapshot, chunk_size=4096)
+            self.catalog.add(snapshot, size=len(content))
+            os.remove(source)
+        store = store_for(self.catalog.manifest_path)
+        self.assertEqual(len(list(store.digests())), 3)
+
+        self.catalog.prune(1, verbose=False)
+
+        # Se elimina el bloque "c"; el bloque "a" compartido sigue en uso
+        self.assertEqual(len(self.catalog.entries()), 1)
+        self.assertEqual(len(list(store.digests())), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,13 @@ Pruebas unitarias para el módulo de base de datos
 """
 import unittest
 import os
+import json
+import sqlite3
 import tempfile
-from src.database import Database
+import threading
+from unittest import mock
+from src.database import Database, ReaderPool
+from src.migrations import SCHEMA_VERSION
 from models.device import Device
 
 
@@ -85,6 +90,369 @@ class TestDatabase(unittest.TestCase):
         deleted = self.db.del_SData("DELETE001", "serialno")
         self.assertEqual(deleted, 1)
 
+    
+    def test_fulltext_search_substring(self):
+        """Prueba que el índice FTS5 resuelve búsquedas por subcadena"""
+        self.db.add_device("UP01", "ABC123XYZ", "Laptop", "Dell XPS 13", "[0] Sin fallas", "")
+        self.db.add_device("UP02", "QQQ999", "Desktop", "HP Elite", "[0] Sin fallas", "")
+        
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        
+        self.assertEqual([r[2] for r in self.db.search_device("c123x", "serialno")], ["ABC123XYZ"])
+        self.assertEqual([r[2] for r in self.db.search_device("ell", "model")], ["ABC123XYZ"])
+        self.assertEqual([r[2] for r in self.db.search_device("elit", "all")], ["QQQ999"])
+        # Términos cortos usan LIKE
+        self.assertEqual(len(self.db.search_device("Q9", "serialno")), 1)
+    
+    def test_fulltext_index_follows_deletes(self):
+        """Prueba que los triggers mantienen el índice al eliminar"""
+        self.db.add_device("UP01", "GONE0001", "Laptop", "Dell", "[0] Sin fallas", "")
+        self.db.del_SData("GONE0001", "serialno", exact_match=True)
+        self.assertEqual(self.db.search_device("GONE0", "serialno"), [])
+    
+    def test_fulltext_backfill_existing_database(self):
+        """Prueba el backfill del índice en bases de datos anteriores al FTS"""
+        self.db.close()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP TRIGGER DeviceReg_fts_insert")
+        conn.execute("DROP TABLE DeviceFTS")
+        conn.execute("PRAGMA user_version = 1")
+        conn.execute("INSERT INTO DeviceReg (plant, serialno, type, model) "
+                     "VALUES ('UP01', 'LEGACY777', 'Laptop', 'Dell')")
+        conn.commit()
+        conn.close()
+        
+        self.db = Database(db_name=self.db_path)
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        self.db.cur.execute("SELECT rowid FROM DeviceFTS WHERE DeviceFTS MATCH '\"ACY77\"'")
+        self.assertEqual(len(self.db.cur.fetchall()), 1)
+
+    
+    def test_schema_version_and_indexes(self):
+        """Prueba que las migraciones dejan el esquema en la última versión con sus índices"""
+        self.db.cur.execute("PRAGMA user_version")
+        self.assertEqual(self.db.cur.fetchone()[0], SCHEMA_VERSION)
+        
+        self.db.cur.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        indexes = {row[0] for row in self.db.cur.fetchall()}
+        for name in ("idx_devicereg_model", "idx_devicereg_type", "idx_devicereg_plant",
+                     "idx_devicereg_entry_date", "idx_changelogs_device", "idx_changelogs_date"):
+            self.assertIn(name, indexes)
+    
+    def test_current_schema_skips_ddl(self):
+        """Prueba que al abrir una base de datos al día no se ejecuta DDL"""
+        self.db.close()
+        statements = []
+        
+        class TracingDatabase(Database):
+            def _connect(self):
+                super()._connect()
+                self.conn.set_trace_callback(statements.append)
+        
+        db = TracingDatabase(db_name=self.db_path)
+        
+        self.assertFalse([s for s in statements if s.lstrip().upper().startswith(("CREATE", "COMMIT"))])
+        self.assertTrue(db.fts_enabled or not self.db.fts_enabled)
+        self.db = db
+    
+    def test_date_search_uses_range(self):
+        """Prueba la búsqueda por fecha con prefijo"""
+        self.db.add_device("UP01", "DATE0001", "Laptop", "Dell", "[0] Sin fallas", "")
+        self.db.cur.execute("UPDATE DeviceReg SET entry_date = '2024-01-15 10:00:00'")
+        self.db.conn.commit()
+        
+        self.assertEqual(len(self.db.search_device("2024-01%", "entry_date")), 1)
+        self.assertEqual(len(self.db.search_device("2024-01-15%", "entry_date")), 1)
+        self.assertEqual(len(self.db.search_device("2024-02%", "entry_date")), 0)
+
+    
+    def test_search_page_keyset(self):
+        """Prueba la paginación por (entry_date, id) con token de continuación"""
+        for i in range(25):
+            self.db.add_device("UP01", f"PAGE{i:04d}", "Laptop", "Dell", "[0] Sin fallas", "")
+        
+        rows, token = self.db.search_page(page_size=10)
+        self.assertEqual(len(rows), 10)
+        self.assertIsNotNone(token)
+        
+        pages = list(self.db.iter_pages(page_size=10))
+        self.assertEqual([len(p) for p in pages], [10, 10, 5])
+        ids = [row[0] for page in pages for row in page]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 25)
+        
+        rows, token = self.db.search_page("PAGE001", "serialno", page_size=10)
+        self.assertEqual(len(rows), 10)
+        self.assertIsNone(token)
+        self.assertEqual(self.db.count_devices("PAGE001", "serialno"), 10)
+        self.assertEqual(self.db.count_devices(), 25)
+
+    
+    def test_add_devices_bulk(self):
+        """Prueba la carga masiva con duplicados en la base de datos y en el lote"""
+        self.db.add_device("UP01", "BULK0000", "Laptop", "Dell", "[0] Sin fallas", "")
+        
+        devices = [
+            ("UP01", "BULK0001", "Laptop", "Dell", "[0] Sin fallas", ""),
+            {"plant": "UP02", "serialno": "BULK0000", "device_type": "Laptop", "model": "Dell",
+             "failuretype": "[0] Sin fallas", "observations": ""},
+            Device(plant="UP03", serialno="BULK0002", device_type="Tablet", model="iPad"),
+            ("UP01", "BULK0001", "Laptop", "Dell", "[0] Sin fallas", ""),
+            ("UP01", "BULK0003", "Laptop", "Dell", "[0] Sin fallas", "", "2023-05-01 08:00:00"),
+        ]
+        results = self.db.add_devices_bulk(devices)
+        
+        self.assertEqual([r.status for r in results],
+                         ["inserted", "duplicate", "inserted", "duplicate", "inserted"])
+        self.assertTrue(all(r.device_id for r in results if r.status == "inserted"))
+        
+        self.db.cur.execute("SELECT COUNT(*) FROM DeviceReg")
+        self.assertEqual(self.db.cur.fetchone()[0], 4)
+        self.db.cur.execute("SELECT COUNT(*) FROM ChangeLogs WHERE action = 'INSERT'")
+        self.assertEqual(self.db.cur.fetchone()[0], 4)
+        self.db.cur.execute("SELECT entry_date FROM DeviceReg WHERE serialno = 'BULK0003'")
+        self.assertEqual(self.db.cur.fetchone()[0], "2023-05-01 08:00:00")
+
+    
+    def test_suspended_fulltext_is_rebuilt(self):
+        """Un índice en pausa no se reconstruye al reabrir; se busca con LIKE hasta repararlo"""
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        
+        self.db.suspend_fulltext()
+        self.db.add_device("UP01", "SUSP0001", "Laptop", "Dell", "[0] Sin fallas", "")
+        
+        # Simula una carga masiva interrumpida: reabrir no toca el índice
+        self.db.close()
+        self.db = Database(db_name=self.db_path)
+        self.db.add_device("UP01", "SUSP0002", "Laptop", "Dell", "[0] Sin fallas", "")
+        self.assertEqual(len(self.db.search_device("SUSP0", "serialno")), 2)
+        self.db.cur.execute("SELECT COUNT(*) FROM DeviceFTS WHERE DeviceFTS MATCH '\"SUSP0\"'")
+        self.assertEqual(self.db.cur.fetchone()[0], 0)
+        
+        self.assertTrue(self.db.rebuild_fulltext())
+        self.db.cur.execute("SELECT COUNT(*) FROM DeviceFTS WHERE DeviceFTS MATCH '\"SUSP0\"'")
+        self.assertEqual(self.db.cur.fetchone()[0], 2)
+    
+    def test_writes_from_other_connections_during_suspension(self):
+        """Altas, cambios y bajas de otra conexión durante la pausa quedan indexados al reanudar"""
+        if not self.db.fts_enabled:
+            self.skipTest("FTS5 no disponible")
+        indexed = self.db.add_device("UP01", "PRE00001", "Laptop", "Dell", "[0] Sin fallas", "")
+        
+        self.db.suspend_fulltext()
+        other = Database(db_name=self.db_path)
+        try:
+            added = other.add_device("UP02", "MID00001", "Tablet", "iPad", "[0] Sin fallas", "")
+            other.update_device(added, model="iPad Air")
+            other.update_device(indexed, model="Latitude")
+            other.del_SData("MID00001", "serialno", exact_match=True)
+            other.add_device("UP02", "MID00002", "Tablet", "iPad", "[0] Sin fallas", "")
+            # Otra conexión ve la pausa y busca con LIKE
+            self.assertEqual(len(other.search_device("MID00", "serialno")), 1)
+        finally:
+            other.close()
+        self.db.resume_fulltext()
+        
+        self.db.cur.execute("INSERT INTO DeviceFTS (DeviceFTS) VALUES ('integrity-check')")
+        self.assertEqual([r[2] for r in self.db.search_device("MID00", "serialno")], ["MID00002"])
+        self.assertEqual([r[2] for r in self.db.search_device("atitud", "model")], ["PRE00001"])
+    
+    def test_bulk_insert_quiet(self):
+        """add_devices_bulk no imprime el resumen con verbose=False"""
+        with mock.patch('builtins.print') as printed:
+            self.db.add_devices_bulk([("UP01", "QUIET0001", "Laptop", "Dell", "[0] Sin fallas", "")],
+                                     verbose=False)
+        printed.assert_not_called()
+
+    def test_delete_and_update_are_logged(self):
+        """Bajas y modificaciones quedan en ChangeLogs con la fila afectada"""
+        device_id = self.db.add_device("UP01", "LOG00001", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+        
+        self.assertTrue(self.db.update_device(device_id, model="Dell Latitude", observations="Cambio"))
+        self.assertEqual(self.db.del_SData("LOG00001", "serialno", exact_match=True), 1)
+        
+        self.db.cur.execute("""SELECT action, change_data FROM ChangeLogs
+                               WHERE device_id = ? ORDER BY log_id""", (device_id,))
+        logs = self.db.cur.fetchall()
+        self.assertEqual([log[0] for log in logs], ['INSERT', 'UPDATE', 'DELETE'])
+        self.assertEqual(json.loads(logs[0][1])['model'], "Dell XPS")
+        self.assertEqual(json.loads(logs[1][1])['model'], "Dell Latitude")
+        self.assertEqual(json.loads(logs[2][1])['serialno'], "LOG00001")
+    
+    def test_update_device_rejects_unknown_columns(self):
+        """update_device solo acepta columnas modificables"""
+        device_id = self.db.add_device("UP01", "LOG00002", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+        with self.assertRaises(ValueError):
+            self.db.update_device(device_id, id=99)
+        self.assertFalse(self.db.update_device(999999, model="X"))
+    
+    def test_connection_profile_applies_pragmas(self):
+        """El perfil activa WAL y los ajustes indicados encima del perfil ganan"""
+        self.db.close()
+        self.db = Database(db_name=self.db_path, profile="balanced", pragmas={"cache_size": -1234})
+        self.db.cur.execute("PRAGMA journal_mode")
+        self.assertEqual(self.db.cur.fetchone()[0], "wal")
+        self.db.cur.execute("PRAGMA synchronous")
+        self.assertEqual(self.db.cur.fetchone()[0], 1)  # NORMAL
+        self.db.cur.execute("PRAGMA cache_size")
+        self.assertEqual(self.db.cur.fetchone()[0], -1234)
+        
+        # Con WAL otra conexión lee mientras hay una escritura sin confirmar
+        self.db.cur.execute("INSERT INTO DeviceReg (serialno) VALUES ('WAL00001')")
+        reader = sqlite3.connect(self.db_path, timeout=0)
+        try:
+            self.assertEqual(reader.execute("SELECT COUNT(*) FROM DeviceReg").fetchone()[0], 0)
+        finally:
+            reader.close()
+        self.db.conn.rollback()
+    
+    def test_connection_profile_validation(self):
+        """Perfiles y PRAGMAs desconocidos se rechazan antes de conectar"""
+        with self.assertRaises(ValueError):
+            Database(db_name=self.db_path, profile="turbo")
+        with self.assertRaises(ValueError):
+            Database(db_name=self.db_path, pragmas={"writable_schema": 1})
+        with self.assertRaises(ValueError):
+            Database(db_name=self.db_path, pragmas={"cache_size": "1; DROP TABLE DeviceReg"})
+    
+    def test_memory_database(self):
+        """':memory:' no crea archivos y funciona como una base normal"""
+        with Database(db_name=":memory:", profile="bulk-load") as db:
+            self.assertEqual(db.db_name, ":memory:")
+            self.assertIsNotNone(db.add_device("UP01", "MEM00001", "Laptop", "Dell", "[0] Sin fallas", ""))
+            self.assertEqual(db.count_devices(), 1)
+
+    
+    def test_get_device(self):
+        """get_device devuelve la fila completa o None"""
+        device_id = self.db.add_device("UP01", "GET00001", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+        self.assertEqual(self.db.get_device(device_id)[2], "GET00001")
+        self.assertIsNone(self.db.get_device(device_id + 1000))
+    
+    def test_write_session_rolls_back_on_error(self):
+        """Si la operación falla, write() deshace todo lo hecho en la sesión"""
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.db.write() as cur:
+                cur.execute("INSERT INTO DeviceReg (serialno) VALUES ('ROLL0001')")
+                cur.execute("INSERT INTO DeviceReg (serialno) VALUES ('ROLL0001')")
+        self.assertEqual(self.db.count_devices(), 0)
+    
+    def test_sessions_from_worker_threads(self):
+        """Lecturas y escrituras desde varios hilos a la vez sobre la misma Database"""
+        self.db.close()
+        self.db = Database(db_name=self.db_path, profile="balanced", pool_size=2)
+        errors = []
+        
+        def writer(prefix):
+            try:
+                for i in range(50):
+                    self.assertIsNotNone(self.db.add_device("UP01", f"{prefix}{i:04d}", "Laptop",
+                                                            "Dell XPS", "[0] Sin fallas", ""))
+            except Exception as e:
+                errors.append(e)
+        
+        def reader():
+            try:
+                for _ in range(50):
+                    self.db.count_devices()
+                    self.db.search_page(page_size=10)
+                    list(self.db.iter_devices("THR", "serialno"))
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=writer, args=(f"THR{n}",)) for n in range(2)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(self.db.count_devices(), 100)
+    
+    def test_interruptible_aborts_running_query(self):
+        """Activar el evento corta la consulta en curso de ese hilo"""
+        cancel = threading.Event()
+        outcome = []
+        
+        def slow_query():
+            try:
+                with self.db.interruptible(cancel):
+                    with self.db.read() as cur:
+                        cur.execute('WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) '
+                                    'SELECT COUNT(*) FROM n')
+                        outcome.append(cur.fetchone())
+            except sqlite3.OperationalError as e:
+                outcome.append(str(e))
+        
+        thread = threading.Thread(target=slow_query)
+        thread.start()
+        thread.join(timeout=0.2)
+        self.assertTrue(thread.is_alive())
+        cancel.set()
+        thread.join(timeout=5)
+        
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(outcome, ['interrupted'])
+        # La conexión vuelve al pool sin el handler: las lecturas siguientes no se cortan
+        self.assertEqual(self.db.count_devices(), 0)
+    
+    def test_delete_matches_shown_count_with_wildcards(self):
+        """'_' y '%' son literales: la baja elimina las mismas filas que contó la búsqueda"""
+        for term in ("LOT_", "T_", "%"):
+            with self.subTest(term=term):
+                self.db.add_devices_bulk([("UP01", serialno, "Laptop", "Dell XPS", "[0] Sin fallas", "")
+                                          for serialno in ("LOT_1", "LOTA1", "LOTB1", "LOTC1")],
+                                         verbose=False)
+                shown = self.db.count_devices(term, "serialno")
+                self.assertEqual(shown, 0 if term == "%" else 1)
+                self.assertEqual(len(self.db.search_device(term, "all")), shown)
+                self.assertEqual(self.db.del_SData(term, "serialno"), shown)
+                self.db.del_SData("LOT", "serialno")
+    
+    def test_cancelled_count_raises_instead_of_zero(self):
+        """Un conteo cancelado lanza la interrupción en lugar de informar 0 resultados"""
+        self.db.add_devices_bulk([("UP01", f"CNT{i:05d}", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+                                  for i in range(2000)])
+        cancel = threading.Event()
+        cancel.set()
+        with self.db.interruptible(cancel):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.db.count_devices("CN", "serialno")
+        self.assertEqual(self.db.count_devices("CN", "serialno"), 2000)
+
+
+class TestReaderPool(unittest.TestCase):
+    def test_close_wakes_waiting_acquire(self):
+        """Quien espera una conexión recibe un error al cerrarse el pool, no queda bloqueado"""
+        pool = ReaderPool(lambda: sqlite3.connect(':memory:'), max_size=1)
+        conn = pool.acquire()
+        errors = []
+
+        def waiter():
+            try:
+                pool.acquire()
+            except sqlite3.ProgrammingError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        thread.join(0.3)
+        self.assertTrue(thread.is_alive())
+
+        pool.close()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
+
+        # La conexión en uso se cierra al liberarse
+        pool.release(conn)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Pruebas unitarias para la exportación en streaming
+"""
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from src.database import Database
+from src.export import (EXPORT_COLUMNS, export_filetypes, export_rows_csv, export_rows_ndjson,
+                        export_rows_xlsx, format_export_row, get_exporter)
+from src.utils import generate_filename
+
+try:
+    from openpyxl import load_workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(db_name=os.path.join(self.tmpdir.name, "export.db"))
+        for i in range(5):
+            self.db.add_device("UP01", f"EXP{i:04d}", "Laptop", "Dell XPS",
+                               "[0] Sin fallas", f"Obs {i}")
+
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_format_export_row(self):
+        """La fecha se muestra en formato local y los None quedan vacíos"""
+        row = (1, "UP01", "EXP0001", "Laptop", "Dell", None, "2024-01-15 10:30:00", None)
+        self.assertEqual(format_export_row(row),
+                         (1, "UP01", "EXP0001", "Laptop", "Dell", "", "15/01/2024 10:30", ""))
+
+    def test_iter_devices_filters(self):
+        """iter_devices recorre el resultado por bloques con el mismo filtro que la búsqueda"""
+        rows = list(self.db.iter_devices(chunk_size=2))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(len(list(self.db.iter_devices("EXP0003", "serialno"))), 1)
+
+    @unittest.skipUnless(HAS_OPENPYXL, "openpyxl no instalado")
+    def test_export_rows_xlsx(self):
+        """El libro contiene los encabezados y todas las filas"""
+        filepath = os.path.join(self.tmpdir.name, "export.xlsx")
+        progress = []
+        count = export_rows_xlsx(self.db.iter_devices(), filepath, progress=progress.append)
+
+        self.assertEqual(count, 5)
+        self.assertEqual(progress[-1], 5)
+
+        workbook = load_workbook(filepath, read_only=True)
+        rows = list(workbook['Datos'].iter_rows(values_only=True))
+        workbook.close()
+        self.assertEqual(list(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row[2] for row in rows[1:]}, {f"EXP{i:04d}" for i in range(5)})
+
+
+    def test_export_rows_csv(self):
+        """El CSV tiene encabezados, fechas legibles y todas las filas"""
+        filepath = os.path.join(self.tmpdir.name, "export.csv")
+        count = export_rows_csv(self.db.iter_devices(), filepath)
+
+        with open(filepath, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(count, 5)
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 6)
+        self.assertRegex(rows[1][6], r'^\d{2}/\d{2}/\d{4} \d{2}:\d{2}$')
+
+    def test_export_rows_ndjson(self):
+        """Cada línea es un objeto JSON con los nombres de columna de la tabla"""
+        filepath = os.path.join(self.tmpdir.name, "export.ndjson")
+        count = export_rows_ndjson(self.db.iter_devices("EXP0002", "serialno"), filepath)
+
+        with open(filepath, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(count, 1)
+        self.assertEqual(records[0]["serialno"], "EXP0002")
+        self.assertEqual(records[0]["observations"], "Obs 2")
+
+    def test_exporter_selection(self):
+        """La extensión elegida manda; sin extensión conocida se usa el formato configurado"""
+        self.assertIs(get_exporter("datos.csv", "xlsx"), export_rows_csv)
+        self.assertIs(get_exporter("datos.JSONL", "xlsx"), export_rows_ndjson)
+        self.assertIs(get_exporter("datos", "csv"), export_rows_csv)
+        self.assertIs(get_exporter("datos.txt", "desconocido"), export_rows_xlsx)
+        self.assertEqual(export_filetypes("csv")[0], ("CSV files", "*.csv"))
+        self.assertTrue(generate_filename("bodega_export", "ndjson").endswith(".ndjson"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Pruebas unitarias para el importador de planillas (bodega-import)
+"""
+import csv
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from config import settings
+from src.database import Database
+from scripts.import_data import import_file, main, parse_row, map_header
+
+try:
+    from openpyxl import Workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+
+HEADER = ["Serial", "Tipo", "Modelo", "Código Planta", "Fecha", "Observaciones"]
+ROWS = [
+    ["IMP0001", "Laptop", "Dell XPS", "UP01", "15/01/2024 10:30", "Caja 1"],
+    ["IMP0002", "Desktop", "OptiPlex", "UP02", "", ""],
+    ["IMP0001", "Laptop", "Dell XPS", "UP01", "", "Repetido"],
+    ["x", "Laptop", "Dell XPS", "UP01", "", "Serial inválido"],
+    ["IMP0003", "Laptop", "Dell XPS", "UP01", "no-es-fecha", ""],
+]
+
+
+class TestImportData(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "import.db")
+        self.db = Database(db_name=self.db_path)
+    
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.db.close()
+        self.tmpdir.cleanup()
+    
+    def write_csv(self, rows):
+        path = os.path.join(self.tmpdir.name, "datos.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        return path
+    
+    def test_parse_row(self):
+        """Prueba la validación y normalización de una fila"""
+        columns = map_header(HEADER)
+        device, error = parse_row(ROWS[0], columns)
+        self.assertIsNone(error)
+        self.assertEqual(device, ("UP01", "IMP0001", "Laptop", "Dell XPS", "[0] Sin fallas",
+                                  "Caja 1", "2024-01-15 10:30:00"))
+        
+        device, error = parse_row(ROWS[3], columns)
+        self.assertIsNone(device)
+        self.assertIn("serie", error)
+    
+    def test_missing_required_columns(self):
+        """Prueba que se rechaza un archivo sin columnas obligatorias"""
+        with self.assertRaises(ValueError):
+            map_header(["Serial", "Planta"])
+    
+    def test_import_csv(self):
+        """Prueba la importación de un CSV con duplicados y filas inválidas"""
+        path = self.write_csv(ROWS)
+        rejects = os.path.join(self.tmpdir.name, "rechazos.csv")
+        
+        stats = import_file(path, self.db, batch_size=2, rejects_path=rejects, verbose=False)
+        
+        self.assertEqual(stats.read, 5)
+        self.assertEqual(stats.inserted, 2)
+        self.assertEqual(stats.duplicates, 1)
+        self.assertEqual(stats.invalid, 2)
+        self.assertEqual(self.db.count_devices(), 2)
+        self.assertEqual(len(self.db.search_device("IMP000", "serialno")), 2)
+        
+        with open(rejects, newline="", encoding="utf-8") as f:
+            self.assertEqual(len(list(csv.reader(f))), 4)
+    
+    @unittest.skipIf(not HAS_OPENPYXL, "openpyxl no disponible")
+    def test_import_xlsx(self):
+        """Prueba la importación de una planilla Excel"""
+        path = os.path.join(self.tmpdir.name, "datos.xlsx")
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(HEADER)
+        for row in ROWS[:3]:
+            sheet.append(row)
+        workbook.save(path)
+        
+        stats = import_file(path, self.db, verbose=False)
+        
+        self.assertEqual(stats.inserted, 2)
+        self.assertEqual(stats.duplicates, 1)
+    
+    def test_main_missing_file(self):
+        """Prueba el código de salida cuando el archivo no existe"""
+        self.assertEqual(main([os.path.join(self.tmpdir.name, "nada.csv"), "--quiet"]), 1)
+
+    
+    def test_main_uses_application_database(self):
+        """Sin --db se importa en la base de la aplicación, no en data/ del directorio actual"""
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir.name)
+        try:
+            with mock.patch("scripts.import_data.Database") as database:
+                database.return_value.__enter__.return_value.rebuild_fulltext.return_value = True
+                self.assertEqual(main(["--rebuild-index"]), 0)
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(database.call_args[0][0], settings.DATABASE_PATH)
+        self.assertTrue(os.path.isabs(database.call_args[0][0]))
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir.name, "data")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Pruebas unitarias para la caché de consultas
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from src.database import Database
+from src.query_cache import MISSING, QueryCache
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_lru_bounded_by_rows(self):
+        """Se descartan las entradas menos usadas hasta volver al máximo de filas"""
+        cache = QueryCache(max_rows=10)
+        cache.get('a', 1)
+        cache.put('a', 1, 'A', 4)
+        cache.put('b', 1, 'B', 4)
+        self.assertEqual(cache.get('a', 1), 'A')
+        cache.put('c', 1, 'C', 4)
+
+        self.assertIs(cache.get('b', 1), MISSING)
+        self.assertEqual(cache.get('a', 1), 'A')
+        self.assertEqual(cache.get('c', 1), 'C')
+        self.assertEqual(cache.rows, 8)
+
+    def test_too_large_is_not_stored(self):
+        cache = QueryCache(max_rows=10)
+        cache.get('big', 1)
+        cache.put('big', 1, 'X' * 11, 11)
+        self.assertIs(cache.get('big', 1), MISSING)
+
+    def test_new_version_discards_everything(self):
+        """Un cambio de versión invalida todas las entradas"""
+        cache = QueryCache()
+        cache.get('a', 1)
+        cache.put('a', 1, 'A', 1)
+        self.assertIs(cache.get('a', 2), MISSING)
+        self.assertEqual(len(cache), 0)
+
+    def test_result_read_with_old_version_is_dropped(self):
+        """Un resultado leído antes de una escritura no se guarda si otro hilo ya vio la nueva versión"""
+        cache = QueryCache()
+        cache.get('a', 1)
+        cache.get('a', 2)
+        cache.put('a', 1, 'viejo', 1)
+        self.assertIs(cache.get('a', 2), MISSING)
+
+
+class TestDatabaseQueryCache(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "cache.db")
+        self.db = Database(db_name=self.db_path)
+        for i in range(10):
+            self.db.add_device("UP01", f"CACHE{i:04d}", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_repeated_search_uses_cache(self):
+        """La segunda búsqueda igual se resuelve desde memoria"""
+        first = self.db.search_device("CACHE", "serialno")
+        hits = self.db.query_cache.hits
+        second = self.db.search_device("CACHE", "serialno")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.db.query_cache.hits, hits + 1)
+        # Cada llamada recibe su propia lista
+        second.clear()
+        self.assertEqual(len(self.db.search_device("CACHE", "serialno")), 10)
+
+    def test_every_write_path_invalidates(self):
+        """Altas, modificaciones, bajas y la cola de escritura invalidan la caché"""
+        self.assertEqual(len(self.db.get_all_devices()), 10)
+
+        self.db.add_device("UP02", "NEW0001", "Tablet", "iPad", "[0] Sin fallas", "")
+        self.assertEqual(len(self.db.get_all_devices()), 11)
+
+        device_id = self.db.search_device("NEW0001", "serialno")[0][0]
+        self.db.update_device(device_id, model="iPad Pro")
+        self.assertEqual(self.db.search_device("NEW0001", "serialno")[0][4], "iPad Pro")
+
+        self.db.del_SData("NEW0001", "serialno", exact_match=True)
+        self.assertEqual(self.db.search_device("NEW0001", "serialno"), [])
+        self.assertEqual(self.db.count_devices(), 10)
+
+    def test_paged_and_counted_queries_are_cached(self):
+        """search_page y count_devices también usan la caché y ven las escrituras"""
+        rows, token = self.db.search_page(page_size=4)
+        self.assertEqual(self.db.search_page(page_size=4), (rows, token))
+        self.assertEqual(self.db.count_devices("CACHE", "serialno"), 10)
+
+        self.db.add_device("UP01", "CACHE9999", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+        self.assertEqual(self.db.count_devices("CACHE", "serialno"), 11)
+        self.assertEqual(self.db.search_page(page_size=4)[0][0][2], "CACHE9999")
+
+    def test_writes_from_other_connections_invalidate(self):
+        """Un commit de otra conexión (p. ej. un script de importación) cambia data_version"""
+        self.assertEqual(self.db.count_devices(), 10)
+
+        conn = sqlite3.connect(os.path.join('data', self.db_path))
+        conn.execute("DELETE FROM DeviceReg WHERE serialno = 'CACHE0000'")
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(self.db.count_devices(), 9)
+
+    def test_reopen_invalidates(self):
+        self.assertEqual(self.db.count_devices(), 10)
+        version = self.db.data_version()
+        self.db.reopen()
+        self.assertNotEqual(self.db.data_version(), version)
+
+    def test_cache_can_be_disabled(self):
+        db = Database(db_name=os.path.join(self.tmpdir.name, "nocache.db"), cache_rows=0)
+        try:
+            db.get_all_devices()
+            db.get_all_devices()
+            self.assertEqual(len(db.query_cache), 0)
+        finally:
+            db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Pruebas unitarias para el lenguaje de consulta
+"""
+import os
+import tempfile
+import unittest
+
+from src.database import Database
+from src.query_language import QuerySyntaxError, compile_query, parse_query
+
+
+def like_all(word):
+    return 'serialno LIKE ?', (f'%{word}%',)
+
+
+class TestQueryParser(unittest.TestCase):
+    def test_parse_terms(self):
+        self.assertEqual(parse_query('plant:UP02 model:"Dell XPS*" dell "hp elite"'),
+                         [("plant", "UP02"), ("model", "Dell XPS*"), (None, "dell"), (None, "hp elite")])
+
+    def test_unknown_prefix_is_text(self):
+        """Un prefijo que no es un campo (un serial con ':') se busca como palabra"""
+        self.assertEqual(parse_query('AB:12 color:"rojo claro" Plant:UP01'),
+                         [(None, "AB:12"), (None, "color:rojo claro"), ("plant", "UP01")])
+
+    def test_invalid_queries(self):
+        for text in ("", "plant:", "date:2024-1", "date:..", "date:ayer..2024"):
+            with self.subTest(text=text):
+                with self.assertRaises(QuerySyntaxError):
+                    compile_query(text, like_all)
+
+    def test_compile_indexable_predicates(self):
+        """Exactos con '=', prefijos y fechas con rangos, todo parametrizado"""
+        where, params = compile_query("plant:UP02 failure:3 date:2024-01..2024-03 serial:AB12*", like_all)
+        self.assertEqual(where, "(plant COLLATE NOCASE = ?) "
+                                "AND (failuretype COLLATE NOCASE >= ? AND failuretype COLLATE NOCASE < ?) "
+                                "AND (entry_date >= ? AND entry_date < ?) "
+                                "AND (serialno COLLATE NOCASE >= ? AND serialno COLLATE NOCASE < ?)")
+        self.assertEqual(params, ("UP02", "[3]", "[3^", "2024-01", "2024-04", "ab12", "ab13"))
+
+    def test_prefix_bound_in_nocase_order(self):
+        """Un fin que cae en A-Z pasa a '[', el siguiente carácter en el orden de NOCASE"""
+        self.assertEqual(compile_query("serial:AB@*", like_all)[1], ("ab@", "ab["))
+        self.assertEqual(compile_query("serial:AZ*", like_all)[1], ("az", "a{"))
+
+    def test_same_field_is_ored(self):
+        where, params = compile_query("type:Laptop type:Tablet", like_all)
+        self.assertEqual(where, "((type COLLATE NOCASE = ?) OR (type COLLATE NOCASE = ?))")
+        self.assertEqual(params, ("Laptop", "Tablet"))
+
+    def test_open_date_ranges(self):
+        self.assertEqual(compile_query("date:2024-02..", like_all),
+                         ("(entry_date >= ?)", ("2024-02",)))
+        self.assertEqual(compile_query("date:..2024-02-15", like_all),
+                         ("(entry_date < ?)", ("2024-02-16",)))
+
+
+class TestQuerySearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.db = Database(db_name=os.path.join(cls.tmpdir.name, "query.db"))
+        devices = [
+            ("UP01", "AB120001", "Laptop", "Dell XPS", "[0] Sin fallas", "2024-01-10 08:00:00"),
+            ("UP02", "AB120002", "Laptop", "Dell XPS", "[3] Pantalla", "2024-02-20 09:00:00"),
+            ("UP02", "AB990003", "Laptop", "HP Elite", "[3] Pantalla", "2024-03-31 23:00:00"),
+            ("UP02", "CD120004", "Tablet", "iPad", "[3] Pantalla", "2024-02-01 10:00:00"),
+            ("UP02", "AB120005", "Laptop", "Dell XPS", "[3] Pantalla", "2024-04-01 00:00:00"),
+        ]
+        with cls.db.write() as cur:
+            cur.executemany('''INSERT INTO DeviceReg (plant, serialno, type, model, failuretype, entry_date)
+                               VALUES (?, ?, ?, ?, ?, ?)''', devices)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        cls.tmpdir.cleanup()
+
+    def serials(self, query):
+        return sorted(row[2] for row in self.db.search_device(query, "query"))
+
+    def test_compound_filter(self):
+        self.assertEqual(self.serials("plant:UP02 type:Laptop failure:3 date:2024-01..2024-03 serial:AB12*"),
+                         ["AB120002"])
+
+    def test_date_range_includes_end_month(self):
+        self.assertEqual(self.serials("date:2024-02..2024-03"), ["AB120002", "AB990003", "CD120004"])
+
+    def test_free_text_and_fields(self):
+        self.assertEqual(self.serials("dell plant:UP02"), ["AB120002", "AB120005"])
+        self.assertEqual(self.serials('model:"Dell XPS" type:Laptop type:Tablet plant:UP01'), ["AB120001"])
+
+    def test_fields_ignore_case(self):
+        """Exactos y prefijos no distinguen mayúsculas, igual que las palabras sueltas"""
+        self.assertEqual(self.serials("plant:up01"), ["AB120001"])
+        self.assertEqual(self.serials("plant:Up02 serial:ab12*"), ["AB120002", "AB120005"])
+        self.assertEqual(self.serials("serial:aB12000*"), ["AB120001", "AB120002", "AB120005"])
+
+    def test_prefix_ending_before_letters(self):
+        """serial:AB@* no abarca los caracteres entre 'Z' y 'a' ([ \\ ] ^ _ `)"""
+        with self.db.write() as cur:
+            cur.executemany("INSERT INTO DeviceReg (plant, serialno, entry_date) VALUES ('UP09', ?, ?)",
+                            [(serialno, "2023-01-01 00:00:00") for serialno in ("AB@1", "AB[1", "AB_1", "ABA1")])
+        try:
+            self.assertEqual(self.serials("serial:AB@*"), ["AB@1"])
+            self.assertEqual(self.serials("serial:ab@*"), ["AB@1"])
+        finally:
+            with self.db.write() as cur:
+                cur.execute("DELETE FROM DeviceReg WHERE plant = 'UP09'")
+
+    def test_unknown_prefix_searches_text(self):
+        self.assertEqual(self.serials("AB:12"), [])
+
+    def test_paged_queries_and_count(self):
+        """El modo "query" funciona con la paginación y el conteo como los demás criterios"""
+        self.assertEqual(self.db.count_devices("failure:3", "query"), 4)
+        rows, token = self.db.search_page("failure:3", "query", page_size=3)
+        self.assertEqual([row[2] for row in rows], ["AB120005", "AB990003", "AB120002"])
+        self.assertIsNotNone(token)
+
+    def test_explain_uses_indexes(self):
+        """EXPLAIN QUERY PLAN muestra búsquedas por índice, no un recorrido de la tabla"""
+        for query, index in (("serial:AB12*", "idx_devicereg_serialno_nocase"),
+                             ("plant:up02", "idx_devicereg_plant"),
+                             ("failure:3", "idx_devicereg_failuretype"),
+                             ("date:2024-01..2024-02", "idx_devicereg_entry_date")):
+            with self.subTest(query=query):
+                sql, params, plan = self.db.explain_query(query)
+                self.assertTrue(sql.startswith("SELECT * FROM DeviceReg WHERE"))
+                self.assertTrue(any(index in line for line in plan), plan)
+                self.assertFalse(any(line.startswith("SCAN DeviceReg") and "INDEX" not in line
+                                     for line in plan), plan)
+
+
+class TestPlannerStatistics(unittest.TestCase):
+    def test_statistics_after_loading_data(self):
+        """Con estadísticas de los datos cargados el rango de serial usa su índice, no el de planta"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "stats.db")
+            db = Database(db_name=path)
+            db.add_devices_bulk([(f"UP{i % 10:02d}", f"SER{i:06d}", "Laptop", "Dell", "[0] Sin fallas", "")
+                                 for i in range(3000)], verbose=False)
+            db.close()
+
+            db = Database(db_name=path)
+            try:
+                sql, params, plan = db.explain_query("plant:UP01 serial:SER0001*")
+                self.assertTrue(any("idx_devicereg_serialno_nocase" in line for line in plan), plan)
+                self.assertFalse(any("idx_devicereg_plant" in line for line in plan), plan)
+            finally:
+                db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
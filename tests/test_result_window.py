@@ -0,0 +1,306 @@
+"""
+Pruebas unitarias para la ventana de resultados y la tabla virtual
+"""
+import os
+import tempfile
+import unittest
+
+from src.database import Database
+from src.result_window import MemoryWindow, ResultWindow
+from views.virtual_table import LOADING_TEXT, VirtualTreeview
+
+
+class TestResultWindow(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.db = Database(db_name=os.path.join(cls.tmpdir.name, "window.db"))
+        cls.db.add_devices_bulk([
+            ("UP01", f"WIN{i:05d}", "Laptop", "Dell" if i % 3 else "HP", "[0] Sin fallas", "")
+            for i in range(1000)
+        ])
+        cls.expected = [row for rows in cls.db.iter_pages(page_size=1000) for row in rows]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        cls.tmpdir.cleanup()
+
+    def test_page_token_at_matches_keyset_pages(self):
+        """El token en una posición continúa donde terminaría la paginación keyset"""
+        rows, token = self.db.search_page(page_size=100)
+        self.assertEqual(self.db.page_token_at(100), token)
+        self.assertIsNone(self.db.page_token_at(0))
+        self.assertIsNone(self.db.page_token_at(5000))
+
+    def test_rows_by_position(self):
+        """Cualquier rango coincide con el resultado completo, en cualquier orden de acceso"""
+        window = ResultWindow(self.db, page_size=64, max_pages=3)
+        self.assertEqual(len(window), 1000)
+        for start, count in ((900, 30), (0, 10), (500, 200), (990, 50), (63, 2)):
+            with self.subTest(start=start):
+                self.assertEqual(window.rows(start, count), self.expected[start:start + count])
+        self.assertEqual(window.rows(1000, 10), [])
+
+    def test_cache_is_bounded(self):
+        """Solo se conservan max_pages páginas en memoria"""
+        window = ResultWindow(self.db, page_size=50, max_pages=4)
+        for start in range(0, 1000, 50):
+            window.rows(start, 50)
+        self.assertEqual(len(window._pages), 4)
+
+    def test_rows_without_fetch(self):
+        """Sin fetch las filas de páginas que no están en memoria son None y no se consulta"""
+        window = ResultWindow(self.db, page_size=100)
+        self.assertEqual(window.rows(95, 10, fetch=False), [None] * 10)
+        self.assertEqual(window.missing_pages(95, 10), [0, 1])
+        self.assertEqual(window._pages, {})
+
+        window.page(0)
+        self.assertEqual(window.rows(95, 10, fetch=False), self.expected[95:100] + [None] * 5)
+        self.assertEqual(window.missing_pages(95, 10), [1])
+        # La última página está incompleta
+        self.assertEqual(len(window.rows(990, 50, fetch=False)), 10)
+
+    def test_filtered_window(self):
+        """La ventana respeta el criterio de búsqueda"""
+        window = ResultWindow(self.db, "HP", "model", page_size=40)
+        rows = window.rows(0, len(window))
+        self.assertEqual(len(rows), 334)
+        self.assertTrue(all(row[4] == "HP" for row in rows))
+
+
+class TestMemoryWindow(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            (1, "UP01", "AB1234", "Laptop", "Dell XPS", "[0] Sin fallas", "2024-01-01 10:00:00", ""),
+            (2, "UP02", "ab1299", "Tablet", "iPad", "[0] Sin fallas", "2024-01-01 09:00:00", ""),
+            (3, "UP01", "CD1234", "Laptop", "HP Elite", "[0] Sin fallas", "2024-01-01 08:00:00", None),
+        ]
+        self.window = MemoryWindow(self.rows, "ab12", "serialno")
+
+    def test_refine_extended_term(self):
+        """Un término que contiene al anterior se filtra en memoria, sin distinguir mayúsculas"""
+        self.assertTrue(self.window.can_refine("AB123", "serialno"))
+        refined = self.window.refine("AB123")
+        self.assertEqual([row[0] for row in refined.rows(0, 10)], [1])
+        self.assertEqual(refined.query, ("AB123", "serialno"))
+
+    def test_cannot_refine_shorter_or_other_criteria(self):
+        """Un término más corto, distinto o de otro criterio necesita la base de datos"""
+        self.assertFalse(self.window.can_refine("ab1", "serialno"))
+        self.assertFalse(self.window.can_refine("cd12", "serialno"))
+        self.assertFalse(self.window.can_refine("ab123", "model"))
+        self.assertFalse(MemoryWindow(self.rows).can_refine("ab", "serialno"))
+
+    def test_case_folding_matches_like(self):
+        """Solo se igualan mayúsculas ASCII, como LIKE; los términos no ASCII van a la base"""
+        rows = self.rows + [(4, "UP01", "AB12Ñ", "Laptop", "\u212a-Series", "[0] Sin fallas",
+                             "2024-01-01 07:00:00", "")]
+        window = MemoryWindow(rows, "ab12", "serialno")
+        self.assertFalse(window.can_refine("ab12ñ", "serialno"))
+        self.assertTrue(window.can_refine("ab12", "serialno"))
+        self.assertEqual([row[0] for row in MemoryWindow(rows, "-se", "model").refine("k-se").rows(0, 10)],
+                         [])
+
+    def test_all_columns(self):
+        """El criterio 'all' busca en serial, tipo, modelo y planta"""
+        window = MemoryWindow(self.rows, "p", "all")
+        self.assertEqual([row[0] for row in window.refine("up02").rows(0, 10)], [2])
+        self.assertEqual([row[0] for row in window.refine("hp").rows(0, 10)], [3])
+
+
+class FakeTree:
+    """Lo mínimo de ttk.Treeview que usa VirtualTreeview"""
+
+    def __init__(self, height=10):
+        self.height = height
+        self.items = {}
+        self.selected = ()
+        self.created = 0
+
+    def cget(self, option):
+        return self.height
+
+    def bind(self, *args):
+        pass
+
+    def insert(self, parent, index, values):
+        self.created += 1
+        iid = f"I{self.created}"
+        self.items[iid] = values
+        return iid
+
+    def delete(self, iid):
+        del self.items[iid]
+
+    def item(self, iid, values):
+        self.items[iid] = values
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, iid):
+        self.selected = (iid,)
+
+    def selection_remove(self, items):
+        self.selected = ()
+
+    def focus(self, iid):
+        pass
+
+    def bbox(self, iid):
+        return ""
+
+
+class FakeScrollbar:
+    def configure(self, **options):
+        pass
+
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+class ListWindow:
+    """ResultWindow sobre una lista en memoria"""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def rows(self, start, count):
+        return self._rows[start:start + count]
+
+
+class PagedListWindow(ListWindow):
+    """Ventana con páginas de 100 filas en la que solo algunas están cargadas"""
+
+    def __init__(self, rows, loaded=(0,)):
+        super().__init__(rows)
+        self.loaded = set(loaded)
+
+    def rows(self, start, count, fetch=True):
+        return [row if row[0] // 100 in self.loaded else None
+                for row in self._rows[start:start + count]]
+
+    def missing_pages(self, start, count):
+        return [index for index in range(start // 100, (start + count - 1) // 100 + 1)
+                if index not in self.loaded]
+
+
+class TestBackgroundLoading(unittest.TestCase):
+    """VirtualTreeview con load_pages: la tabla nunca hace que la ventana consulte"""
+
+    def setUp(self):
+        self.window = PagedListWindow([(i, f"S{i}") for i in range(1000)])
+        self.requests = []
+        self.selected = []
+        self.tree = FakeTree(height=10)
+        self.table = VirtualTreeview(self.tree, FakeScrollbar(), tuple, on_select=self.selected.append,
+                                     load_pages=lambda window, pages: self.requests.append(pages))
+        self.table.set_window(self.window)
+
+    def shown(self):
+        return [values[0] for values in self.tree.items.values()]
+
+    def test_placeholder_until_page_loaded(self):
+        """Las filas sin cargar se muestran como espera y se piden sus páginas"""
+        self.assertEqual(self.requests, [])
+        self.table.scroll_to(495)
+        self.assertEqual(self.requests, [[4, 5]])
+        self.assertTrue(all(values == ("", LOADING_TEXT) for values in self.tree.items.values()))
+
+        self.window.loaded.add(4)
+        self.table.page_loaded(self.window)
+        self.assertEqual(self.shown(), list(range(495, 500)) + [""] * 5)
+        self.assertEqual(self.requests[-1], [5])
+
+    def test_selection_of_placeholder_reports_id_when_loaded(self):
+        """Seleccionar una fila de espera informa su id cuando llega la página"""
+        self.table.scroll_to(400)
+        self.tree.selection_set(list(self.tree.items)[2])
+        self.table.on_tree_select(None)
+        self.assertEqual(self.selected, [None])
+
+        self.window.loaded.add(4)
+        self.table.page_loaded(self.window)
+        self.assertEqual(self.selected[-1], 402)
+
+    def test_keyboard_onto_placeholder(self):
+        """Moverse con el teclado a una fila sin cargar no falla e informa el id al cargarla"""
+        self.table.move_selection(150)
+        self.assertEqual(self.table.selected_index, 149)
+        self.assertEqual(self.selected, [None])
+
+        self.window.loaded.add(1)
+        self.table.page_loaded(self.window)
+        self.assertEqual(self.selected[-1], 149)
+
+    def test_stale_window_is_ignored(self):
+        """Las páginas de una búsqueda reemplazada no se dibujan"""
+        self.table.scroll_to(400)
+        self.table.page_loaded(PagedListWindow([]))
+        self.assertEqual(self.shown(), [""] * 10)
+
+
+class TestVirtualTreeview(unittest.TestCase):
+    def setUp(self):
+        self.data = [(i, f"S{i}") for i in range(100000)]
+        window = ListWindow(self.data)
+        self.tree = FakeTree(height=10)
+        self.scrollbar = FakeScrollbar()
+        self.selected = []
+        self.table = VirtualTreeview(self.tree, self.scrollbar, tuple, on_select=self.selected.append)
+        self.table.set_window(window)
+
+    def shown(self):
+        return [values[0] for values in self.tree.items.values()]
+
+    def test_item_count_is_fixed(self):
+        """Un resultado de 100.000 filas crea solo los ítems visibles"""
+        self.assertEqual(self.shown(), list(range(10)))
+        self.table.yview("moveto", "0.5")
+        self.assertEqual(self.shown(), list(range(50000, 50010)))
+        self.table.yview("moveto", "1.0")
+        self.assertEqual(self.shown(), list(range(99990, 100000)))
+        self.assertEqual(self.tree.created, 10)
+        self.assertEqual(self.scrollbar.position, (0.9999, 1.0))
+
+    def test_scroll_units_and_pages(self):
+        self.table.yview("scroll", "1", "pages")
+        self.assertEqual(self.table.offset, 10)
+        self.table.yview("scroll", "-3", "units")
+        self.assertEqual(self.table.offset, 7)
+        self.table.scroll_by(-100)
+        self.assertEqual(self.table.offset, 0)
+
+    def test_selection_follows_row(self):
+        """La selección queda en la fila aunque se desplace fuera de la vista"""
+        self.tree.selection_set(list(self.tree.items)[3])
+        self.table.on_tree_select(None)
+        self.assertEqual(self.selected, [3])
+
+        self.table.scroll_by(20)
+        self.assertEqual(self.tree.selection(), ())
+        self.table.on_tree_select(None)
+        self.assertEqual(self.table.selected_index, 3)
+
+        self.table.scroll_to(0)
+        self.assertEqual(self.tree.items[self.tree.selection()[0]][0], 3)
+
+    def test_keyboard_moves_view(self):
+        self.table.move_selection(25)
+        self.assertEqual(self.table.selected_index, 24)
+        self.assertEqual(self.table.offset, 15)
+        self.assertEqual(self.selected[-1], 24)
+
+    def test_clear(self):
+        self.table.clear()
+        self.assertEqual(self.tree.items, {})
+        self.assertEqual(self.scrollbar.position, (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
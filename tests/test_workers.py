@@ -0,0 +1,234 @@
+"""
+Pruebas unitarias para las tareas en segundo plano
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+from src.database import Database
+from src.result_window import MemoryWindow, ResultWindow
+from concurrent.futures import Future
+
+from src.workers import BackupJob, ExportJob, PageJob, SearchJob, when_done
+
+
+class TestExportJob(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "workers.db")
+        self.filepath = os.path.join(self.tmpdir.name, "export.xlsx")
+        with Database(db_name=self.db_path) as db:
+            for i in range(5):
+                db.add_device("UP01", f"JOB{i:04d}", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.tmpdir.cleanup()
+
+    def run_job(self, job):
+        job.start()
+        job.join(timeout=30)
+        self.assertFalse(job.is_alive())
+        return job.poll()
+
+    def test_export_job_reports_progress_and_result(self):
+        """La tarea informa el total, el avance y la cantidad exportada"""
+        captured = []
+
+        def writer(rows, filepath, progress=None):
+            captured.extend(rows)
+            progress(len(captured))
+            open(filepath, 'w').close()
+            return len(captured)
+
+        events = self.run_job(ExportJob(self.db_path, (None, None), self.filepath, writer=writer))
+
+        self.assertEqual(events[0], ('progress', (0, 5)))
+        self.assertEqual(events[-1], ('done', 5))
+        self.assertEqual(len(captured), 5)
+
+    def test_export_job_shares_database(self):
+        """Con una Database compartida la tarea lee por el pool y no la cierra"""
+        def writer(rows, filepath, progress=None):
+            open(filepath, 'w').close()
+            return len(list(rows))
+
+        with Database(db_name=self.db_path) as db:
+            events = self.run_job(ExportJob(db, ("JOB", "serialno"), self.filepath, writer=writer))
+            self.assertEqual(events[-1], ('done', 5))
+            self.assertEqual(db.count_devices(), 5)
+
+    def test_export_job_cancel_removes_partial_file(self):
+        """Al cancelar, la tarea se detiene y borra el archivo parcial"""
+        started = threading.Event()
+
+        def writer(rows, filepath, progress=None):
+            open(filepath, 'w').close()
+            for _ in rows:
+                started.set()
+                job.cancel()
+            return 0
+
+        job = ExportJob(self.db_path, ("JOB", "serialno"), self.filepath, writer=writer)
+        events = self.run_job(job)
+
+        self.assertTrue(started.is_set())
+        self.assertEqual(events[-1], ('cancelled', None))
+        self.assertFalse(os.path.exists(self.filepath))
+
+    def test_export_job_error_is_reported(self):
+        """Los errores de escritura llegan como evento, no como excepción en el hilo"""
+        def writer(rows, filepath, progress=None):
+            raise PermissionError("archivo bloqueado")
+
+        events = self.run_job(ExportJob(self.db_path, (None, None), self.filepath, writer=writer))
+
+        kind, error = events[-1]
+        self.assertEqual(kind, 'error')
+        self.assertIsInstance(error, PermissionError)
+
+
+
+class TestSearchJob(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(db_name=os.path.join(self.tmpdir.name, "search.db"))
+        for i in range(30):
+            self.db.add_device("UP01", f"FIND{i:04d}", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_search_job_returns_window(self):
+        """La búsqueda termina con una ResultWindow contada y su primera página en memoria"""
+        job = SearchJob(self.db, ("FIND", "serialno"), page_size=10, memory_limit=0)
+        job.start()
+        job.join(timeout=10)
+
+        [(kind, window)] = job.poll()
+        self.assertEqual(kind, 'done')
+        self.assertEqual(len(window), 30)
+        self.assertIn(0, window._pages)
+        self.assertEqual(len(window.rows(0, 10)), 10)
+
+    def test_small_result_is_kept_in_memory(self):
+        """Con pocos resultados la tarea trae todas las filas para refinarlas sin consultar"""
+        job = SearchJob(self.db, ("FIND", "serialno"), memory_limit=100)
+        job.start()
+        job.join(timeout=10)
+
+        [(kind, window)] = job.poll()
+        self.assertEqual(kind, 'done')
+        self.assertIsInstance(window, MemoryWindow)
+        self.assertEqual(len(window), 30)
+        self.assertTrue(window.can_refine("find001", "serialno"))
+        self.assertEqual([row[2] for row in window.refine("find001").rows(0, 30)],
+                         [f"FIND{i:04d}" for i in range(19, 9, -1)])
+
+    def test_cancelled_search_job(self):
+        """Una búsqueda reemplazada informa 'cancelled' en lugar del resultado"""
+        job = SearchJob(self.db, ("FIND", "serialno"))
+        job.cancel()
+        job.start()
+        job.join(timeout=10)
+
+        self.assertEqual(job.poll(), [('cancelled', None)])
+
+
+class TestPageJob(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(db_name=os.path.join(self.tmpdir.name, "pages.db"))
+        self.db.add_devices_bulk([("UP01", f"PAGE{i:04d}", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+                                  for i in range(100)])
+
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_page_job_loads_missing_pages(self):
+        """Las páginas se traen en el hilo de la tarea y quedan en la ventana"""
+        window = ResultWindow(self.db, "PAGE", "serialno", page_size=10)
+        self.assertEqual(window.missing_pages(45, 10), [4, 5])
+        job = PageJob(self.db, window, [4, 5])
+        job.start()
+        job.join(timeout=10)
+
+        self.assertEqual(job.poll(), [('done', [4, 5])])
+        self.assertEqual(window.missing_pages(45, 10), [])
+        self.assertNotIn(None, window.rows(45, 10, fetch=False))
+
+    def test_cancelled_page_job(self):
+        window = ResultWindow(self.db, "PAGE", "serialno", page_size=10)
+        job = PageJob(self.db, window, [7])
+        job.cancel()
+        job.start()
+        job.join(timeout=10)
+
+        self.assertEqual(job.poll(), [('cancelled', None)])
+        self.assertEqual(window.missing_pages(70, 10), [7])
+
+
+class TestBackupJob(unittest.TestCase):
+    def test_backup_job_reports_result(self):
+        """El resultado (éxito, archivo) de la tarea llega como evento 'done'"""
+        calls = []
+
+        def task():
+            calls.append(threading.current_thread().name)
+            return True, "bodega_backup.db"
+
+        job = BackupJob(task)
+        job.start()
+        job.join(timeout=10)
+
+        self.assertEqual(job.poll(), [('done', (True, "bodega_backup.db"))])
+        self.assertEqual(calls, ["BackupJob"])
+
+
+class FakeWidget:
+    """winfo_exists y after de un widget de Tk"""
+
+    def __init__(self):
+        self.exists = True
+        self.scheduled = []
+
+    def winfo_exists(self):
+        return self.exists
+
+    def after(self, interval, func, *args):
+        self.scheduled.append((func, args))
+
+    def run_scheduled(self):
+        func, args = self.scheduled.pop()
+        func(*args)
+
+
+class TestWhenDone(unittest.TestCase):
+    def test_callback_when_done(self):
+        widget, future, calls = FakeWidget(), Future(), []
+        when_done(widget, future, calls.append)
+        self.assertEqual(calls, [])
+        future.set_result(1)
+        widget.run_scheduled()
+        self.assertEqual(calls, [future])
+
+    def test_destroyed_widget_stops_polling(self):
+        """Con la vista cerrada no se programa otro after() ni se llama al callback"""
+        widget, future, calls = FakeWidget(), Future(), []
+        when_done(widget, future, calls.append)
+        widget.exists = False
+        future.set_result(1)
+        widget.run_scheduled()
+        self.assertEqual((calls, widget.scheduled), ([], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Pruebas unitarias para la cola de escritura con commit agrupado
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+from src.database import Database
+from src.write_queue import DuplicateSerialError, WriteQueue
+
+
+class TestWriteQueue(unittest.TestCase):
+    def setUp(self):
+        """Configuración antes de cada prueba"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = Database(db_name=os.path.join(self.tmpdir.name, "queue.db"))
+        self.writes = WriteQueue(self.db, max_delay_ms=50)
+        self.writes.start()
+
+    def tearDown(self):
+        """Limpieza después de cada prueba"""
+        self.writes.close(timeout=5)
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def add(self, serialno):
+        return self.writes.add_device("UP01", serialno, "Laptop", "Dell XPS", "[0] Sin fallas", "")
+
+    def test_batch_shares_commits(self):
+        """Las altas encoladas juntas se confirman en menos commits que operaciones"""
+        futures = [self.add(f"QUEUE{i:04d}") for i in range(50)]
+        ids = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual(len(set(ids)), 50)
+        self.assertLess(self.writes.commits, 50)
+        self.assertEqual(self.db.count_devices(), 50)
+
+    def test_duplicate_only_fails_its_operation(self):
+        """Un serial duplicado falla solo su Future; el resto del grupo se guarda"""
+        first = self.add("DUP0001")
+        duplicate = self.add("DUP0001")
+        other = self.add("DUP0002")
+
+        self.assertIsNotNone(first.result(timeout=5))
+        with self.assertRaises(DuplicateSerialError) as ctx:
+            duplicate.result(timeout=5)
+        self.assertEqual(ctx.exception.serialno, "DUP0001")
+        self.assertIsNotNone(other.result(timeout=5))
+        self.assertEqual(self.db.count_devices(), 2)
+
+    def test_update_and_delete(self):
+        """Modificaciones y bajas devuelven su resultado por el Future"""
+        device_id = self.add("UPD0001").result(timeout=5)
+
+        self.assertTrue(self.writes.update_device(device_id, model="Dell Latitude").result(timeout=5))
+        self.assertFalse(self.writes.update_device(999999, model="X").result(timeout=5))
+        self.assertEqual(self.db.get_device(device_id)[4], "Dell Latitude")
+
+        self.assertEqual(self.writes.delete_devices("UPD0001").result(timeout=5), 1)
+        self.assertEqual(self.db.count_devices(), 0)
+
+    def test_update_rejects_unknown_fields(self):
+        """Los campos inválidos se rechazan al encolar, sin llegar al hilo escritor"""
+        with self.assertRaises(ValueError):
+            self.writes.update_device(1, color="rojo")
+
+    def test_results_arrive_after_commit(self):
+        """Cuando el Future se resuelve, la alta ya es visible para otras conexiones"""
+        device_id = self.add("VIS0001").result(timeout=5)
+        with self.db.read() as cur:
+            cur.execute("SELECT serialno FROM DeviceReg WHERE id = ?", (device_id,))
+            self.assertEqual(cur.fetchone()[0], "VIS0001")
+
+    def test_close_flushes_pending(self):
+        """close() confirma lo encolado y luego rechaza nuevas operaciones"""
+        futures = [self.add(f"CLOSE{i:04d}") for i in range(10)]
+        self.writes.close(timeout=5)
+
+        self.assertFalse(self.writes.is_alive())
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(self.db.count_devices(), 10)
+        with self.assertRaises(RuntimeError):
+            self.add("CLOSE9999")
+
+    def test_close_before_start_fails_pending(self):
+        """Si el hilo nunca arrancó, close() no deja Future esperando para siempre"""
+        writes = WriteQueue(self.db)
+        future = writes.add_device("UP01", "NEVER0001", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+        writes.close(timeout=5)
+
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=1)
+        self.assertEqual(self.db.count_devices(), 0)
+
+    def test_bounded_queue_waits_for_writer(self):
+        """Con max_pending operaciones en cola, submit() espera a que el escritor las tome"""
+        writes = WriteQueue(self.db, max_pending=2)
+        first = [writes.add_device("UP01", f"FULL{i:04d}", "Laptop", "Dell XPS", "[0] Sin fallas", "")
+                 for i in range(2)]
+        blocked = []
+        producer = threading.Thread(target=lambda: blocked.append(
+            writes.add_device("UP01", "FULL0002", "Laptop", "Dell XPS", "[0] Sin fallas", "")))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+
+        writes.start()
+        producer.join(5)
+        self.assertEqual(len([future.result(timeout=5) for future in first + blocked]), 3)
+        writes.close(timeout=5)
+
+    def test_concurrent_submit_and_close(self):
+        """Cada operación se confirma o se rechaza al encolar; ninguna queda sin resolver"""
+        futures, rejected = [], []
+        start = threading.Barrier(5)
+
+        def producer(index):
+            start.wait()
+            for i in range(200):
+                try:
+                    futures.append(self.add(f"RACE{index}{i:04d}"))
+                except RuntimeError:
+                    rejected.append(i)
+                    return
+
+        threads = [threading.Thread(target=producer, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        self.writes.close(timeout=5)
+        for thread in threads:
+            thread.join(5)
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(self.db.count_devices(), len(futures))
+
+
+if __name__ == '__main__':
+    unittest.main()
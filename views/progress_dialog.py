@@ -0,0 +1,58 @@
+"""
+Ventana de progreso para tareas en segundo plano
+"""
+import customtkinter as ctk
+
+
+class ProgressDialog(ctk.CTkToplevel):
+    """Ventana no modal con barra de progreso y botón de cancelar"""
+
+    def __init__(self, master, title="Procesando", on_cancel=None):
+        super().__init__(master)
+
+        self.on_cancel = on_cancel
+
+        self.title(title)
+        self.geometry("420x150")
+        self.resizable(False, False)
+        # Sin grab_set: el usuario puede seguir buscando y registrando
+        self.transient(master)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Configura la interfaz de usuario"""
+        self.grid_columnconfigure(0, weight=1)
+
+        self.status_label = ctk.CTkLabel(self, text="Preparando...", font=ctk.CTkFont(size=14))
+        self.status_label.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="w")
+
+        self.progress_bar = ctk.CTkProgressBar(self, width=380)
+        self.progress_bar.grid(row=1, column=0, padx=20, pady=5, sticky="ew")
+        self.progress_bar.set(0)
+
+        self.cancel_button = ctk.CTkButton(
+            self,
+            text="Cancelar",
+            width=120,
+            fg_color="#d9534f",
+            hover_color="#c9302c",
+            command=self.cancel
+        )
+        self.cancel_button.grid(row=2, column=0, padx=20, pady=(10, 20))
+
+    def update_progress(self, done, total):
+        """Actualiza la barra y el texto con el avance de la tarea"""
+        if total:
+            self.progress_bar.set(min(done / total, 1.0))
+            self.status_label.configure(text=f"{done:,} de {total:,} registros")
+        else:
+            self.status_label.configure(text=f"{done:,} registros")
+
+    def cancel(self):
+        """Pide la cancelación de la tarea"""
+        self.cancel_button.configure(state="disabled")
+        self.status_label.configure(text="Cancelando...")
+        if self.on_cancel:
+            self.on_cancel()
@@ -4,16 +4,20 @@ Vista para el registro de dispositivos
 import customtkinter as ctk
 from tkinter import messagebox
 from models.device import Device
+from src.workers import when_done
+from src.write_queue import DuplicateSerialError
 from config.device_config import PLANT, PLANT_VAL, DEVICE_MODELS, FAILURE_TYPES
 
 
 class RegisterView(ctk.CTkFrame):
     """Vista para registrar nuevos dispositivos"""
     
-    def __init__(self, master, db, on_save_callback=None, on_cancel_callback=None):
+    def __init__(self, master, db, on_save_callback=None, on_cancel_callback=None, write_queue=None):
         super().__init__(master)
         
         self.db = db
+        # Con cola de escritura las altas se confirman en su hilo, sin esperar el commit
+        self.write_queue = write_queue
         self.on_save_callback = on_save_callback
         self.on_cancel_callback = on_cancel_callback
         
@@ -193,6 +197,16 @@ class RegisterView(ctk.CTkFrame):
         failure_code = self.extract_failure_code(failure_type)
         
         try:
+            if self.write_queue:
+                # Guardar en base de datos CON EL CÓDIGO ("UP02", no el nombre)
+                future = self.write_queue.add_device(plant_code, serialno, device_type, model,
+                                                     failure_type, observations)
+                # Sin doble alta mientras se confirma la anterior
+                self.set_saving(True)
+                when_done(self, future, lambda done: self.on_device_stored(
+                    done, serialno, device_type, model, add_another))
+                return
+            
             # Guardar en base de datos CON EL CÓDIGO
             device_id = self.db.add_device(
                 plant_code,                    # ← Aquí va el CÓDIGO "UP02", no el nombre
@@ -202,27 +216,47 @@ class RegisterView(ctk.CTkFrame):
                 failuretype=failure_type,
                 observations=observations
             )
-            
-            if device_id:
-                messagebox.showinfo("Éxito", f"Dispositivo guardado\nID: {device_id}")
-                
-                # Actualizar modelos si es nuevo
-                self.update_device_lists(device_type, model)
-                
-                # Llamar al callback si existe
-                if self.on_save_callback:
-                    self.on_save_callback(device_id, serialno)
-                
-                if add_another:
-                    self.clear_fields()
-                else:
-                    self.cancel()
-            else:
-                messagebox.showerror("Error", "No se pudo guardar el dispositivo")
+            self.finish_save(device_id, serialno, device_type, model, add_another)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Error al guardar: {str(e)}")
     
+    def set_saving(self, saving):
+        """Deshabilita los botones de guardar mientras hay una alta en curso"""
+        state = "disabled" if saving else "normal"
+        self.btn_save.configure(state=state)
+        self.btn_save_add.configure(state=state)
+    
+    def on_device_stored(self, future, serialno, device_type, model, add_another):
+        """Resultado de una alta hecha por la cola de escritura (en el hilo de Tk)"""
+        self.set_saving(False)
+        error = future.exception()
+        if isinstance(error, DuplicateSerialError):
+            messagebox.showerror("Error", f"El serial {serialno} ya existe")
+        elif error:
+            messagebox.showerror("Error", f"Error al guardar: {str(error)}")
+        else:
+            self.finish_save(future.result(), serialno, device_type, model, add_another)
+    
+    def finish_save(self, device_id, serialno, device_type, model, add_another):
+        """Informa el resultado del guardado y prepara el formulario"""
+        if device_id:
+            messagebox.showinfo("Éxito", f"Dispositivo guardado\nID: {device_id}")
+            
+            # Actualizar modelos si es nuevo
+            self.update_device_lists(device_type, model)
+            
+            # Llamar al callback si existe
+            if self.on_save_callback:
+                self.on_save_callback(device_id, serialno)
+            
+            if add_another:
+                self.clear_fields()
+            else:
+                self.cancel()
+        else:
+            messagebox.showerror("Error", "No se pudo guardar el dispositivo")
+    
     def get_plant_code(self, plant_name):
         """Convierte nombre de planta a código"""
         # Si ya es un código (ej: "UP01"), devolverlo tal cual
@@ -307,8 +341,7 @@ class RegisterView(ctk.CTkFrame):
         """Carga un dispositivo existente para editar"""
         try:
             # Obtener dispositivo de la base de datos
-            self.db.cur.execute("SELECT * FROM DeviceReg WHERE id = ?", (device_id,))
-            row = self.db.cur.fetchone()
+            row = self.db.get_device(device_id)
             
             if row:
                 self.device = Device.from_db_row(row)
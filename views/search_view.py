@@ -5,8 +5,41 @@ CON PROTECCIONES CONTRA ELIMINACIONES MASIVAS
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 import tkinter as tk
+import time
 from datetime import datetime
 
+from src.result_window import MemoryWindow
+from src.workers import POLL_INTERVAL_MS, PageJob, SearchJob
+from views.virtual_table import ROW_HEIGHT, VirtualTreeview
+
+
+# Filas que se piden a la base de datos por cada página
+PAGE_SIZE = 200
+
+# Pausa de escritura tras la cual se busca sola (ms)
+LIVE_SEARCH_DELAY_MS = 300
+
+# Longitud mínima del término para buscar mientras se escribe
+LIVE_SEARCH_MIN_LENGTH = 3
+
+# Criterios que se buscan mientras se escribe (por subcadena)
+LIVE_SEARCH_OPTIONS = {
+    "Por Serial": "serialno",
+    "Por Tipo": "type",
+    "Por Modelo": "model",
+}
+
+
+def format_row(row):
+    """Valores de las columnas de la tabla para una fila de DeviceReg"""
+    device_id, plant, serialno, device_type, model, failuretype, entry_date, observations = row[:8]
+    if entry_date:
+        try:
+            entry_date = datetime.strptime(entry_date, '%Y-%m-%d %H:%M:%S').strftime('%d/%m/%Y %H:%M')
+        except ValueError:
+            pass
+    return (device_id, plant, serialno, device_type, model, failuretype, entry_date, observations or "")
+
 
 class SearchView(ctk.CTkFrame):
     """Vista para buscar y gestionar dispositivos"""
@@ -19,11 +52,21 @@ class SearchView(ctk.CTkFrame):
         self.on_delete_callback = on_delete_callback
         
         # Variables de estado
-        self.current_results = []
         self.current_search_term = ""
         self.current_search_by = ""
         self.selected_device_id = None
         
+        # Resultado activo: la tabla muestra solo la parte visible de la ventana
+        self.current_query = None      # (término, criterio de BD) de la búsqueda activa
+        self.result_window = None
+        self.total_results = 0
+        
+        # Búsqueda en curso en segundo plano (una nueva cancela a la anterior)
+        self.search_job = None
+        self.search_started = None
+        self._live_search_after = None   # after() pendiente de la búsqueda al escribir
+        self.page_job = None             # Carga de las páginas visibles que faltan
+        
         # Configurar interfaz
         self.setup_ui()
     
@@ -62,11 +105,12 @@ class SearchView(ctk.CTkFrame):
         )
         self.search_entry.grid(row=0, column=1, padx=5, pady=10, sticky="ew")
         self.search_entry.bind("<Return>", lambda e: self.perform_search())
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
         
         # Opciones de búsqueda
         self.search_option = ctk.CTkOptionMenu(
             search_frame,
-            values=["Por Serial", "Por Tipo", "Por Modelo", "Por Fecha", "Todos"],
+            values=["Por Serial", "Por Tipo", "Por Modelo", "Por Fecha", "Consulta", "Todos"],
             width=120
         )
         self.search_option.set("Por Serial")
@@ -108,7 +152,7 @@ class SearchView(ctk.CTkFrame):
         style.configure("Treeview", 
                        background="#2a2d2e",
                        foreground="white",
-                       rowheight=25,
+                       rowheight=ROW_HEIGHT,
                        fieldbackground="#2a2d2e")
         style.map('Treeview', background=[('selected', '#22559b')])
         
@@ -136,9 +180,8 @@ class SearchView(ctk.CTkFrame):
             self.tree.heading(col, text=col)
             self.tree.column(col, width=column_widths.get(col, 100))
         
-        # Scrollbar vertical
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
+        # Scrollbar vertical: recorre el resultado completo, no los ítems del Treeview
+        self.vsb = ttk.Scrollbar(table_frame, orient="vertical")
         
         # Scrollbar horizontal
         hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
@@ -146,11 +189,12 @@ class SearchView(ctk.CTkFrame):
         
         # Posicionar elementos
         self.tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
+        self.vsb.grid(row=0, column=1, sticky="ns")
         hsb.grid(row=1, column=0, sticky="ew")
         
-        # Evento de selección
-        self.tree.bind("<<TreeviewSelect>>", self.on_row_select)
+        # Tabla virtual: solo existen los ítems de las filas visibles
+        self.table = VirtualTreeview(self.tree, self.vsb, format_row, on_select=self.on_row_select,
+                                     load_pages=self.load_pages)
     
     def create_action_controls(self):
         """Crea los controles de acción"""
@@ -210,8 +254,48 @@ class SearchView(ctk.CTkFrame):
         )
         self.results_label.pack(side="right", padx=(0, 10))
     
+    def on_search_key(self, event):
+        """Reprograma la búsqueda automática hasta que se deja de escribir"""
+        if event.keysym == "Return":
+            return
+        if self._live_search_after is not None:
+            self.after_cancel(self._live_search_after)
+        self._live_search_after = self.after(LIVE_SEARCH_DELAY_MS, self.live_search)
+    
+    def live_search(self):
+        """
+        Búsqueda mientras se escribe
+        
+        Si el término nuevo contiene al de la búsqueda mostrada y esta está
+        completa en memoria, se filtran esas filas; si no (término más corto o
+        distinto, o resultado demasiado grande para tenerlo en memoria) se
+        consulta la base de datos.
+        """
+        self._live_search_after = None
+        search_term = self.search_entry.get().strip()
+        option = self.search_option.get()
+        search_by = LIVE_SEARCH_OPTIONS.get(option)
+        if search_by is None or len(search_term) < LIVE_SEARCH_MIN_LENGTH:
+            return
+        if (search_term, search_by) == self.current_query:
+            return
+        
+        self.current_search_term = search_term
+        self.current_search_by = option
+        window = self.result_window
+        if isinstance(window, MemoryWindow) and window.can_refine(search_term, search_by):
+            # Una consulta de un término intermedio ya no hace falta
+            self.cancel_search()
+            self.current_query = (search_term, search_by)
+            self.show_results(window.refine(search_term))
+        else:
+            self.start_search((search_term, search_by))
+    
     def perform_search(self):
         """Realiza la búsqueda en la base de datos"""
+        if self._live_search_after is not None:
+            self.after_cancel(self._live_search_after)
+            self._live_search_after = None
         search_term = self.search_entry.get().strip()
         option = self.search_option.get()
         
@@ -234,36 +318,118 @@ class SearchView(ctk.CTkFrame):
                 "Por Tipo": "type",
                 "Por Modelo": "model",
                 "Por Fecha": "entry_date",
+                "Consulta": "query",   # plant:UP02 type:Laptop date:2024-01..2024-03 ...
                 "Todos": "all"
             }
             
             if option == "Todos":
-                results = self.db.get_all_devices()
+                query = (None, None)
             elif option == "Por Fecha":
                 # Validar y formatear fecha
                 formatted_date = self.validate_and_format_date(search_term)
                 if not formatted_date:
                     self.show_date_format_help()
                     return
-                results = self.db.search_device(f"{formatted_date}%", search_map[option])
+                query = (f"{formatted_date}%", search_map[option])
             else:
-                results = self.db.search_device(search_term, search_map[option])
-            
-            # Guardar resultados
-            self.current_results = results
+                query = (search_term, search_map[option])
             
-            # Mostrar en tabla
-            self.display_results(results)
-            
-            # Actualizar etiqueta
-            self.results_label.configure(text=f"{len(results)} resultados")
-            
-            # Actualizar estado de botones CON RESTRICCIONES
-            self.update_buttons_state(len(results), option, search_term)
+            # La consulta corre en un hilo; la ventana sigue respondiendo
+            self.start_search(query)
             
         except Exception as e:
             messagebox.showerror("Error", f"Error en la búsqueda: {str(e)}")
     
+    def start_search(self, query):
+        """Lanza la búsqueda en segundo plano, cancelando la que siga en curso"""
+        self.cancel_search()
+        self.current_query = query
+        # Hasta que llegue el resultado, el término y el conteo no coinciden con
+        # lo que se ve: no se permite eliminar por el término nuevo
+        self.total_results = 0
+        self.delete_filtered_btn.configure(state="disabled")
+        self.search_job = SearchJob(self.db, query, page_size=PAGE_SIZE)
+        self.search_started = time.monotonic()
+        self.search_job.start()
+        self.results_label.configure(text="🔄 Buscando… 0.0 s")
+        self.after(POLL_INTERVAL_MS, self.poll_search, self.search_job)
+    
+    def cancel_search(self):
+        """Aborta la búsqueda en curso (su consulta se interrumpe en SQLite)"""
+        self.cancel_page_load()
+        if self.search_job is not None:
+            self.search_job.cancel()
+            self.search_job = None
+    
+    def poll_search(self, job):
+        """Consulta los eventos de la búsqueda desde el hilo de Tk"""
+        if job is not self.search_job:
+            # Reemplazada por una búsqueda más nueva o cancelada
+            return
+        
+        for kind, value in job.poll():
+            if kind == 'done':
+                self.search_job = None
+                self.show_results(value)
+                return
+            if kind == 'error':
+                self.search_job = None
+                self.results_label.configure(text="0 resultados")
+                messagebox.showerror("Error", f"Error en la búsqueda: {str(value)}")
+                return
+        
+        elapsed = time.monotonic() - self.search_started
+        self.results_label.configure(text=f"🔄 Buscando… {elapsed:.1f} s")
+        self.after(POLL_INTERVAL_MS, self.poll_search, job)
+    
+    def load_pages(self, window, pages):
+        """Trae en segundo plano las páginas que la tabla muestra como de espera"""
+        job = self.page_job
+        if job is not None and job.window is window and set(pages) <= set(job.pages):
+            # Ya se están cargando
+            return
+        # Las páginas de una posición que ya no se ve no hacen falta
+        self.cancel_page_load()
+        self.page_job = PageJob(self.db, window, pages)
+        self.page_job.start()
+        self.after(POLL_INTERVAL_MS, self.poll_pages, self.page_job)
+    
+    def cancel_page_load(self):
+        if self.page_job is not None:
+            self.page_job.cancel()
+            self.page_job = None
+    
+    def poll_pages(self, job):
+        """Consulta los eventos de la carga de páginas desde el hilo de Tk"""
+        if job is not self.page_job:
+            return
+        for kind, value in job.poll():
+            self.page_job = None
+            if kind == 'done':
+                self.table.page_loaded(job.window)
+            elif kind == 'error':
+                messagebox.showerror("Error", f"Error cargando resultados: {str(value)}")
+            return
+        self.after(POLL_INTERVAL_MS, self.poll_pages, job)
+    
+    def show_results(self, window):
+        """Muestra el resultado de una búsqueda terminada"""
+        self.result_window = window
+        self.total_results = len(window)
+        
+        # Mostrar en tabla (solo las filas visibles)
+        self.table.set_window(window)
+        
+        # Actualizar etiqueta
+        self.update_results_label()
+        
+        # Actualizar estado de botones CON RESTRICCIONES
+        self.update_buttons_state(self.total_results, self.current_search_by, self.current_search_term)
+    
+    def update_results_label(self):
+        """Muestra cuántos resultados tiene la búsqueda activa"""
+        self.results_label.configure(text=f"{self.total_results} resultados")
+    
     def validate_and_format_date(self, date_str):
         """Valida y formatea una fecha para búsqueda"""
         date_str = date_str.strip()
@@ -303,38 +469,14 @@ class SearchView(ctk.CTkFrame):
             "  - DD/MM/AAAA: 15/01/2024"
         )
     
-    def display_results(self, results):
-        """Muestra resultados en la tabla"""
-        for row in results:
-            # Asegúrate de que la fila tenga al menos 8 elementos
-            if len(row) >= 8:
-                # Formatear fecha para mostrar (ahora en índice 7)
-                formatted_date = row[7]
-                if formatted_date:
-                    try:
-                        dt = datetime.strptime(formatted_date, '%Y-%m-%d %H:%M:%S')
-                        formatted_date = dt.strftime('%d/%m/%Y %H:%M')
-                    except:
-                        pass
-                
-                # Insertar en tabla con 8 columnas
-                self.tree.insert("", "end", values=(
-                    row[0],      # ID
-                    row[1],      # Planta
-                    row[2],      # Serial
-                    row[3],      # Tipo
-                    row[4],      # Modelo
-                    row[5],      # Falla
-                    row[6] if len(row) > 6 else "",  # Observaciones
-                    formatted_date  # Fecha
-                ))
-    
     def clear_table(self):
         """Limpia la tabla de resultados"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        self.current_results = []
-        self.selected_device_id = None
+        self.cancel_search()
+        self.table.clear()
+        self.current_query = None
+        self.result_window = None
+        self.total_results = 0
+        self.on_row_select(None)
         self.update_buttons_state(0, self.current_search_by, self.current_search_term)
     
     def clear_search(self):
@@ -344,16 +486,12 @@ class SearchView(ctk.CTkFrame):
         self.clear_table()
         self.results_label.configure(text="0 resultados")
     
-    def on_row_select(self, event):
-        """Maneja la selección de una fila"""
-        selected_items = self.tree.selection()
-        if selected_items:
-            item = selected_items[0]
-            values = self.tree.item(item, 'values')
-            if values:
-                self.selected_device_id = values[0]
-                self.edit_btn.configure(state="normal")
-                self.delete_btn.configure(state="normal")
+    def on_row_select(self, device_id):
+        """Maneja la selección de una fila (device_id es None si no hay selección)"""
+        if device_id is not None:
+            self.selected_device_id = device_id
+            self.edit_btn.configure(state="normal")
+            self.delete_btn.configure(state="normal")
         else:
             self.selected_device_id = None
             self.edit_btn.configure(state="disabled")
@@ -382,7 +520,18 @@ class SearchView(ctk.CTkFrame):
             )
             return
         
-        # Restricción 3: Para búsqueda "Por Modelo" con muchos resultados, confirmación extra
+        # Restricción 3: No permitir "Eliminar filtrados" con consultas combinadas
+        # (del_SData elimina por un solo criterio y no interpretaría la consulta)
+        if search_by == "Consulta":
+            self.delete_filtered_btn.configure(
+                state="disabled",
+                text="❌ No permitido (consulta)",
+                fg_color="gray",
+                hover_color="darkgray"
+            )
+            return
+        
+        # Restricción 4: Para búsqueda "Por Modelo" con muchos resultados, confirmación extra
         if search_by == "Por Modelo" and result_count > 5:
             self.delete_filtered_btn.configure(
                 state="normal",
@@ -408,7 +557,9 @@ class SearchView(ctk.CTkFrame):
     def on_export(self):
         """Maneja la exportación"""
         if self.on_export_callback:
-            self.on_export_callback(self.current_results, self.current_search_by)
+            # Se pasa la consulta, no las filas: la exportación lee todo desde la base de datos
+            query = self.current_query if self.total_results else None
+            self.on_export_callback(query, self.current_search_by)
     
     def on_edit(self):
         """Maneja la edición del dispositivo seleccionado"""
@@ -422,7 +573,10 @@ class SearchView(ctk.CTkFrame):
     
     def on_delete_filtered(self):
         """Maneja la eliminación de dispositivos filtrados CON VALIDACIONES DE SEGURIDAD"""
-        if not self.current_results:
+        if self.search_job is not None:
+            messagebox.showwarning("Advertencia", "Espere a que termine la búsqueda")
+            return
+        if not self.total_results:
             messagebox.showwarning("Advertencia", "No hay resultados para eliminar")
             return
         
@@ -444,21 +598,30 @@ class SearchView(ctk.CTkFrame):
             )
             return
         
-        # VALIDACIÓN 3: Para búsquedas por Modelo, confirmar extra si hay muchos resultados
-        if self.current_search_by == "Por Modelo" and len(self.current_results) > 5:
+        # VALIDACIÓN 3: No permitir eliminar con una consulta combinada
+        if self.current_search_by == "Consulta":
+            messagebox.showerror(
+                "Operación no permitida",
+                "No está permitido eliminar los resultados de una consulta combinada.\n\n"
+                "Realice una búsqueda por Serial o Modelo específico."
+            )
+            return
+        
+        # VALIDACIÓN 4: Para búsquedas por Modelo, confirmar extra si hay muchos resultados
+        if self.current_search_by == "Por Modelo" and self.total_results > 5:
             confirm_modelo = messagebox.askyesno(
                 "Confirmación adicional",
-                f"Está a punto de eliminar {len(self.current_results)} dispositivos del modelo:\n"
+                f"Está a punto de eliminar {self.total_results} dispositivos del modelo:\n"
                 f"'{self.current_search_term}'\n\n"
                 "¿Está completamente seguro?"
             )
             if not confirm_modelo:
                 return
         
-        # VALIDACIÓN 4: Confirmación final para cualquier eliminación masiva
+        # VALIDACIÓN 5: Confirmación final para cualquier eliminación masiva
         confirm = messagebox.askyesno(
             "Confirmar eliminación masiva",
-            f"¿Está seguro de eliminar TODOS los {len(self.current_results)} dispositivos de la búsqueda actual?\n\n"
+            f"¿Está seguro de eliminar TODOS los {self.total_results} dispositivos de la búsqueda actual?\n\n"
             f"Búsqueda: '{self.current_search_term}' ({self.current_search_by})\n\n"
             "¡Esta acción no se puede deshacer!"
         )
@@ -0,0 +1,223 @@
+"""
+Tabla virtual sobre un ttk.Treeview
+
+El Treeview solo tiene tantos ítems como filas entran en pantalla; al
+desplazarse se reescriben sus valores con las filas de la nueva posición,
+pedidas a una ResultWindow. El costo de dibujar no depende del tamaño del
+resultado: 100 o 100.000 filas crean los mismos ítems.
+
+Con load_pages la tabla nunca consulta la base de datos: las filas de
+páginas que no están en memoria se muestran como "Cargando…" y se piden a
+load_pages, que las trae en otro hilo y luego llama a page_loaded().
+"""
+
+
+# Alto de fila del estilo de la tabla (px)
+ROW_HEIGHT = 25
+
+# Filas que avanza cada paso de la rueda del mouse
+WHEEL_STEP = 3
+
+# Texto de las filas cuya página todavía se está cargando
+LOADING_TEXT = "⏳ Cargando…"
+
+
+class VirtualTreeview:
+    """
+    Vincula un Treeview y su scrollbar vertical a una ResultWindow
+
+    La posición del scroll es el índice de la primera fila visible; el
+    scrollbar se maneja a mano (no refleja los ítems del Treeview, que son
+    siempre los visibles).
+    """
+
+    def __init__(self, tree, scrollbar, format_row, on_select=None, row_height=ROW_HEIGHT,
+                 load_pages=None):
+        """
+        Args:
+            tree: Treeview con las columnas ya configuradas
+            scrollbar: Scrollbar vertical de la tabla
+            format_row: Función fila de la base -> valores de las columnas
+            on_select: Callback con el id (primer valor de la fila) seleccionado o None
+            row_height: Alto de fila del estilo del Treeview
+            load_pages: Callback (ventana, páginas) que carga en segundo plano las
+                        páginas visibles que faltan; sin él las filas se piden
+                        directamente a la ventana
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.on_select = on_select
+        self.row_height = row_height
+        self.load_pages = load_pages
+
+        self.window = None
+        self.offset = 0
+        self.visible_rows = int(tree.cget("height"))
+        self.visible = []              # Filas que se muestran ahora
+        self.selected_index = None     # Posición en el resultado de la fila seleccionada
+        self._slots = []               # Ítems del Treeview que se reutilizan
+
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", self.on_resize)
+        tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        tree.bind("<Button-4>", lambda e: self.scroll_by(-WHEEL_STEP))
+        tree.bind("<Button-5>", lambda e: self.scroll_by(WHEEL_STEP))
+        for key, handler in (("<Up>", lambda: self.move_selection(-1)),
+                             ("<Down>", lambda: self.move_selection(1)),
+                             ("<Prior>", lambda: self.move_selection(-self.visible_rows)),
+                             ("<Next>", lambda: self.move_selection(self.visible_rows)),
+                             ("<Home>", lambda: self.move_selection(-len(self))),
+                             ("<End>", lambda: self.move_selection(len(self)))):
+            # "break" evita que el Treeview mueva la selección entre sus propios ítems
+            tree.bind(key, lambda e, handler=handler: handler() or "break")
+
+    def __len__(self):
+        return len(self.window) if self.window is not None else 0
+
+    def set_window(self, window):
+        """Muestra otro resultado (None deja la tabla vacía) desde el principio"""
+        self.window = window
+        self.offset = 0
+        self.selected_index = None
+        self.render()
+
+    def clear(self):
+        self.set_window(None)
+
+    @property
+    def max_offset(self):
+        return max(0, len(self) - self.visible_rows)
+
+    def scroll_to(self, offset):
+        """Deja la fila offset como la primera visible"""
+        offset = max(0, min(int(offset), self.max_offset))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+        return "break"
+
+    def yview(self, *args):
+        """Comando del scrollbar: 'moveto fracción' o 'scroll n units|pages'"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self)))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll_by(int(args[1]) * step)
+
+    def on_mouse_wheel(self, event):
+        # Windows y macOS informan delta (múltiplos de 120 en Windows)
+        steps = -1 if event.delta > 0 else 1
+        return self.scroll_by(steps * WHEEL_STEP)
+
+    def on_resize(self, event):
+        """Ajusta la cantidad de ítems a las filas que entran en el alto actual"""
+        heading = self.row_height
+        if self._slots:
+            bbox = self.tree.bbox(self._slots[0])
+            if bbox:
+                heading = bbox[1]
+        rows = max(1, (event.height - heading) // self.row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.offset = min(self.offset, self.max_offset)
+            self.render()
+
+    def render(self):
+        """Escribe en los ítems las filas de la posición actual"""
+        self.visible = self._rows(self.offset, self.visible_rows)
+        if self.load_pages is not None and None in self.visible:
+            self.load_pages(self.window, self.window.missing_pages(self.offset, self.visible_rows))
+
+        # Solo se crean o borran ítems cuando cambia la cantidad de filas visibles
+        while len(self._slots) < len(self.visible):
+            self._slots.append(self.tree.insert("", "end", values=()))
+        while len(self._slots) > len(self.visible):
+            self.tree.delete(self._slots.pop())
+
+        for slot, row in zip(self._slots, self.visible):
+            values = self.format_row(row) if row is not None else ("", LOADING_TEXT)
+            self.tree.item(slot, values=values)
+
+        # La selección sigue a la fila, no al ítem
+        slot = self._slot_of(self.selected_index)
+        if slot is not None:
+            self.tree.selection_set(slot)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        total = len(self)
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(self.visible)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _rows(self, start, count):
+        """Filas de la ventana; None en las que todavía no se cargaron (con load_pages)"""
+        if self.window is None:
+            return []
+        if self.load_pages is None:
+            return self.window.rows(start, count)
+        return self.window.rows(start, count, fetch=False)
+
+    def page_loaded(self, window):
+        """Muestra las filas que trajo load_pages (si la ventana sigue siendo la misma)"""
+        if window is not self.window:
+            return
+        self.render()
+        row = self.selected_row()
+        if self.on_select and row is not None:
+            # Si la fila seleccionada era una de espera, recién ahora se conoce su id
+            self.on_select(row[0])
+
+    def _slot_of(self, index):
+        """Ítem que muestra la fila index, o None si no está visible"""
+        if index is None or not self.offset <= index < self.offset + len(self._slots):
+            return None
+        return self._slots[index - self.offset]
+
+    def selected_row(self):
+        """Fila seleccionada (aunque esté fuera de la vista), o None (también si no se cargó)"""
+        if self.selected_index is None or self.window is None:
+            return None
+        rows = self._rows(self.selected_index, 1)
+        return rows[0] if rows else None
+
+    def on_tree_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            index = self.offset + self._slots.index(selection[0])
+            if index == self.selected_index:
+                return
+            self.selected_index = index
+        elif self._slot_of(self.selected_index) is not None:
+            # Se deseleccionó una fila visible; si no está visible solo se desplazó
+            self.selected_index = None
+        else:
+            return
+        if self.on_select:
+            row = self.selected_row()
+            self.on_select(row[0] if row else None)
+
+    def move_selection(self, rows):
+        """Mueve la selección con el teclado, desplazando la vista si hace falta"""
+        if not len(self):
+            return
+        current = self.selected_index if self.selected_index is not None else self.offset - 1
+        self.selected_index = max(0, min(current + rows, len(self) - 1))
+        if self.selected_index < self.offset:
+            self.offset = self.selected_index
+        elif self.selected_index >= self.offset + self.visible_rows:
+            self.offset = self.selected_index - self.visible_rows + 1
+        self.render()
+        self.tree.focus(self._slot_of(self.selected_index))
+        if self.on_select:
+            # Fila sin cargar: page_loaded informa el id cuando llega su página
+            row = self.selected_row()
+            self.on_select(row[0] if row else None)